@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def load_results(path: str) -> Dict[Tuple[str, int], Dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["name"], r["depth"]): r for r in report["results"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="compare two benchmark results")
+    parser.add_argument("base")
+    parser.add_argument("target")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="fail when throughput drops more than this percentage",
+    )
+    args = parser.parse_args(argv)
+
+    base = load_results(args.base)
+    target = load_results(args.target)
+    regressions = 0
+    for key in sorted(base.keys() & target.keys()):
+        b, t = base[key], target[key]
+        change = (t["throughput"] - b["throughput"]) / b["throughput"] * 100
+        mark = ""
+        if change < -args.threshold:
+            mark = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{key[0]:<32} depth={key[1]:<8} "
+            f"{b['throughput']:>10.1f} -> {t['throughput']:>10.1f} ops/s "
+            f"({change:+.1f}%)  p99 {b['p99_ms']:.3f} -> {t['p99_ms']:.3f}ms{mark}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
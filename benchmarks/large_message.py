@@ -0,0 +1,161 @@
+import argparse
+import json
+import platform
+import random
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+from werkzeug.serving import make_server
+from faws.sqs import server
+from faws.sqs.actions.message import send_message, receive_message
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue_storage import QueuesStorageType
+from benchmarks.sqs import KeepAliveRequestHandler, current_commit, measure
+
+QUEUE_NAME = "bench-large-queue"
+QUEUE_URL = f"http://localhost:5000/queues/{QUEUE_NAME}"
+WORDS = ["faws", "sqs", "message", "payload", "order", "user", "id", "created"]
+
+
+def payload(size: int) -> bytes:
+    # 実際のpayload(json等)に近い、ある程度圧縮の効くbodyを作る
+    random.seed(0)
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).encode()[:size]
+
+
+def build_app(compression_threshold: Optional[int]):
+    storage_config = {}
+    if compression_threshold is not None:
+        storage_config["body_compression_threshold"] = compression_threshold
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "QueuesStorageTypeConfig": storage_config,
+        }
+    )
+    return app
+
+
+def measure_memory(app, body: bytes, count: int) -> Dict:
+    queues = app.extensions["queues"]
+    queues.create_queue(QUEUE_NAME)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(count):
+        # requestごとに別のbytesが来るのと同じ状況にするためcopyを渡す
+        send_message(queues, QUEUE_URL, bytes(bytearray(body)))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    queues.delete_queue(QUEUE_NAME)
+    return {
+        "messages": count,
+        "stored_bytes": after - before,
+        "bytes_per_message": (after - before) / count,
+    }
+
+
+def run(name: str, compression_threshold: Optional[int], size: int, count: int):
+    body = payload(size)
+    results = []
+    app = build_app(compression_threshold)
+    queues = app.extensions["queues"]
+
+    queues.create_queue(QUEUE_NAME)
+    results.append(
+        measure(
+            f"{name}/in_process/SendMessage",
+            size,
+            count,
+            lambda: send_message(queues, QUEUE_URL, body),
+        )
+    )
+    results.append(
+        measure(
+            f"{name}/in_process/ReceiveMessage",
+            size,
+            count,
+            lambda: receive_message(queues, QUEUE_URL),
+        )
+    )
+    queues.delete_queue(QUEUE_NAME)
+
+    httpd = make_server(
+        "127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveRequestHandler
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    client = QueryClient(f"http://127.0.0.1:{httpd.server_port}")
+    text = body.decode()
+    try:
+        queues.create_queue(QUEUE_NAME)
+        results.append(
+            measure(
+                f"{name}/http/SendMessage",
+                size,
+                count,
+                lambda: client.call(
+                    "SendMessage", QueueUrl=QUEUE_URL, MessageBody=text
+                ),
+            )
+        )
+        results.append(
+            measure(
+                f"{name}/http/ReceiveMessage",
+                size,
+                count,
+                lambda: client.call("ReceiveMessage", QueueUrl=QUEUE_URL),
+            )
+        )
+        queues.delete_queue(QUEUE_NAME)
+    finally:
+        client.close()
+        httpd.shutdown()
+
+    memory = measure_memory(app, body, count)
+    for r in results:
+        r["memory"] = memory
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="faws sqs large payload benchmark")
+    parser.add_argument("--size", type=int, default=262144 - 1024)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--compression-threshold", type=int, default=65536)
+    parser.add_argument("--output", help="write results as json to this path")
+    args = parser.parse_args(argv)
+
+    results = run("raw", None, args.size, args.count)
+    results.extend(run("zlib", args.compression_threshold, args.size, args.count))
+    for r in results:
+        print(
+            f"{r['name']:<32} size={r['depth']:<8} "
+            f"{r['throughput']:>10.1f} ops/s  "
+            f"p50={r['p50_ms']:.3f}ms  p99={r['p99_ms']:.3f}ms  "
+            f"{r['memory']['bytes_per_message']:.0f} bytes/message"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "commit": current_commit(),
+                        "python": platform.python_version(),
+                        "timestamp": time.time(),
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
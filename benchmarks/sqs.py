@@ -0,0 +1,219 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List
+from werkzeug.serving import make_server, WSGIRequestHandler
+from faws.sqs import server
+from faws.sqs.actions.message import send_message, receive_message
+from faws.sqs.actions.queue import purge_queue
+from faws.sqs.loadgen import percentile
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue_storage import QueueStorage, QueuesStorageType
+
+DEFAULT_DEPTHS = [10**2, 10**3, 10**4, 10**5, 10**6]
+QUEUE_NAME = "bench-queue"
+QUEUE_URL = f"http://localhost:5000/queues/{QUEUE_NAME}"
+
+
+def measure(name: str, depth: int, iterations: int, op: Callable[[], None]) -> Dict:
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        op()
+        latencies.append(time.perf_counter() - t)
+    return summarize(name, depth, latencies, time.perf_counter() - started_at)
+
+
+def summarize(name: str, depth: int, latencies: List[float], elapsed: float) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        "name": name,
+        "depth": depth,
+        "iterations": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def seed_queue(queues: QueueStorage, depth: int, body: str = "benchmark"):
+    if QUEUE_NAME in queues.queues:
+        queues.delete_queue(QUEUE_NAME)
+    queue = queues.create_queue(QUEUE_NAME)
+    for _ in range(depth):
+        queue.add_message(body)
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_in_process(queues: QueueStorage, depths: List[int], iterations: int):
+    results = []
+    for depth in depths:
+        seed_queue(queues, depth)
+        results.append(
+            measure(
+                "in_process/SendMessage",
+                depth,
+                iterations,
+                lambda: send_message(queues, QUEUE_URL, "benchmark"),
+            )
+        )
+        seed_queue(queues, depth)
+        results.append(
+            measure(
+                "in_process/ReceiveMessage",
+                depth,
+                max(min(iterations, depth), 1),
+                lambda: receive_message(queues, QUEUE_URL),
+            )
+        )
+        seed_queue(queues, depth)
+        results.append(
+            measure(
+                "in_process/ReceiveMessageBatch",
+                depth,
+                max(min(iterations, depth // 10), 1),
+                lambda: receive_message(queues, QUEUE_URL, MaxNumberOfMessages="10"),
+            )
+        )
+        results.append(measure_purge("in_process/PurgeQueue", queues, depth, None))
+    return results
+
+
+def run_over_http(queues: QueueStorage, app, depths: List[int], iterations: int):
+    httpd = make_server(
+        "127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveRequestHandler
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    client = QueryClient(f"http://127.0.0.1:{httpd.server_port}")
+    results = []
+    try:
+        for depth in depths:
+            seed_queue(queues, depth)
+            results.append(
+                measure(
+                    "http/SendMessage",
+                    depth,
+                    iterations,
+                    lambda: client.call(
+                        "SendMessage", QueueUrl=QUEUE_URL, MessageBody="bench"
+                    ),
+                )
+            )
+            seed_queue(queues, depth)
+            results.append(
+                measure(
+                    "http/ReceiveMessage",
+                    depth,
+                    max(min(iterations, depth), 1),
+                    lambda: client.call("ReceiveMessage", QueueUrl=QUEUE_URL),
+                )
+            )
+            seed_queue(queues, depth)
+            results.append(
+                measure(
+                    "http/ReceiveMessageBatch",
+                    depth,
+                    max(min(iterations, depth // 10), 1),
+                    lambda: client.call(
+                        "ReceiveMessage",
+                        QueueUrl=QUEUE_URL,
+                        MaxNumberOfMessages="10",
+                    ),
+                )
+            )
+            results.append(measure_purge("http/PurgeQueue", queues, depth, client))
+    finally:
+        client.close()
+        httpd.shutdown()
+    return results
+
+
+def measure_purge(name: str, queues: QueueStorage, depth: int, client) -> Dict:
+    # purgeは1回で空になるので、深さごとにseedしなおして数回計測する
+    latencies = []
+    for _ in range(3):
+        seed_queue(queues, depth)
+        t = time.perf_counter()
+        if client is None:
+            purge_queue(queues, QUEUE_URL)
+        else:
+            client.call("PurgeQueue", QueueUrl=QUEUE_URL)
+        latencies.append(time.perf_counter() - t)
+    return summarize(name, depth, latencies, sum(latencies))
+
+
+def current_commit() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="faws sqs throughput benchmark")
+    parser.add_argument(
+        "--depths",
+        type=lambda s: [int(float(d)) for d in s.split(",")],
+        default=DEFAULT_DEPTHS,
+        help="comma separated queue depths (e.g. 1e2,1e4)",
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument(
+        "--mode",
+        choices=["all", "in_process", "http"],
+        default="all",
+    )
+    parser.add_argument("--output", help="write results as json to this path")
+    args = parser.parse_args(argv)
+
+    app = server.create_app({"QueuesStorageType": QueuesStorageType.IN_MEMORY})
+    with app.app_context():
+        queues = server.get_queues()
+        queues.init_storage()
+
+    results = []
+    if args.mode in ("all", "in_process"):
+        results.extend(run_in_process(queues, args.depths, args.iterations))
+    if args.mode in ("all", "http"):
+        results.extend(run_over_http(queues, app, args.depths, args.iterations))
+
+    report = {
+        "meta": {
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    for r in results:
+        print(
+            f"{r['name']:<32} depth={r['depth']:<8} "
+            f"{r['throughput']:>10.1f} ops/s  "
+            f"p50={r['p50_ms']:.3f}ms  p99={r['p99_ms']:.3f}ms"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
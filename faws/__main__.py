@@ -0,0 +1,4 @@
+import sys
+from faws.cli import main
+
+sys.exit(main())
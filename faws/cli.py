@@ -0,0 +1,236 @@
+import argparse
+import json
+import sys
+from faws.serve import ServeConfig, load_app, serve as serve_app
+from faws.sqs import replay as replay_traffic
+from faws.sqs import consistency, transfer
+from faws.sqs.capture import read_records
+from faws.sqs.loadgen import LoadConfig, run_load, format_report, queue_url_for
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue import Queue
+
+
+def bench(args):
+    config = LoadConfig(
+        endpoint=args.endpoint,
+        queue_name=args.queue_name,
+        producers=args.producers,
+        consumers=args.consumers,
+        duration=args.duration,
+        message_size=args.message_size,
+        attribute_count=args.attributes,
+        batch_size=args.batch_size,
+        visibility_timeout=args.visibility_timeout,
+    )
+    report = run_load(config)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def serve(args):
+    app_config = None
+    if args.config:
+        with open(args.config) as f:
+            app_config = json.load(f)
+    serve_app(
+        load_app(args.service, app_config),
+        ServeConfig(
+            host=args.host,
+            port=args.port,
+            threads=args.threads,
+            backlog=args.backlog,
+            connection_limit=args.connection_limit,
+            keep_alive_timeout=args.keep_alive_timeout,
+            drain_seconds=args.drain_seconds,
+        ),
+    )
+
+
+def replay(args):
+    speed = None if args.speed == "max" else float(args.speed)
+    results = replay_traffic.replay(
+        read_records(args.path), args.endpoint, speed, args.max_connections
+    )
+    report = replay_traffic.summarize(results)
+    print(replay_traffic.format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def export_queue(args):
+    transfer.download(args.endpoint, args.queue_url, args.path, args.format)
+
+
+def import_queue(args):
+    result = transfer.upload(args.endpoint, args.queue_url, args.path, args.format)
+    print(json.dumps(result))
+
+
+def stress(args):
+    config = consistency.StressConfig(
+        workers=args.workers,
+        duration=args.duration,
+        processes=args.processes,
+        visibility_timeouts=args.visibility_timeouts,
+        seed=args.seed,
+    )
+    if args.in_process:
+        queue = Queue(
+            args.queue_name,
+            message_storage_type=MessageStorageType[args.storage],
+            partitions=args.partitions,
+        )
+        history = consistency.run_in_process(queue, config)
+    else:
+        # 前回の実行の残りがあると送っていないmessageとして検出されるので空にする
+        queue_url = queue_url_for(LoadConfig(args.endpoint, args.queue_name))
+        client = QueryClient(args.endpoint)
+        client.call("PurgeQueue", QueueUrl=queue_url)
+        client.close()
+        history = consistency.run_http(args.endpoint, queue_url, config)
+    violations = consistency.check_history(history, config.tolerance)
+    report = consistency.summarize(history, violations)
+    print(consistency.format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if violations else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="faws")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="generate sqs load against a faws (or sqs compatible) endpoint"
+    )
+    bench_parser.add_argument("--endpoint", default="http://localhost:5000")
+    bench_parser.add_argument("--queue-name", default="faws-bench")
+    bench_parser.add_argument("--producers", type=int, default=1)
+    bench_parser.add_argument("--consumers", type=int, default=1)
+    bench_parser.add_argument("--duration", type=float, default=10.0)
+    bench_parser.add_argument("--message-size", type=int, default=256)
+    bench_parser.add_argument("--attributes", type=int, default=0)
+    bench_parser.add_argument(
+        "--batch-size", type=int, default=1, help="MaxNumberOfMessages of receives"
+    )
+    bench_parser.add_argument("--visibility-timeout", type=int, default=None)
+    bench_parser.add_argument("--output", help="write the report as json")
+    bench_parser.set_defaults(func=bench)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="run a faws service on a production wsgi server(waitress)"
+    )
+    serve_parser.add_argument("service", choices=["sqs", "s3"])
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=5000)
+    serve_parser.add_argument("--threads", type=int, default=8)
+    serve_parser.add_argument("--backlog", type=int, default=1024)
+    serve_parser.add_argument("--connection-limit", type=int, default=1000)
+    serve_parser.add_argument(
+        "--keep-alive-timeout",
+        type=int,
+        default=120,
+        help="seconds to keep idle keep-alive connections",
+    )
+    serve_parser.add_argument(
+        "--drain-seconds",
+        type=float,
+        default=5,
+        help="seconds to keep serving with /admin/ready at 503 after SIGTERM",
+    )
+    serve_parser.add_argument("--config", help="app config as a json file")
+    serve_parser.set_defaults(func=serve)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="replay traffic captured by faws against an endpoint"
+    )
+    replay_parser.add_argument("path", help="capture file (CaptureConfig path)")
+    replay_parser.add_argument("--endpoint", default="http://localhost:5000")
+    replay_parser.add_argument(
+        "--speed",
+        default="1",
+        help="replay speed multiplier (1, 2, 0.5, ...) or 'max' for no waiting",
+    )
+    replay_parser.add_argument("--max-connections", type=int, default=256)
+    replay_parser.add_argument("--output", help="write the report as json")
+    replay_parser.set_defaults(func=replay)
+
+    export_parser = subparsers.add_parser(
+        "export", help="stream the messages of a queue to a file"
+    )
+    export_parser.add_argument("queue_url")
+    export_parser.add_argument(
+        "path", help="output file (.ndjson/.jsonl for ndjson, .gz to compress)"
+    )
+    export_parser.add_argument("--endpoint", default="http://localhost:5000")
+    export_parser.add_argument(
+        "--format", choices=transfer.FORMATS, help="default: from the file name"
+    )
+    export_parser.set_defaults(func=export_queue)
+
+    import_parser = subparsers.add_parser(
+        "import", help="stream messages exported by faws export into a queue"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("queue_url", help="created when it does not exist")
+    import_parser.add_argument("--endpoint", default="http://localhost:5000")
+    import_parser.add_argument(
+        "--format", choices=transfer.FORMATS, help="default: from the file name"
+    )
+    import_parser.set_defaults(func=import_queue)
+
+    stress_parser = subparsers.add_parser(
+        "stress",
+        help="run concurrent send/receive/delete/change-visibility "
+        "and check the history against the sqs semantics",
+    )
+    stress_parser.add_argument("--endpoint", default="http://localhost:5000")
+    stress_parser.add_argument("--queue-name", default="faws-stress")
+    stress_parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="drive a Queue in this process (with delete/change-visibility)",
+    )
+    stress_parser.add_argument(
+        "--storage",
+        choices=[t.name for t in MessageStorageType],
+        default=MessageStorageType.IN_MEMORY.name,
+        help="message storage of the --in-process queue",
+    )
+    stress_parser.add_argument(
+        "--partitions",
+        type=int,
+        default=1,
+        help="internal partitions of the --in-process queue",
+    )
+    stress_parser.add_argument("--workers", type=int, default=8)
+    stress_parser.add_argument(
+        "--processes", action="store_true", help="run workers as processes (http)"
+    )
+    stress_parser.add_argument("--duration", type=float, default=5.0)
+    stress_parser.add_argument(
+        "--visibility-timeouts",
+        type=lambda s: tuple(int(v) for v in s.split(",")),
+        default=(1, 2),
+        help="comma separated seconds to choose from",
+    )
+    stress_parser.add_argument("--seed", type=int)
+    stress_parser.add_argument("--output", help="write the report as json")
+    stress_parser.set_defaults(func=stress)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+from faws.s3.blob_store import BlobStore
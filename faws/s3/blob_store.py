@@ -0,0 +1,128 @@
+from __future__ import annotations
+import dataclasses
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import urllib.parse
+from typing import BinaryIO, Dict, Generator, Optional
+from faws.s3.error import InvalidBucketName, NoSuchKey
+
+_BUCKET_NAME = re.compile(r"^[a-z0-9][a-z0-9.-]{1,61}[a-z0-9]$")
+
+
+@dataclasses.dataclass()
+class BlobInfo:
+    size: int
+    etag: Optional[str] = None
+
+
+class Blob:
+    # objectはfileをmmapしてchunk単位で返すので、object全体をpythonのobjectとして持たない
+    def __init__(self, path: str, etag: Optional[str] = None):
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.etag = etag
+        self._mmap = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size > 0
+            else None
+        )
+
+    def iter_chunks(self, chunk_size: int = 1 << 16) -> Generator[bytes]:
+        try:
+            for offset in range(0, self.size, chunk_size):
+                yield self._mmap[offset : offset + chunk_size]
+        finally:
+            self.close()
+
+    def read(self) -> bytes:
+        return b"".join(self.iter_chunks())
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class BlobStore:
+    def __init__(self, directory: str = None, chunk_size: int = 1 << 20, **kwargs):
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="faws-s3-")
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._etags: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _bucket_path(self, bucket: str) -> str:
+        if _BUCKET_NAME.match(bucket) is None:
+            raise InvalidBucketName()
+        return os.path.join(self._directory, bucket)
+
+    def _object_path(self, bucket: str, key: str) -> str:
+        name = urllib.parse.quote(key, safe="")
+        # file名の長さ制限を超えるkeyはhashにする
+        if len(name) > 200:
+            name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._bucket_path(bucket), name)
+
+    def create_bucket(self, bucket: str):
+        os.makedirs(self._bucket_path(bucket), exist_ok=True)
+
+    def put_object(
+        self, bucket: str, key: str, stream: BinaryIO, length: Optional[int] = None
+    ) -> BlobInfo:
+        # 存在しないbucketへのputはbucketを作る(ローカル用途なので厳密にはしない)
+        self.create_bucket(bucket)
+        path = self._object_path(bucket, key)
+        md5 = hashlib.md5()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+            while length is None or size < length:
+                read_size = self._chunk_size
+                if length is not None:
+                    read_size = min(read_size, length - size)
+                chunk = stream.read(read_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                md5.update(chunk)
+                size += len(chunk)
+        os.replace(f.name, path)
+        etag = f'"{md5.hexdigest()}"'
+        with self._lock:
+            self._etags[path] = etag
+        return BlobInfo(size, etag)
+
+    def get_object(self, bucket: str, key: str) -> Blob:
+        path = self._object_path(bucket, key)
+        try:
+            return Blob(path, self._etags.get(path))
+        except FileNotFoundError:
+            raise NoSuchKey()
+
+    def head_object(self, bucket: str, key: str) -> BlobInfo:
+        path = self._object_path(bucket, key)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            raise NoSuchKey()
+        return BlobInfo(size, self._etags.get(path))
+
+    def delete_object(self, bucket: str, key: str):
+        path = self._object_path(bucket, key)
+        with self._lock:
+            self._etags.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # S3のDeleteObjectは存在しないkeyでも成功する
+            pass
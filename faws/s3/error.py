@@ -0,0 +1,20 @@
+class S3Error(Exception):
+    status_code = 400
+
+    @property
+    def message(self):
+        raise NotImplementedError
+
+
+class NoSuchKey(S3Error):
+    status_code = 404
+    message = "The specified key does not exist."
+
+
+class NoSuchBucket(S3Error):
+    status_code = 404
+    message = "The specified bucket does not exist."
+
+
+class InvalidBucketName(S3Error):
+    message = "The specified bucket is not valid."
@@ -0,0 +1,92 @@
+from typing import Dict
+from dict2xml import dict2xml
+from flask import Flask, Response, jsonify, request
+from faws.s3.blob_store import BlobStore
+from faws.s3.error import S3Error
+
+
+def error_response(error: S3Error, resource: str) -> Response:
+    return Response(
+        dict2xml(
+            {
+                "Error": {
+                    "Code": error.__class__.__name__,
+                    "Message": error.message,
+                    "Resource": resource,
+                }
+            }
+        ),
+        mimetype="application/xml",
+        status=error.status_code,
+    )
+
+
+def register_blob_routes(app: Flask, store: BlobStore):
+    # path style(/{bucket}/{key})のPutObject/GetObject/HeadObject/DeleteObjectのみ
+    app.extensions["blob_store"] = store
+
+    @app.route("/<bucket>", methods=["PUT"])
+    def s3_create_bucket(bucket: str):
+        try:
+            store.create_bucket(bucket)
+        except S3Error as e:
+            return error_response(e, f"/{bucket}")
+        return Response(status=200, headers={"Location": f"/{bucket}"})
+
+    @app.route("/<bucket>/<path:key>", methods=["PUT"])
+    def s3_put_object(bucket: str, key: str):
+        try:
+            info = store.put_object(bucket, key, request.stream, request.content_length)
+        except S3Error as e:
+            return error_response(e, f"/{bucket}/{key}")
+        return Response(status=200, headers={"ETag": info.etag})
+
+    @app.route("/<bucket>/<path:key>", methods=["GET", "HEAD"])
+    def s3_get_object(bucket: str, key: str):
+        try:
+            if request.method == "HEAD":
+                info = store.head_object(bucket, key)
+                blob = None
+            else:
+                blob = store.get_object(bucket, key)
+                info = blob
+        except S3Error as e:
+            return error_response(e, f"/{bucket}/{key}")
+        response = Response(
+            blob.iter_chunks() if blob is not None else [],
+            mimetype="application/octet-stream",
+            direct_passthrough=True,
+        )
+        response.content_length = info.size
+        if info.etag is not None:
+            response.headers["ETag"] = info.etag
+        return response
+
+    @app.route("/<bucket>/<path:key>", methods=["DELETE"])
+    def s3_delete_object(bucket: str, key: str):
+        try:
+            store.delete_object(bucket, key)
+        except S3Error as e:
+            return error_response(e, f"/{bucket}/{key}")
+        return Response(status=204)
+
+
+def register_ready_route(app: Flask):
+    app.extensions.setdefault("ready", True)
+
+    # /<bucket>/<path:key>より固定pathのruleが優先される
+    @app.route("/admin/ready", methods=["GET"])
+    def get_ready():
+        # shutdown中はload balancerから外れるように503を返す
+        ready = app.extensions["ready"]
+        return jsonify({"Ready": ready}), 200 if ready else 503
+
+
+def create_app(app_config: Dict = None):
+    app = Flask(__name__, instance_relative_config=True)
+    if app_config is not None:
+        app.config.update(app_config)
+    register_blob_routes(app, BlobStore(**app.config.get("BlobStoreConfig", {})))
+    register_ready_route(app)
+
+    return app
@@ -0,0 +1,88 @@
+import dataclasses
+import importlib
+import logging
+import signal
+import threading
+from typing import Dict
+from flask import Flask
+
+try:
+    from waitress.server import create_server
+except ImportError:  # pragma: no cover
+    create_server = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass()
+class ServeConfig:
+    host: str = "127.0.0.1"
+    port: int = 5000
+    threads: int = 8
+    # listen(2)のbacklog。CIのpeakで接続が溢れないように大きめにする
+    backlog: int = 1024
+    connection_limit: int = 1000
+    # keep-aliveの接続をidleのまま保持する秒数
+    keep_alive_timeout: int = 120
+    # SIGTERMからreadinessを落としたまま受け付け続ける秒数(load balancerが外すのを待つ)
+    drain_seconds: float = 5
+
+
+def load_app(service: str, app_config: Dict = None) -> Flask:
+    module = importlib.import_module(f"faws.{service}.server")
+    return module.create_app(app_config)
+
+
+def build_server(app: Flask, config: ServeConfig):
+    if create_server is None:
+        raise RuntimeError(
+            "faws serve requires the waitress package (pip install faws[serve])"
+        )
+    return create_server(
+        app,
+        host=config.host,
+        port=config.port,
+        threads=config.threads,
+        backlog=config.backlog,
+        connection_limit=config.connection_limit,
+        channel_timeout=config.keep_alive_timeout,
+        ident="faws",
+    )
+
+
+def shutdown_app(app: Flask):
+    app.extensions["ready"] = False
+    for hook in app.extensions.get("shutdown_hooks", []):
+        hook()
+
+
+def serve(app: Flask, config: ServeConfig):
+    server = build_server(app, config)
+
+    def stop(signum, frame):
+        # waitressのloopを抜ける(処理中のrequestはwaitressが待つ)
+        app.extensions["ready"] = False
+        raise SystemExit(0)
+
+    def drain(signum, frame):
+        # readinessを落としてdrain_seconds後に止める。その間もrequestは処理する
+        # もう一度SIGTERMが来たらすぐに止める
+        app.extensions["ready"] = False
+        if config.drain_seconds <= 0 or not hasattr(signal, "setitimer"):
+            raise SystemExit(0)
+        logger.info("draining for %s seconds", config.drain_seconds)
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGALRM, stop)
+        signal.setitimer(signal.ITIMER_REAL, config.drain_seconds)
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, drain)
+    app.extensions["ready"] = True
+    server.print_listen("Serving on http://{}:{}")
+    try:
+        server.run()
+    finally:
+        app.extensions["ready"] = False
+        server.close()
+        shutdown_app(app)
+        logger.info("faws stopped")
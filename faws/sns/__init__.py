@@ -0,0 +1,2 @@
+from faws.sns.topic import Subscription, Topic
+from faws.sns.topic_storage import TopicStorage
@@ -0,0 +1,140 @@
+from typing import Callable, Dict, Optional
+from faws.sns.error import InvalidParameter
+from faws.sns.filter_policy import Attributes
+from faws.sns.topic import SUBSCRIPTION_ATTRIBUTES
+from faws.sns.topic_storage import TopicStorage
+from faws.sqs.partition import Partition
+from faws.sqs.queue import Queue
+
+MAX_PUBLISH_BATCH_ENTRIES = 10
+
+QueueResolver = Callable[[str], Optional[Queue]]
+
+
+def _parse_members(request_data: Dict, prefix: str) -> Dict[str, Dict[str, str]]:
+    # Attributes.entry.1.key=k, Attributes.entry.1.value=v のようなformatを
+    # {"1": {"key": "k", "value": "v"}} にする
+    members = {}
+    for k, v in request_data.items():
+        if not k.startswith(f"{prefix}."):
+            continue
+        index, _, name = k[len(prefix) + 1 :].partition(".")
+        members.setdefault(index, {})[name] = v
+    return members
+
+
+def _parse_message_attributes(request_data: Dict) -> Attributes:
+    attributes = {}
+    for entry in _parse_members(request_data, "MessageAttributes.entry").values():
+        data_type = entry.get("Value.DataType")
+        if "Name" not in entry or data_type is None:
+            raise InvalidParameter("MessageAttributes: Name and DataType are required")
+        value = entry.get("Value.BinaryValue", entry.get("Value.StringValue"))
+        attributes[entry["Name"]] = (data_type, value)
+    return attributes
+
+
+def create_topic(
+    topics: TopicStorage, partition: Partition, Name: str, **kwargs
+) -> Dict:
+    topic = topics.create_topic(
+        f"arn:aws:sns:{partition.region}:{partition.account_id}:{Name}"
+    )
+    return {"TopicArn": topic.topic_arn}
+
+
+def list_topics(topics: TopicStorage, **kwargs) -> Dict:
+    return {
+        "Topics": {
+            "member": [{"TopicArn": topic.topic_arn} for topic in topics.get_topics()]
+        }
+    }
+
+
+def delete_topic(topics: TopicStorage, TopicArn: str, **kwargs):
+    topics.delete_topic(TopicArn)
+
+
+def subscribe(
+    topics: TopicStorage, TopicArn: str, Protocol: str, Endpoint: str, **kwargs
+) -> Dict:
+    if Protocol != "sqs":
+        raise InvalidParameter(f"Protocol {Protocol} is not supported")
+    attributes = {
+        entry["key"]: entry["value"]
+        for entry in _parse_members(kwargs, "Attributes.entry").values()
+    }
+    for name in attributes:
+        if name not in SUBSCRIPTION_ATTRIBUTES:
+            raise InvalidParameter(f"Attributes: {name} is not supported")
+    subscription = topics.get_topic(TopicArn).subscribe(Protocol, Endpoint, attributes)
+    return {"SubscriptionArn": subscription.subscription_arn}
+
+
+def unsubscribe(topics: TopicStorage, SubscriptionArn: str, **kwargs):
+    topic, subscription = topics.find_subscription(SubscriptionArn)
+    topic.unsubscribe(subscription.subscription_arn)
+
+
+def set_subscription_attributes(
+    topics: TopicStorage,
+    SubscriptionArn: str,
+    AttributeName: str,
+    AttributeValue: str = "",
+    **kwargs,
+):
+    if AttributeName not in SUBSCRIPTION_ATTRIBUTES:
+        raise InvalidParameter(f"AttributeName: {AttributeName} is not supported")
+    _, subscription = topics.find_subscription(SubscriptionArn)
+    subscription.set_attribute(AttributeName, AttributeValue)
+
+
+def list_subscriptions_by_topic(topics: TopicStorage, TopicArn: str, **kwargs) -> Dict:
+    return {
+        "Subscriptions": {
+            "member": [
+                {
+                    "SubscriptionArn": subscription.subscription_arn,
+                    "Protocol": subscription.protocol,
+                    "Endpoint": subscription.endpoint,
+                    "TopicArn": subscription.topic_arn,
+                }
+                for subscription in topics.get_topic(TopicArn).list_subscriptions()
+            ]
+        }
+    }
+
+
+def publish(
+    topics: TopicStorage,
+    resolve_queue: QueueResolver,
+    TopicArn: str,
+    Message: str,
+    Subject: str = None,
+    **kwargs,
+) -> Dict:
+    message_id, _ = topics.get_topic(TopicArn).publish(
+        Message, resolve_queue, Subject, _parse_message_attributes(kwargs)
+    )
+    return {"MessageId": message_id}
+
+
+def publish_batch(
+    topics: TopicStorage, resolve_queue: QueueResolver, TopicArn: str, **kwargs
+) -> Dict:
+    topic = topics.get_topic(TopicArn)
+    entries = _parse_members(kwargs, "PublishBatchRequestEntries.member")
+    if len(entries) > MAX_PUBLISH_BATCH_ENTRIES:
+        raise InvalidParameter(
+            "The batch request contains more entries than permissible."
+        )
+    successful = []
+    for _, entry in sorted(entries.items(), key=lambda item: int(item[0])):
+        message_id, _ = topic.publish(
+            entry["Message"],
+            resolve_queue,
+            entry.get("Subject"),
+            _parse_message_attributes(entry),
+        )
+        successful.append({"Id": entry["Id"], "MessageId": message_id})
+    return {"Successful": {"member": successful}, "Failed": {}}
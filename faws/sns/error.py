@@ -0,0 +1,30 @@
+class SNSError(Exception):
+    status_code = 400
+
+    @property
+    def message(self):
+        raise NotImplementedError
+
+    @property
+    def code(self):
+        return self.__class__.__name__
+
+
+class NotFound(SNSError):
+    status_code = 404
+
+    def __init__(self, resource: str = "Topic"):
+        self._resource = resource
+
+    @property
+    def message(self):
+        return f"{self._resource} does not exist"
+
+
+class InvalidParameter(SNSError):
+    def __init__(self, reason: str):
+        self._reason = reason
+
+    @property
+    def message(self):
+        return f"Invalid parameter: {self._reason}"
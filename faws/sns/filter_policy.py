@@ -0,0 +1,114 @@
+import json
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from faws.sns.error import InvalidParameter
+
+# attributeは{name: (DataType, value)}
+Attributes = Dict[str, Tuple[str, str]]
+Matcher = Callable[[Optional[Tuple[str, str]]], bool]
+
+_NUMERIC_OPERATORS = {
+    "=": lambda a, b: a == b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _to_number(attribute: Optional[Tuple[str, str]]) -> Optional[float]:
+    if attribute is None or not attribute[0].startswith("Number"):
+        return None
+    try:
+        return float(attribute[1])
+    except ValueError:
+        return None
+
+
+def _compile_numeric(conditions: List) -> Matcher:
+    if not isinstance(conditions, list) or len(conditions) % 2 != 0:
+        raise InvalidParameter(f"FilterPolicy: invalid numeric condition {conditions}")
+    checks = []
+    for i in range(0, len(conditions), 2):
+        if (
+            not isinstance(conditions[i], str)
+            or conditions[i] not in _NUMERIC_OPERATORS
+        ):
+            raise InvalidParameter(
+                f"FilterPolicy: unknown numeric operator {conditions[i]}"
+            )
+        value = conditions[i + 1]
+        # "abc"や[1]、true等は数値として扱わない
+        if isinstance(value, bool):
+            raise InvalidParameter(f"FilterPolicy: invalid numeric value {value}")
+        try:
+            checks.append((_NUMERIC_OPERATORS[conditions[i]], float(value)))
+        except (TypeError, ValueError):
+            raise InvalidParameter(f"FilterPolicy: invalid numeric value {value}")
+
+    def match(attribute):
+        value = _to_number(attribute)
+        return value is not None and all(op(value, v) for op, v in checks)
+
+    return match
+
+
+def _compile_condition(condition: Dict) -> Matcher:
+    if len(condition) != 1:
+        raise InvalidParameter(f"FilterPolicy: invalid condition {condition}")
+    operator, operand = next(iter(condition.items()))
+    if operator == "exists":
+        return lambda attribute: (attribute is not None) == bool(operand)
+    if operator == "prefix":
+        return lambda attribute: (
+            attribute is not None
+            and attribute[0].startswith("String")
+            and attribute[1].startswith(operand)
+        )
+    if operator == "numeric":
+        return _compile_numeric(operand)
+    if operator == "anything-but":
+        excluded = _compile_values(operand if isinstance(operand, list) else [operand])
+        return lambda attribute: attribute is not None and not excluded(attribute)
+    raise InvalidParameter(f"FilterPolicy: unknown operator {operator}")
+
+
+def _compile_values(values: List[Union[str, int, float, Dict]]) -> Matcher:
+    # 完全一致の値はsetにまとめて1回のlookupで判定する
+    strings = frozenset(v for v in values if isinstance(v, str))
+    numbers = frozenset(
+        float(v) for v in values if isinstance(v, (int, float)) and v is not True
+    )
+    matchers = [_compile_condition(v) for v in values if isinstance(v, dict)]
+
+    def match(attribute):
+        if attribute is not None:
+            if attribute[1] in strings and attribute[0].startswith("String"):
+                return True
+            if numbers and _to_number(attribute) in numbers:
+                return True
+        return any(m(attribute) for m in matchers)
+
+    return match
+
+
+def compile_filter_policy(
+    policy: Union[str, Dict, None],
+) -> Callable[[Attributes], bool]:
+    # subscribe時に1度だけcompileし、publishごとにはpolicyを解釈しない
+    if policy is None or policy == "":
+        return lambda attributes: True
+    if isinstance(policy, str):
+        try:
+            policy = json.loads(policy)
+        except ValueError:
+            raise InvalidParameter("FilterPolicy: failed to parse JSON")
+    matchers = []
+    for name, values in policy.items():
+        if not isinstance(values, list):
+            raise InvalidParameter(f"FilterPolicy: {name} must be an array")
+        matchers.append((name, _compile_values(values)))
+
+    def match(attributes: Attributes) -> bool:
+        return all(m(attributes.get(name)) for name, m in matchers)
+
+    return match
@@ -0,0 +1,107 @@
+from typing import Dict, Optional
+from flask import Flask, current_app, request
+from faws.sns.actions.topic import (
+    create_topic,
+    delete_topic,
+    list_subscriptions_by_topic,
+    list_topics,
+    publish,
+    publish_batch,
+    set_subscription_attributes,
+    subscribe,
+    unsubscribe,
+)
+from faws.sns.error import SNSError
+from faws.sns.topic_storage import TopicStorage
+from faws.sqs.error import NonExistentQueue
+from faws.sqs.partition import Partition, partition_from_request
+from faws.sqs.queue import Queue
+from faws.sqs.result import ErrorResult, Result, SuccessResult
+
+SNS_ACTIONS = {
+    "CreateTopic",
+    "ListTopics",
+    "DeleteTopic",
+    "Subscribe",
+    "Unsubscribe",
+    "SetSubscriptionAttributes",
+    "ListSubscriptionsByTopic",
+    "Publish",
+    "PublishBatch",
+}
+
+
+def resolve_queue(queue_arn: str) -> Optional[Queue]:
+    # arn:aws:sqs:{region}:{account_id}:{queue_name}
+    parts = queue_arn.split(":")
+    if len(parts) != 6 or parts[2] != "sqs":
+        return None
+    _, _, _, region, account_id, queue_name = parts
+    partitions = current_app.extensions["partitions"]
+    try:
+        return partitions.get(Partition(account_id, region)).get_queue(queue_name)
+    except NonExistentQueue:
+        return None
+
+
+def do_operation(request_data: Dict, request_id: str) -> Result:
+    action = request_data["Action"]
+    topics = current_app.extensions["topics"]
+    try:
+        if action == "CreateTopic":
+            partition = partition_from_request(
+                request.headers,
+                request.host,
+                current_app.extensions["partitions"].default_partition,
+                current_app.config.get("AccessKeyAccounts"),
+            )
+            return SuccessResult(
+                action, create_topic(topics, partition, **request_data), request_id
+            )
+        if action == "ListTopics":
+            return SuccessResult(
+                action, list_topics(topics, **request_data), request_id
+            )
+        if action == "DeleteTopic":
+            return SuccessResult(
+                action, delete_topic(topics, **request_data), request_id
+            )
+        if action == "Subscribe":
+            return SuccessResult(action, subscribe(topics, **request_data), request_id)
+        if action == "Unsubscribe":
+            return SuccessResult(
+                action, unsubscribe(topics, **request_data), request_id
+            )
+        if action == "SetSubscriptionAttributes":
+            return SuccessResult(
+                action, set_subscription_attributes(topics, **request_data), request_id
+            )
+        if action == "ListSubscriptionsByTopic":
+            return SuccessResult(
+                action, list_subscriptions_by_topic(topics, **request_data), request_id
+            )
+        if action == "Publish":
+            return SuccessResult(
+                action, publish(topics, resolve_queue, **request_data), request_id
+            )
+        if action == "PublishBatch":
+            return SuccessResult(
+                action, publish_batch(topics, resolve_queue, **request_data), request_id
+            )
+    except SNSError as e:
+        return ErrorResult(e, request_id, e.status_code)
+
+    raise NotImplementedError()
+
+
+def register_sns(app: Flask, **kwargs):
+    # SNSのactionはSQSと同じendpointで受け、topicからはprocess内のqueueに直接配送する
+    app.extensions["topics"] = TopicStorage(**kwargs)
+    for action in SNS_ACTIONS:
+        app.extensions["operations"][action] = do_operation
+
+
+def create_app(app_config: Dict = None):
+    from faws.sqs import server
+
+    return server.create_app({"SnsConfig": {}, **(app_config or {})})
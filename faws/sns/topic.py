@@ -0,0 +1,174 @@
+from __future__ import annotations
+import datetime
+import json
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from faws.sns.filter_policy import Attributes, compile_filter_policy
+from faws.sqs.error import OverLimit
+from faws.sqs.message import MessageBody
+from faws.sqs.queue import Queue
+
+SUBSCRIPTION_ATTRIBUTES = {"FilterPolicy", "RawMessageDelivery"}
+
+
+class Subscription:
+    def __init__(
+        self,
+        topic_arn: str,
+        protocol: str,
+        endpoint: str,
+        attributes: Dict[str, str] = None,
+    ):
+        self._subscription_arn = f"{topic_arn}:{uuid.uuid4()}"
+        self._topic_arn = topic_arn
+        self._protocol = protocol
+        self._endpoint = endpoint
+        self._attributes: Dict[str, str] = {}
+        self._matcher = compile_filter_policy(None)
+        for name, value in (attributes or {}).items():
+            self.set_attribute(name, value)
+
+    @property
+    def subscription_arn(self) -> str:
+        return self._subscription_arn
+
+    @property
+    def topic_arn(self) -> str:
+        return self._topic_arn
+
+    @property
+    def protocol(self) -> str:
+        return self._protocol
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint
+
+    @property
+    def attributes(self) -> Dict[str, str]:
+        return dict(self._attributes)
+
+    @property
+    def raw_message_delivery(self) -> bool:
+        return self._attributes.get("RawMessageDelivery", "false").lower() == "true"
+
+    def set_attribute(self, name: str, value: str):
+        if name == "FilterPolicy":
+            self._matcher = compile_filter_policy(value)
+        self._attributes[name] = value
+
+    def matches(self, attributes: Attributes) -> bool:
+        return self._matcher(attributes)
+
+
+class Topic:
+    def __init__(self, topic_arn: str):
+        self._topic_arn = topic_arn
+        self._subscriptions: Dict[str, Subscription] = {}
+
+    @property
+    def topic_arn(self) -> str:
+        return self._topic_arn
+
+    @property
+    def name(self) -> str:
+        return self._topic_arn.rsplit(":", 1)[-1]
+
+    def subscribe(
+        self, protocol: str, endpoint: str, attributes: Dict[str, str] = None
+    ) -> Subscription:
+        subscription = Subscription(self.topic_arn, protocol, endpoint, attributes)
+        # 追加時にdictを差し替え、publish中のiterationと競合しないようにする
+        self._subscriptions = {
+            **self._subscriptions,
+            subscription.subscription_arn: subscription,
+        }
+        return subscription
+
+    def unsubscribe(self, subscription_arn: str) -> bool:
+        if subscription_arn not in self._subscriptions:
+            return False
+        subscriptions = dict(self._subscriptions)
+        del subscriptions[subscription_arn]
+        self._subscriptions = subscriptions
+        return True
+
+    def get_subscription(self, subscription_arn: str) -> Optional[Subscription]:
+        return self._subscriptions.get(subscription_arn)
+
+    def list_subscriptions(self) -> List[Subscription]:
+        return list(self._subscriptions.values())
+
+    def publish(
+        self,
+        message: str,
+        resolve_queue: Callable[[str], Optional[Queue]],
+        subject: Optional[str] = None,
+        attributes: Attributes = None,
+    ) -> Tuple[str, int]:
+        message_id = str(uuid.uuid4())
+        attributes = attributes or {}
+        # bodyはpublishごとに(raw/envelopeそれぞれ)1つだけ作り、全queueで共有する
+        bodies: Dict[bool, MessageBody] = {}
+        sqs_attributes = None
+        delivered = 0
+        for subscription in self._subscriptions.values():
+            if not subscription.matches(attributes):
+                continue
+            queue = resolve_queue(subscription.endpoint)
+            if queue is None:
+                continue
+            raw = subscription.raw_message_delivery
+            if raw not in bodies:
+                bodies[raw] = MessageBody.build(
+                    message.encode("utf-8")
+                    if raw
+                    else self._envelope(message_id, message, subject, attributes)
+                )
+            if raw and sqs_attributes is None:
+                sqs_attributes = _sqs_message_attributes(attributes)
+            try:
+                queue.add_message(
+                    bodies[raw], message_attributes=sqs_attributes if raw else None
+                )
+            except OverLimit:
+                # memory budgetを超えたqueueには届けない(publish自体は成功させる)
+                continue
+            delivered += 1
+        return message_id, delivered
+
+    def _envelope(
+        self,
+        message_id: str,
+        message: str,
+        subject: Optional[str],
+        attributes: Attributes,
+    ) -> bytes:
+        timestamp = datetime.datetime.utcnow().isoformat(timespec="milliseconds")
+        envelope = {
+            "Type": "Notification",
+            "MessageId": message_id,
+            "TopicArn": self.topic_arn,
+            "Message": message,
+            "Timestamp": f"{timestamp}Z",
+            "SignatureVersion": "1",
+        }
+        if subject is not None:
+            envelope["Subject"] = subject
+        if attributes:
+            envelope["MessageAttributes"] = {
+                name: {"Type": data_type, "Value": value}
+                for name, (data_type, value) in attributes.items()
+            }
+        return json.dumps(envelope).encode("utf-8")
+
+
+def _sqs_message_attributes(attributes: Attributes) -> Dict[str, str]:
+    # SQSのSendMessageのrequest dataと同じ形にする
+    sqs_attributes = {}
+    for i, (name, (data_type, value)) in enumerate(attributes.items(), 1):
+        sqs_attributes[f"MessageAttribute.{i}.Name"] = name
+        sqs_attributes[f"MessageAttribute.{i}.Value.DataType"] = data_type
+        value_key = "BinaryValue" if data_type.startswith("Binary") else "StringValue"
+        sqs_attributes[f"MessageAttribute.{i}.Value.{value_key}"] = value
+    return sqs_attributes
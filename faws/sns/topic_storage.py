@@ -0,0 +1,37 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from faws.sns.error import NotFound
+from faws.sns.topic import Subscription, Topic
+
+
+class TopicStorage:
+    def __init__(self, **kwargs):
+        self._topics: Dict[str, Topic] = {}
+        self._lock = threading.Lock()
+
+    def create_topic(self, topic_arn: str) -> Topic:
+        with self._lock:
+            if topic_arn not in self._topics:
+                self._topics[topic_arn] = Topic(topic_arn)
+            return self._topics[topic_arn]
+
+    def get_topic(self, topic_arn: str) -> Topic:
+        if topic_arn not in self._topics:
+            raise NotFound()
+        return self._topics[topic_arn]
+
+    def get_topics(self) -> List[Topic]:
+        return list(self._topics.values())
+
+    def delete_topic(self, topic_arn: str):
+        with self._lock:
+            self._topics.pop(topic_arn, None)
+
+    def find_subscription(self, subscription_arn: str) -> Tuple[Topic, Subscription]:
+        topic_arn = subscription_arn.rsplit(":", 1)[0]
+        subscription: Optional[Subscription] = None
+        if topic_arn in self._topics:
+            subscription = self._topics[topic_arn].get_subscription(subscription_arn)
+        if subscription is None:
+            raise NotFound("Subscription")
+        return self._topics[topic_arn], subscription
@@ -1,5 +1,11 @@
-from typing import Dict, List
-from faws.sqs.message import MessageAttribute
+from typing import Dict, List, Union
+from faws.sqs.error import InvalidParameterValue
+from faws.sqs.message import (
+    MAX_MESSAGE_SIZE,
+    Message,
+    MessageAttribute,
+    message_size,
+)
 from faws.sqs.queue import name_from_url
 from faws.sqs.queue_storage import QueueStorage
 
@@ -7,7 +13,7 @@ from faws.sqs.queue_storage import QueueStorage
 def send_message(
     queues: QueueStorage,
     QueueUrl: str,
-    MessageBody: str,
+    MessageBody: Union[str, bytes],
     DelaySeconds: str = 0,
     **kwargs
 ) -> Dict:
@@ -17,6 +23,10 @@ def send_message(
     # MessageAttribute.1.Name': 'City', 'MessageAttribute.1.Value.DataType': 'String'
     # のようなフォーマットで来るのでMessageAttributeを持つkwargsのsetを取得する
     message_attributes = {k: v for k, v in kwargs.items() if "MessageAttribute" in k}
+    if message_size(MessageBody, message_attributes) > MAX_MESSAGE_SIZE:
+        raise InvalidParameterValue(
+            f"Message must be shorter than {MAX_MESSAGE_SIZE} bytes."
+        )
     message = queue.add_message(
         MessageBody,
         message_attributes=message_attributes,
@@ -35,6 +45,7 @@ def receive_message(
     QueueUrl: str,
     VisibilityTimeout: str = None,
     MaxNumberOfMessages: str = None,
+    WaitTimeSeconds: str = None,
     **kwargs
 ) -> Dict:
     queue_name = name_from_url(QueueUrl)
@@ -43,34 +54,39 @@ def receive_message(
         k: v for k, v in kwargs.items() if "MessageAttribute" in k
     }
     messages = queue.get_message(
-        visibility_timeout=int(VisibilityTimeout)
-        if VisibilityTimeout is not None
-        else None,
-        max_number_of_messages=int(MaxNumberOfMessages)
-        if MaxNumberOfMessages is not None
-        else 1,
+        visibility_timeout=(
+            int(VisibilityTimeout) if VisibilityTimeout is not None else None
+        ),
+        max_number_of_messages=(
+            int(MaxNumberOfMessages) if MaxNumberOfMessages is not None else 1
+        ),
+        # requestを待たせることはしない(待ち時間はFaultConfigのempty_receiveで再現する)
+        long_poll=WaitTimeSeconds is not None and int(WaitTimeSeconds) > 0,
     )
     if not messages:
         return {}
 
-    message_data_list = []
-    for message in messages:
-        message_data = {
-            "MessageId": message.message_id,
-            "ReceiptHandle": "barbar",
-            "MD5OFBody": "hogehoge",
-            "Body": message.message_body,
-        }
+    return {
+        "Message": [
+            message_data(message, list(message_attribute_names.values()))
+            for message in messages
+        ]
+    }
 
-        if len(message_attribute_names) == 0:
-            message_data_list.append(message_data)
-            continue
-        message_data["MessageAttribute"] = _select_message_attribute(
-            message.message_attributes, list(message_attribute_names.values())
-        )
-        message_data_list.append(message_data)
 
-    return {"Message": message_data_list}
+def message_data(message: Message, message_attribute_names: List[str]) -> Dict:
+    data = {
+        "MessageId": message.message_id,
+        "ReceiptHandle": "barbar",
+        "MD5OFBody": "hogehoge",
+        "Body": message.message_body,
+    }
+    if len(message_attribute_names) == 0 or message.message_attributes is None:
+        return data
+    data["MessageAttribute"] = _select_message_attribute(
+        message.message_attributes, message_attribute_names
+    )
+    return data
 
 
 def _select_message_attribute(
@@ -0,0 +1,263 @@
+import gzip
+import os
+import uuid
+from flask import Flask, Response, abort, jsonify, request
+from faws.sqs.capture import TrafficRecorder
+from faws.sqs.error import NonExistentQueue, SQSError
+from faws.sqs.event_source import command_handler
+from faws.sqs.memory import memory_report
+from faws.sqs.partition import partition_from_url
+from faws.sqs.queue import Queue, name_from_url
+from faws.sqs.transfer import (
+    FORMATS,
+    NDJSON,
+    decode_messages,
+    encode_messages,
+    export_messages,
+    import_messages,
+)
+
+
+def _optional(convert, value):
+    return None if value is None else convert(value)
+
+
+def register_admin_routes(app: Flask):
+    app.extensions["snapshots"] = {}
+    app.extensions.setdefault("ready", True)
+
+    def find_queue(queue_url: str, create: bool = False) -> Queue:
+        partitions = app.extensions["partitions"]
+        partition = partition_from_url(queue_url) or partitions.default_partition
+        try:
+            queue_name = name_from_url(queue_url)
+        except ValueError:
+            abort(400)
+        if create:
+            return partitions.get(partition).create_queue(queue_name)
+        try:
+            return partitions.get(partition).get_queue(queue_name)
+        except NonExistentQueue:
+            abort(404)
+
+    @app.route("/admin/ready", methods=["GET"])
+    def get_ready():
+        # shutdown中はload balancerから外れるように503を返す
+        ready = app.extensions["ready"]
+        return jsonify({"Ready": ready}), 200 if ready else 503
+
+    @app.route("/admin/profiler", methods=["GET"])
+    def get_profiler():
+        return jsonify(app.extensions["profiler"].status())
+
+    @app.route("/admin/profiler", methods=["POST"])
+    def update_profiler():
+        profiler = app.extensions["profiler"]
+        params = request.get_json(silent=True) or {}
+        if "Enabled" in params:
+            profiler.enabled = bool(params["Enabled"])
+        if "SampleEvery" in params:
+            profiler.sample_every = max(int(params["SampleEvery"]), 1)
+        return jsonify(profiler.status())
+
+    @app.route("/admin/profiler/dump", methods=["POST"])
+    def dump_profiler():
+        return jsonify({"Files": app.extensions["profiler"].dump()})
+
+    @app.route("/admin/profiler/reset", methods=["POST"])
+    def reset_profiler():
+        profiler = app.extensions["profiler"]
+        profiler.reset()
+        return jsonify(profiler.status())
+
+    @app.route("/admin/capture", methods=["GET"])
+    def get_capture():
+        recorder = app.extensions["recorder"]
+        return jsonify(recorder.status() if recorder is not None else {})
+
+    @app.route("/admin/capture", methods=["POST"])
+    def start_capture():
+        # CaptureConfigのdirectoryの下の相対pathにだけ書ける
+        directory = app.extensions["capture_directory"]
+        if directory is None:
+            abort(404)
+        params = request.get_json(silent=True) or {}
+        path = params.get("Path")
+        if (
+            not isinstance(path, str)
+            or not path
+            or os.path.isabs(path)
+            or ".." in path.replace("\\", "/").split("/")
+        ):
+            abort(400)
+        directory = os.path.realpath(directory)
+        path = os.path.realpath(os.path.join(directory, path))
+        if os.path.commonpath([directory, path]) != directory:
+            abort(400)
+        if app.extensions["recorder"] is not None:
+            app.extensions["recorder"].close()
+        app.extensions["recorder"] = TrafficRecorder(path)
+        return jsonify(app.extensions["recorder"].status())
+
+    @app.route("/admin/capture", methods=["DELETE"])
+    def stop_capture():
+        recorder = app.extensions["recorder"]
+        if recorder is None:
+            abort(404)
+        app.extensions["recorder"] = None
+        recorder.close()
+        return jsonify(recorder.status())
+
+    @app.route("/admin/slow-requests", methods=["GET"])
+    def get_slow_requests():
+        slow_log = app.extensions["slow_log"]
+        if slow_log is None:
+            abort(404)
+        return jsonify(dict(slow_log.status(), Requests=slow_log.recent()))
+
+    @app.route("/admin/memory", methods=["GET"])
+    def get_memory():
+        try:
+            top = int(request.args.get("Top", 10))
+        except ValueError:
+            abort(400)
+        if top < 0:
+            abort(400)
+        return jsonify(
+            memory_report(
+                app.extensions["partitions"], app.extensions["memory_budget"], top
+            )
+        )
+
+    @app.route("/admin/hibernate", methods=["POST"])
+    def hibernate_queues():
+        # 設定の間隔を待たずにidleなqueueをhibernateする
+        storages = app.extensions["partitions"].partitions.values()
+        hibernated = sum(storage.hibernate_idle() for storage in storages)
+        return jsonify(
+            {
+                "Hibernated": hibernated,
+                "ResidentQueues": sum(len(s.queues) for s in storages),
+                "HibernatedQueues": sum(len(s.hibernated) for s in storages),
+            }
+        )
+
+    @app.route("/admin/snapshots", methods=["GET"])
+    def list_snapshots():
+        return jsonify({"SnapshotIds": list(app.extensions["snapshots"].keys())})
+
+    @app.route("/admin/snapshots", methods=["POST"])
+    def create_snapshot():
+        snapshot_id = str(uuid.uuid4())
+        app.extensions["snapshots"][snapshot_id] = app.extensions[
+            "partitions"
+        ].snapshot()
+        return jsonify({"SnapshotId": snapshot_id})
+
+    @app.route("/admin/snapshots/<snapshot_id>/restore", methods=["POST"])
+    def restore_snapshot(snapshot_id: str):
+        if snapshot_id not in app.extensions["snapshots"]:
+            abort(404)
+        app.extensions["partitions"].restore(app.extensions["snapshots"][snapshot_id])
+        return jsonify({"SnapshotId": snapshot_id})
+
+    @app.route("/admin/snapshots/<snapshot_id>", methods=["DELETE"])
+    def delete_snapshot(snapshot_id: str):
+        snapshot = app.extensions["snapshots"].pop(snapshot_id, None)
+        if snapshot is None:
+            abort(404)
+        app.extensions["partitions"].release_snapshot(snapshot)
+        return jsonify({"SnapshotId": snapshot_id})
+
+    @app.route("/admin/event-source-mappings", methods=["GET"])
+    def list_event_source_mappings():
+        return jsonify(
+            {
+                "EventSourceMappings": [
+                    mapping.describe()
+                    for mapping in app.extensions["event_source_mappings"].list()
+                ]
+            }
+        )
+
+    @app.route("/admin/event-source-mappings", methods=["POST"])
+    def create_event_source_mapping():
+        # HTTPからはEventSourceCommandsに登録されたcommandを名前で指定する
+        # (python callableはapi経由)。設定がなければこのendpointは使えない
+        commands = app.config.get("EventSourceCommands")
+        if not commands:
+            abort(404)
+        params = request.get_json(silent=True) or {}
+        command = params.get("Command")
+        if "QueueUrl" not in params or not isinstance(command, str):
+            abort(400)
+        if command not in commands:
+            abort(400)
+        try:
+            timeout = _optional(float, params.get("Timeout"))
+            kwargs = dict(
+                batch_size=int(params.get("BatchSize", 10)),
+                batch_window=float(params.get("MaximumBatchingWindowInSeconds", 0)),
+                concurrency=int(params.get("Concurrency", 1)),
+                visibility_timeout=_optional(int, params.get("VisibilityTimeout")),
+                failure_visibility_timeout=_optional(
+                    int, params.get("FailureVisibilityTimeout")
+                ),
+            )
+        except (TypeError, ValueError):
+            abort(400)
+        queue = find_queue(params["QueueUrl"])
+        mapping = app.extensions["event_source_mappings"].create(
+            queue, command_handler(commands[command], timeout), **kwargs
+        )
+        return jsonify(mapping.describe())
+
+    @app.route("/admin/event-source-mappings/<mapping_uuid>", methods=["GET"])
+    def get_event_source_mapping(mapping_uuid: str):
+        mapping = app.extensions["event_source_mappings"].get(mapping_uuid)
+        if mapping is None:
+            abort(404)
+        return jsonify(mapping.describe())
+
+    @app.route("/admin/event-source-mappings/<mapping_uuid>", methods=["DELETE"])
+    def delete_event_source_mapping(mapping_uuid: str):
+        if not app.extensions["event_source_mappings"].delete(mapping_uuid):
+            abort(404)
+        return jsonify({"UUID": mapping_uuid})
+
+    @app.route("/admin/queues/export", methods=["GET"])
+    def export_queue():
+        format_ = request.args.get("Format", NDJSON)
+        if "QueueUrl" not in request.args or format_ not in FORMATS:
+            abort(400)
+        queue = find_queue(request.args["QueueUrl"])
+        return Response(
+            encode_messages(export_messages(queue), format_),
+            mimetype=(
+                "application/x-ndjson"
+                if format_ == NDJSON
+                else "application/octet-stream"
+            ),
+        )
+
+    @app.route("/admin/queues/import", methods=["POST"])
+    def import_queue():
+        # bodyはstreamのまま読み、chunkごとにstorageへ入れる
+        format_ = request.args.get("Format", NDJSON)
+        if "QueueUrl" not in request.args or format_ not in FORMATS:
+            abort(400)
+        queue = find_queue(request.args["QueueUrl"], create=True)
+        stream = request.stream
+        if request.headers.get("Content-Encoding") == "gzip":
+            stream = gzip.GzipFile(fileobj=stream)
+        # 途中で失敗しても、それまでのchunkは入っているので件数を返す
+        stats = {}
+        try:
+            import_messages(queue, decode_messages(stream, format_), stats=stats)
+        except SQSError as e:
+            return jsonify({"Code": e.code, "Message": e.message, **stats}), (
+                e.status_code
+            )
+        except ValueError as e:
+            return jsonify({"Message": str(e), **stats}), 400
+        return jsonify(stats)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import datetime
+import json
+import os
+from typing import Dict, Generator, List
+from faws.sqs.message import MessageAttribute, generate_uuids
+from faws.sqs.partition import Partition, PartitionedQueueStorage
+from faws.sqs.queue import Queue, Tag
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None
+
+# bootstrapで設定できるqueueのattribute
+SUPPORTED_ATTRIBUTES = {"VisibilityTimeout"}
+
+
+def load_bootstrap_file(path: str) -> Dict:
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError(
+                    "yaml bootstrap files require the pyyaml package "
+                    "(pip install faws[bootstrap])"
+                )
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def read_message_file(path: str) -> Generator[Dict]:
+    # 1行に1 message(SendMessageのparameterと同じkeyのjson)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def bootstrap(
+    partitions: PartitionedQueueStorage,
+    path: str = None,
+    queues: List[Dict] = None,
+    base_dir: str = None,
+    **kwargs,
+) -> Dict[str, int]:
+    # HTTPやactionを通さずにQueueStorageへ直接queueとmessageを入れる
+    if path is not None:
+        queues = load_bootstrap_file(path).get("Queues", [])
+        if base_dir is None:
+            base_dir = os.path.dirname(os.path.abspath(path))
+    base_dir = base_dir or os.getcwd()
+    num_messages = 0
+    for queue_config in queues or []:
+        queue = _create_queue(partitions, queue_config)
+        messages = list(queue_config.get("Messages", []))
+        for message_file in queue_config.get("MessageFiles", []):
+            messages.extend(read_message_file(os.path.join(base_dir, message_file)))
+        _add_messages(queue, messages)
+        num_messages += len(messages)
+    return {"Queues": len(queues or []), "Messages": num_messages}
+
+
+def _create_queue(partitions: PartitionedQueueStorage, queue_config: Dict) -> Queue:
+    if "QueueName" not in queue_config:
+        raise ValueError(f"QueueName is required: {queue_config}")
+    attributes = queue_config.get("Attributes", {})
+    unsupported = set(attributes) - SUPPORTED_ATTRIBUTES
+    if unsupported:
+        raise ValueError(
+            f"Unsupported attributes for {queue_config['QueueName']}: "
+            f"{', '.join(sorted(unsupported))}"
+        )
+    storage = partitions.default
+    if "AccountId" in queue_config or "Region" in queue_config:
+        storage = partitions.get(
+            Partition(
+                str(
+                    queue_config.get(
+                        "AccountId", partitions.default_partition.account_id
+                    )
+                ),
+                queue_config.get("Region", partitions.default_partition.region),
+            )
+        )
+    queue = storage.create_queue(
+        queue_config["QueueName"],
+        default_visibility_timeout=int(attributes.get("VisibilityTimeout", 30)),
+    )
+    for key, value in queue_config.get("Tags", {}).items():
+        queue.set_tag(Tag(key, str(value)))
+    return queue
+
+
+def _add_messages(queue: Queue, messages: List[Dict]):
+    # idと追加時刻はまとめて用意し、storageには1回で入れる
+    inserted_at = datetime.datetime.now()
+    queue.add_messages(
+        [
+            queue.build_message(
+                message["MessageBody"],
+                message_attributes=MessageAttribute.to_request_data(
+                    message.get("MessageAttributes")
+                ),
+                delay_seconds=int(message.get("DelaySeconds", 0)),
+                message_id=message_id,
+                inserted_at=inserted_at,
+            )
+            for message, message_id in zip(messages, generate_uuids(len(messages)))
+        ]
+    )
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import dataclasses
+import gzip
+import json
+import queue
+import struct
+import threading
+import time
+from typing import BinaryIO, Dict, Iterator, Optional
+from flask import Request, Response
+
+# timestamp, 処理時間(ms), status, connection/headers/bodyの長さ
+RECORD_HEADER = struct.Struct("<dfHHHI")
+CAPTURED_HEADERS = (
+    "Authorization",
+    "Host",
+    "Content-Type",
+    "User-Agent",
+    "X-Amz-Date",
+    "X-Amz-Security-Token",
+)
+
+
+@dataclasses.dataclass()
+class Record:
+    timestamp: float
+    duration_ms: float
+    status: int
+    connection: str
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def action(self) -> str:
+        for param in self.body.split(b"&"):
+            if param.startswith(b"Action="):
+                return param[len(b"Action=") :].decode("utf-8", errors="replace")
+        return "Unknown"
+
+
+def open_capture(path: str, mode: str) -> BinaryIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def write_record(f: BinaryIO, record: Record):
+    connection = record.connection.encode("utf-8")
+    headers = json.dumps(record.headers, separators=(",", ":")).encode("utf-8")
+    f.write(
+        RECORD_HEADER.pack(
+            record.timestamp,
+            record.duration_ms,
+            record.status,
+            len(connection),
+            len(headers),
+            len(record.body),
+        )
+    )
+    f.write(connection)
+    f.write(headers)
+    f.write(record.body)
+
+
+def read_records(path: str) -> Iterator[Record]:
+    with open_capture(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            (
+                timestamp,
+                duration_ms,
+                status,
+                connection_length,
+                headers_length,
+                body_length,
+            ) = RECORD_HEADER.unpack(header)
+            connection = f.read(connection_length).decode("utf-8")
+            headers = json.loads(f.read(headers_length))
+            yield Record(
+                timestamp,
+                duration_ms,
+                status,
+                connection,
+                headers,
+                f.read(body_length),
+            )
+
+
+class TrafficRecorder:
+    # requestを処理するthreadではqueueに積むだけにし、fileへの書き込みは別threadで行う
+    # 書き込みが追いつかない時はrequestを待たせずにrecordを捨てる
+    def __init__(
+        self,
+        path: str,
+        headers=CAPTURED_HEADERS,
+        max_pending: int = 10000,
+    ):
+        self.path = path
+        self.recorded = 0
+        self.dropped = 0
+        self._headers = headers
+        self._pending: queue.Queue = queue.Queue(max_pending)
+        self._file = open_capture(path, "wb")
+        self._writer = threading.Thread(
+            target=self._write, name="faws-capture", daemon=True
+        )
+        self._writer.start()
+
+    def record_request(self, request: Request, response: Response, started: float):
+        record = Record(
+            started,
+            (time.time() - started) * 1000,
+            response.status_code,
+            f"{request.environ.get('REMOTE_ADDR')}:{request.environ.get('REMOTE_PORT')}",
+            {k: request.headers[k] for k in self._headers if k in request.headers},
+            request.get_data(),
+        )
+        try:
+            self._pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            record: Optional[Record] = self._pending.get()
+            if record is None:
+                break
+            write_record(self._file, record)
+            self.recorded += 1
+        self._file.close()
+
+    def close(self):
+        self._pending.put(None)
+        self._writer.join()
+
+    def status(self) -> Dict:
+        return {
+            "Path": self.path,
+            "Recorded": self.recorded,
+            "Dropped": self.dropped,
+            "Pending": self._pending.qsize(),
+        }
@@ -0,0 +1,218 @@
+from __future__ import annotations
+import re
+import uuid
+from typing import Dict, List, Optional
+from faws.sqs.actions.message import send_message, receive_message
+from faws.sqs.actions.queue import (
+    create_queue,
+    get_queue_url,
+    get_list_queues,
+    delete_queue,
+    purge_queue,
+    tag_queue,
+    list_queue_tags,
+    untag_queue,
+)
+from faws.sqs.error import SQSError
+from faws.sqs.queue_storage import (
+    QueueStorage,
+    QueuesStorageType,
+    build_queues_storage,
+)
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _response(data: Dict) -> Dict:
+    data["ResponseMetadata"] = {"RequestId": str(uuid.uuid4()), "HTTPStatusCode": 200}
+    return data
+
+
+class Client:
+    # boto3のsqs clientと同じmethod名、戻り値の形でaction層を直接呼び出す
+    # HTTP、parse_request_data、xmlの生成を通らないのでテストから使うと速い
+    def __init__(self, queues: QueueStorage = None):
+        if queues is None:
+            queues = build_queues_storage(QueuesStorageType.IN_MEMORY)
+        self._queues = queues
+
+    @property
+    def queues(self) -> QueueStorage:
+        return self._queues
+
+    def create_queue(
+        self, QueueName: str, Attributes: Dict = None, tags: Dict = None
+    ) -> Dict:
+        result = create_queue(self._queues, QueueName)
+        if tags:
+            self.tag_queue(result["QueueUrl"], tags)
+        return _response({"QueueUrl": result["QueueUrl"]})
+
+    def get_queue_url(self, QueueName: str, **kwargs) -> Dict:
+        return _response(get_queue_url(self._queues, QueueName))
+
+    def list_queues(self, QueueNamePrefix: str = None, **kwargs) -> Dict:
+        queue_urls = _as_list(get_list_queues(self._queues).get("QueueUrl"))
+        if QueueNamePrefix is not None:
+            queue_urls = [
+                url
+                for url in queue_urls
+                if url.rsplit("/", 1)[-1].startswith(QueueNamePrefix)
+            ]
+        if len(queue_urls) == 0:
+            return _response({})
+        return _response({"QueueUrls": queue_urls})
+
+    def delete_queue(self, QueueUrl: str) -> Dict:
+        delete_queue(self._queues, QueueUrl)
+        return _response({})
+
+    def purge_queue(self, QueueUrl: str) -> Dict:
+        purge_queue(self._queues, QueueUrl)
+        return _response({})
+
+    def tag_queue(self, QueueUrl: str, Tags: Dict[str, str]) -> Dict:
+        request_tags = {}
+        for i, (key, value) in enumerate(Tags.items(), 1):
+            request_tags[f"Tag.{i}.Key"] = key
+            request_tags[f"Tag.{i}.Value"] = value
+        tag_queue(self._queues, QueueUrl, **request_tags)
+        return _response({})
+
+    def untag_queue(self, QueueUrl: str, TagKeys: List[str]) -> Dict:
+        untag_queue(
+            self._queues,
+            QueueUrl,
+            **{f"TagKey.{i}": key for i, key in enumerate(TagKeys, 1)},
+        )
+        return _response({})
+
+    def list_queue_tags(self, QueueUrl: str) -> Dict:
+        tags = _as_list(list_queue_tags(self._queues, QueueUrl).get("Tag"))
+        if len(tags) == 0:
+            return _response({})
+        return _response({"Tags": {tag["Key"]: tag["Value"] for tag in tags}})
+
+    def send_message(
+        self,
+        QueueUrl: str,
+        MessageBody: str,
+        DelaySeconds: int = 0,
+        MessageAttributes: Dict[str, Dict] = None,
+        **kwargs,
+    ) -> Dict:
+        request_attributes = {}
+        for i, (name, value) in enumerate((MessageAttributes or {}).items(), 1):
+            request_attributes[f"MessageAttribute.{i}.Name"] = name
+            request_attributes[f"MessageAttribute.{i}.Value.DataType"] = value[
+                "DataType"
+            ]
+            if "BinaryValue" in value:
+                request_attributes[f"MessageAttribute.{i}.Value.BinaryValue"] = value[
+                    "BinaryValue"
+                ]
+            else:
+                request_attributes[f"MessageAttribute.{i}.Value.StringValue"] = value[
+                    "StringValue"
+                ]
+        result = send_message(
+            self._queues,
+            QueueUrl,
+            MessageBody,
+            DelaySeconds=DelaySeconds,
+            **request_attributes,
+        )
+        response = {
+            "MD5OfMessageBody": result["MD5OfMessageBody"],
+            "MessageId": result["MessageId"],
+        }
+        if request_attributes:
+            response["MD5OfMessageAttributes"] = result["MD5OfMessageAttributes"]
+        return _response(response)
+
+    def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = None,
+        VisibilityTimeout: int = None,
+        MessageAttributeNames: List[str] = None,
+        WaitTimeSeconds: int = None,
+        **kwargs,
+    ) -> Dict:
+        result = receive_message(
+            self._queues,
+            QueueUrl,
+            VisibilityTimeout=VisibilityTimeout,
+            MaxNumberOfMessages=MaxNumberOfMessages,
+            WaitTimeSeconds=WaitTimeSeconds,
+            **{
+                f"MessageAttributeName.{i}": name
+                for i, name in enumerate(MessageAttributeNames or [], 1)
+            },
+        )
+        messages = []
+        for message_data in _as_list(result.get("Message")):
+            message = {
+                "MessageId": message_data["MessageId"],
+                "ReceiptHandle": message_data["ReceiptHandle"],
+                "MD5OfBody": message_data["MD5OFBody"],
+                "Body": message_data["Body"],
+            }
+            attributes = message_data.get("MessageAttribute")
+            if attributes:
+                message["MessageAttributes"] = {
+                    attribute["Name"]: attribute["Value"] for attribute in attributes
+                }
+            messages.append(message)
+        if len(messages) == 0:
+            return _response({})
+        return _response({"Messages": messages})
+
+
+class _EmbeddedHttpResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b""
+        self.raw = None
+
+
+def _method_name(operation_name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", operation_name).lower()
+
+
+def install_botocore_hook(boto_client, client: Client):
+    # boto3.client("sqs")の呼び出しをHTTPに出さずにembedded clientへ流す
+    # before-parameter-buildで元のparameterを退避し、before-callで結果を返してshort circuitする
+    events = boto_client.meta.events
+
+    def stash_params(params, context, **kwargs):
+        context["faws_params"] = dict(params)
+
+    def call_embedded(model, context, **kwargs):
+        method = getattr(client, _method_name(model.name), None)
+        if method is None:
+            raise NotImplementedError(model.name)
+        try:
+            parsed = method(**context.get("faws_params", {}))
+        except SQSError as e:
+            parsed = {
+                "Error": {
+                    "Code": e.code,
+                    "Message": e.message,
+                    "Type": "Sender",
+                },
+                "ResponseMetadata": {"HTTPStatusCode": e.status_code},
+            }
+            return _EmbeddedHttpResponse(e.status_code), parsed
+        return _EmbeddedHttpResponse(200), parsed
+
+    events.register("before-parameter-build.sqs", stash_params)
+    events.register("before-call.sqs", call_embedded)
+    return boto_client
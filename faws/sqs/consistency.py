@@ -0,0 +1,421 @@
+from __future__ import annotations
+import collections
+import dataclasses
+import multiprocessing
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue import Queue
+
+SEND = "Send"
+RECEIVE = "Receive"
+DELETE = "Delete"
+CHANGE_VISIBILITY = "ChangeVisibility"
+
+DUPLICATE_DELIVERY = "DuplicateDelivery"
+LOST_MESSAGE = "LostMessage"
+REDELIVERED_AFTER_DELETE = "RedeliveredAfterDelete"
+UNKNOWN_MESSAGE = "UnknownMessage"
+
+MESSAGE_ID_PATTERN = re.compile(rb"<MessageId>([^<]+)</MessageId>")
+
+
+@dataclasses.dataclass()
+class Operation:
+    worker: str
+    kind: str
+    # 呼び出し前後の時刻(time.time)。操作はこの間のどこかで起きたとみなす
+    started: float
+    finished: float
+    message_ids: List[str]
+    visibility_timeout: Optional[int] = None
+    ok: bool = True
+
+
+@dataclasses.dataclass()
+class Violation:
+    kind: str
+    message_id: str
+    detail: str
+
+    def to_dict(self) -> Dict:
+        return {"Kind": self.kind, "MessageId": self.message_id, "Detail": self.detail}
+
+
+@dataclasses.dataclass()
+class StressConfig:
+    workers: int = 8
+    duration: float = 5.0
+    # trueならworkerをprocessにする(HTTPのみ)
+    processes: bool = False
+    send_ratio: float = 0.5
+    delete_ratio: float = 0.6
+    change_visibility_ratio: float = 0.2
+    visibility_timeouts: Sequence[int] = (1, 2)
+    max_number_of_messages: int = 10
+    # serverとclientの時計、timestampの丸めの分の許容誤差(秒)
+    tolerance: float = 0.05
+    seed: Optional[int] = None
+
+
+class InProcessTarget:
+    # QueueのmethodをそのままHTTPを通さずに呼ぶ
+    supports_delete = True
+
+    def __init__(self, queue: Queue):
+        self._queue = queue
+
+    def send(self, body: str) -> str:
+        return self._queue.add_message(body).message_id
+
+    def receive(
+        self,
+        visibility_timeout: int,
+        max_number_of_messages: int,
+        long_poll: bool = False,
+    ) -> List:
+        messages = self._queue.get_message(
+            visibility_timeout=visibility_timeout,
+            max_number_of_messages=max_number_of_messages,
+            long_poll=long_poll,
+        )
+        return [message.message_id for message in messages]
+
+    def delete(self, message_id: str) -> bool:
+        return self._queue.delete_message(message_id)
+
+    def change_visibility(self, message_id: str, visibility_timeout: int):
+        self._queue.change_message_visibility(message_id, visibility_timeout)
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    # DeleteMessage / ChangeMessageVisibilityはserverにないので、send/receiveだけを行う
+    supports_delete = False
+
+    def __init__(self, endpoint: str, queue_url: str):
+        self._client = QueryClient(endpoint)
+        self._queue_url = queue_url
+
+    def send(self, body: str) -> str:
+        response = self._client.call(
+            "SendMessage", QueueUrl=self._queue_url, MessageBody=body
+        )
+        if not response.ok:
+            raise RuntimeError(response.body.decode("utf-8", errors="replace"))
+        return MESSAGE_ID_PATTERN.search(response.body).group(1).decode("utf-8")
+
+    def receive(
+        self,
+        visibility_timeout: int,
+        max_number_of_messages: int,
+        long_poll: bool = False,
+    ) -> List:
+        params = {
+            "QueueUrl": self._queue_url,
+            "VisibilityTimeout": str(visibility_timeout),
+            "MaxNumberOfMessages": str(max_number_of_messages),
+        }
+        if long_poll:
+            params["WaitTimeSeconds"] = "1"
+        response = self._client.call("ReceiveMessage", **params)
+        if not response.ok:
+            raise RuntimeError(response.body.decode("utf-8", errors="replace"))
+        return [m.decode("utf-8") for m in MESSAGE_ID_PATTERN.findall(response.body)]
+
+    def close(self):
+        self._client.close()
+
+
+def _call(history: List[Operation], worker: str, kind: str, f: Callable, **kwargs):
+    started = time.time()
+    try:
+        result = f()
+    except Exception:
+        history.append(Operation(worker, kind, started, time.time(), [], ok=False))
+        return None
+    finished = time.time()
+    if kind == SEND:
+        message_ids = [result]
+    elif kind == RECEIVE:
+        message_ids = result
+    else:
+        message_ids = [kwargs.pop("message_id")]
+    # 存在しないmessageへのdeleteはFalseが返る
+    ok = result is not False
+    history.append(
+        Operation(worker, kind, started, finished, message_ids, ok=ok, **kwargs)
+    )
+    return result
+
+
+def run_worker(
+    worker: str, target, config: StressConfig, deadline: float
+) -> List[Operation]:
+    rng = random.Random(None if config.seed is None else f"{config.seed}-{worker}")
+    history: List[Operation] = []
+    sequence = 0
+    while time.time() < deadline:
+        if rng.random() < config.send_ratio:
+            sequence += 1
+            body = f"{worker}-{sequence}"
+            _call(history, worker, SEND, lambda: target.send(body))
+            continue
+        visibility_timeout = rng.choice(config.visibility_timeouts)
+        message_ids = _call(
+            history,
+            worker,
+            RECEIVE,
+            lambda: target.receive(visibility_timeout, config.max_number_of_messages),
+            visibility_timeout=visibility_timeout,
+        )
+        if not target.supports_delete:
+            continue
+        for message_id in message_ids or []:
+            r = rng.random()
+            if r < config.delete_ratio:
+                _call(
+                    history,
+                    worker,
+                    DELETE,
+                    lambda: target.delete(message_id),
+                    message_id=message_id,
+                )
+            elif r < config.delete_ratio + config.change_visibility_ratio:
+                timeout = rng.choice((0,) + tuple(config.visibility_timeouts))
+                _call(
+                    history,
+                    worker,
+                    CHANGE_VISIBILITY,
+                    lambda: target.change_visibility(message_id, timeout),
+                    message_id=message_id,
+                    visibility_timeout=timeout,
+                )
+            # 残りはそのまま放置してvisibility timeout後の再配信を待つ
+    return history
+
+
+def drain(target, config: StressConfig) -> List[Operation]:
+    # 処理中のmessageが全て見えるようになるのを待ってから、残りを全て受信する
+    # 分割したqueueの短いpollingは空を返すことがあるので、long pollingで受信する
+    # (visibilityが壊れていても終わるように、新しいmessageが来なくなったら止める)
+    time.sleep(max(config.visibility_timeouts) + config.tolerance)
+    history: List[Operation] = []
+    drained = set()
+    drain_timeout = 3600
+    while True:
+        message_ids = _call(
+            history,
+            "drain",
+            RECEIVE,
+            lambda: target.receive(
+                drain_timeout, config.max_number_of_messages, long_poll=True
+            ),
+            visibility_timeout=drain_timeout,
+        )
+        if not message_ids or drained.issuperset(message_ids):
+            return history
+        drained.update(message_ids)
+
+
+def run_stress(
+    target_factory: Callable[[], object], config: StressConfig
+) -> List[Operation]:
+    deadline = time.time() + config.duration
+    histories: List[List[Operation]] = [[] for _ in range(config.workers)]
+
+    def run(i: int):
+        target = target_factory()
+        try:
+            histories[i] = run_worker(f"worker-{i}", target, config, deadline)
+        finally:
+            target.close()
+
+    threads = [
+        threading.Thread(target=run, args=(i,), name=f"faws-stress-{i}")
+        for i in range(config.workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    target = target_factory()
+    try:
+        histories.append(drain(target, config))
+    finally:
+        target.close()
+    return [operation for history in histories for operation in history]
+
+
+def run_in_process(queue: Queue, config: StressConfig) -> List[Operation]:
+    if config.processes:
+        raise ValueError("in-process stress tests can only use threads")
+    return run_stress(lambda: InProcessTarget(queue), config)
+
+
+def _run_http_worker(
+    worker: str,
+    endpoint: str,
+    queue_url: str,
+    config: StressConfig,
+    deadline: float,
+    results,
+):
+    target = HttpTarget(endpoint, queue_url)
+    try:
+        results.put(run_worker(worker, target, config, deadline))
+    finally:
+        target.close()
+
+
+def run_http(endpoint: str, queue_url: str, config: StressConfig) -> List[Operation]:
+    if not config.processes:
+        return run_stress(lambda: HttpTarget(endpoint, queue_url), config)
+    results = multiprocessing.Queue()
+    deadline = time.time() + config.duration
+    processes = [
+        multiprocessing.Process(
+            target=_run_http_worker,
+            args=(f"worker-{i}", endpoint, queue_url, config, deadline, results),
+        )
+        for i in range(config.workers)
+    ]
+    for p in processes:
+        p.start()
+    # processのjoin前にqueueを空にしないとpipe bufferが詰まってdeadlockする
+    history = [operation for _ in processes for operation in results.get()]
+    for p in processes:
+        p.join()
+    target = HttpTarget(endpoint, queue_url)
+    try:
+        history.extend(drain(target, config))
+    finally:
+        target.close()
+    return history
+
+
+def check_history(history: List[Operation], tolerance: float = 0.05) -> List[Violation]:
+    # SQSのmodelに照らして、どの線形化の順序でも説明できない履歴をviolationとする
+    # - visibility timeoutの間に同じmessageが2回受信された
+    # - 成功したsendのmessageが1度も受信されていない(最後にdrainする前提)
+    # - deleteが返った後にそのmessageが受信された
+    # - sendされていないmessageが受信された
+    sends: Dict[str, Operation] = {}
+    receives: Dict[str, List[Operation]] = collections.defaultdict(list)
+    deletes: Dict[str, List[Operation]] = collections.defaultdict(list)
+    changes: Dict[str, List[Operation]] = collections.defaultdict(list)
+    failed_sends = 0
+    for operation in history:
+        if operation.kind == SEND:
+            if operation.ok:
+                sends[operation.message_ids[0]] = operation
+            else:
+                failed_sends += 1
+        elif operation.kind == RECEIVE:
+            for message_id in operation.message_ids:
+                receives[message_id].append(operation)
+        elif operation.kind == DELETE and operation.ok:
+            deletes[operation.message_ids[0]].append(operation)
+        elif operation.kind == CHANGE_VISIBILITY and operation.ok:
+            changes[operation.message_ids[0]].append(operation)
+
+    violations = []
+    for message_id, send in sends.items():
+        if message_id not in receives:
+            violations.append(
+                Violation(LOST_MESSAGE, message_id, f"sent by {send.worker}")
+            )
+    for message_id, received in receives.items():
+        received.sort(key=lambda operation: operation.started)
+        send = sends.get(message_id)
+        # sendが失敗(timeout等)した時は、serverには届いていた可能性がある
+        if (send is None and failed_sends == 0) or (
+            send is not None and received[0].finished + tolerance < send.started
+        ):
+            violations.append(
+                Violation(
+                    UNKNOWN_MESSAGE,
+                    message_id,
+                    f"received by {received[0].worker} before it was sent",
+                )
+            )
+        for previous, current in zip(received, received[1:]):
+            # 時間が重なる受信はどちらが先に起きたかわからないので、両方の順序を試す
+            message_changes = changes.get(message_id, [])
+            if _redelivered_too_early(
+                previous, current, message_changes, tolerance
+            ) and _redelivered_too_early(current, previous, message_changes, tolerance):
+                violations.append(
+                    Violation(
+                        DUPLICATE_DELIVERY,
+                        message_id,
+                        f"received by {previous.worker} and {current.worker} "
+                        f"{current.finished - previous.started:.3f}s apart "
+                        f"(visibility timeout {previous.visibility_timeout}s)",
+                    )
+                )
+        for delete in deletes.get(message_id, []):
+            redelivered = [
+                r for r in received if r.started > delete.finished + tolerance
+            ]
+            if redelivered:
+                violations.append(
+                    Violation(
+                        REDELIVERED_AFTER_DELETE,
+                        message_id,
+                        f"deleted by {delete.worker}, "
+                        f"received again by {redelivered[0].worker}",
+                    )
+                )
+    return violations
+
+
+def _redelivered_too_early(
+    first: Operation, second: Operation, changes: List[Operation], tolerance: float
+) -> bool:
+    # firstを最も早い時刻、その後のvisibilityの変更も最も早い時刻に置いても
+    # まだ見えないはずの時にsecondが終わっていれば、この順序では説明できない
+    if second.finished < first.started:
+        return True
+    visible_at = first.started + first.visibility_timeout
+    for change in changes:
+        if change.finished > first.started and change.started < second.finished:
+            visible_at = min(visible_at, change.started + change.visibility_timeout)
+    return second.finished + tolerance < visible_at
+
+
+def summarize(history: List[Operation], violations: List[Violation]) -> Dict:
+    counts = collections.Counter(operation.kind for operation in history)
+    errors = collections.Counter(
+        operation.kind for operation in history if not operation.ok
+    )
+    return {
+        "Operations": dict(counts),
+        "Errors": dict(errors),
+        "Messages": len(
+            {
+                operation.message_ids[0]
+                for operation in history
+                if operation.kind == SEND and operation.ok
+            }
+        ),
+        "Violations": [violation.to_dict() for violation in violations],
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        "operations: "
+        + " ".join(f"{k}={v}" for k, v in sorted(report["Operations"].items())),
+        f"messages: {report['Messages']}  violations: {len(report['Violations'])}",
+    ]
+    for violation in report["Violations"][:20]:
+        lines.append(
+            f"  {violation['Kind']} {violation['MessageId']}: {violation['Detail']}"
+        )
+    return "\n".join(lines)
@@ -1,8 +1,48 @@
 class SQSError(Exception):
+    status_code = 400
+
     @property
     def message(self):
         raise NotImplementedError
 
+    @property
+    def code(self):
+        return f"AWS.SimpleQueueService.{self.__class__.__name__}"
+
 
 class NonExistentQueue(SQSError):
     message = "The specified queue does not exist for this wsdl version."
+
+
+class InvalidParameterValue(SQSError):
+    def __init__(self, reason: str):
+        self._reason = reason
+
+    @property
+    def message(self):
+        return f"One or more parameters are invalid. Reason: {self._reason}"
+
+
+class RequestThrottled(SQSError):
+    # botocoreはこのcode(403)をthrottlingとしてbackoffしながらretryする
+    code = "RequestThrottled"
+    status_code = 403
+    message = "Request is throttled."
+
+
+class InternalError(SQSError):
+    code = "InternalError"
+    status_code = 500
+    message = "We encountered an internal error. Please try again."
+
+
+class OverLimit(SQSError):
+    code = "OverLimit"
+    status_code = 403
+
+    def __init__(self, reason: str):
+        self._reason = reason
+
+    @property
+    def message(self):
+        return self._reason
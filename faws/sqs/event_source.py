@@ -0,0 +1,266 @@
+import dataclasses
+import json
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Union
+from faws.sqs.message import Message
+from faws.sqs.queue import Queue
+
+Handler = Callable[[Dict], Optional[Dict]]
+
+# shutdown時にhandlerの終了を待つ秒数
+STOP_TIMEOUT = 10
+
+
+def build_event(queue: Queue, messages: List[Message]) -> Dict:
+    # lambdaのSQS triggerと同じ形のevent
+    region = queue.partition.region if queue.partition is not None else "us-east-1"
+    account_id = (
+        queue.partition.account_id if queue.partition is not None else "000000000000"
+    )
+    return {
+        "Records": [
+            {
+                "messageId": message.message_id,
+                "receiptHandle": message.message_id,
+                "body": message.message_body,
+                "attributes": {},
+                "messageAttributes": {
+                    name: attribute.to_dict()
+                    for name, attribute in (message.message_attributes or {}).items()
+                },
+                "eventSource": "aws:sqs",
+                "eventSourceARN": f"arn:aws:sqs:{region}:{account_id}:{queue.queue_name}",
+                "awsRegion": region,
+            }
+            for message in messages
+        ]
+    }
+
+
+def command_handler(
+    command: Union[str, List[str]], timeout: Optional[float] = None
+) -> Handler:
+    # eventをjsonでstdinに渡し、stdoutがjsonならbatchItemFailuresとして扱う
+    # shellは通さない(文字列はshlexで分割する)
+    args = shlex.split(command) if isinstance(command, str) else list(command)
+
+    def handle(event: Dict) -> Optional[Dict]:
+        completed = subprocess.run(
+            args,
+            input=json.dumps(event).encode(),
+            stdout=subprocess.PIPE,
+            timeout=timeout,
+            check=True,
+        )
+        try:
+            return json.loads(completed.stdout)
+        except ValueError:
+            return None
+
+    return handle
+
+
+@dataclasses.dataclass()
+class MappingMetrics:
+    started_at: float = dataclasses.field(default_factory=time.monotonic)
+    batches: int = 0
+    messages: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    handler_errors: int = 0
+    handler_seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "Batches": self.batches,
+            "Messages": self.messages,
+            "Succeeded": self.succeeded,
+            "Failed": self.failed,
+            "HandlerErrors": self.handler_errors,
+            "MessagesPerSecond": self.messages / elapsed if elapsed > 0 else 0.0,
+            "AverageBatchSeconds": (
+                self.handler_seconds / self.batches if self.batches else 0.0
+            ),
+        }
+
+
+class EventSourceMapping:
+    def __init__(
+        self,
+        queue: Queue,
+        handler: Handler,
+        batch_size: int = 10,
+        batch_window: float = 0,
+        concurrency: int = 1,
+        visibility_timeout: Optional[int] = None,
+        failure_visibility_timeout: Optional[int] = None,
+        poll_seconds: float = 1,
+    ):
+        self.uuid = str(uuid.uuid4())
+        self.queue = queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.failure_visibility_timeout = failure_visibility_timeout
+        self._handler = handler
+        self._poll_seconds = poll_seconds
+        self._metrics = MappingMetrics()
+        self._metrics_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._workers: List[threading.Thread] = []
+        # 動いている間はqueueをpinしてhibernateされないようにする
+        self._pinned = False
+        self._pin_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return any(worker.is_alive() for worker in self._workers)
+
+    def start(self):
+        self._stopped.clear()
+        with self._pin_lock:
+            if not self._pinned:
+                self.queue.pin()
+                self._pinned = True
+        self._metrics = MappingMetrics()
+        self._workers = [
+            threading.Thread(
+                target=self._run, name=f"faws-esm-{self.uuid}-{i}", daemon=True
+            )
+            for i in range(self.concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        # timeoutはworker毎ではなく全体で待つ秒数
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+        self._unpin_if_idle()
+
+    def _unpin_if_idle(self):
+        # 処理中のworkerが残っている間はpinを外さない(最後に抜けたworkerが外す)
+        current = threading.current_thread()
+        with self._pin_lock:
+            if not self._pinned or not self._stopped.is_set():
+                return
+            if any(w.is_alive() for w in self._workers if w is not current):
+                return
+            self.queue.unpin()
+            self._pinned = False
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                messages = self._poll()
+                if messages:
+                    self._invoke(messages)
+        finally:
+            self._unpin_if_idle()
+
+    def _poll(self) -> List[Message]:
+        # batch_sizeに達するかbatch_windowが過ぎるまでmessageを集める
+        messages = self.queue.get_message(
+            self.visibility_timeout, self.batch_size, wait_seconds=self._poll_seconds
+        )
+        if not messages or self.batch_window <= 0:
+            return messages
+        deadline = time.monotonic() + self.batch_window
+        while len(messages) < self.batch_size and not self._stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            messages.extend(
+                self.queue.get_message(
+                    self.visibility_timeout,
+                    self.batch_size - len(messages),
+                    wait_seconds=remaining,
+                )
+            )
+        return messages
+
+    def _invoke(self, messages: List[Message]):
+        started = time.monotonic()
+        try:
+            response = self._handler(build_event(self.queue, messages))
+            failed_ids = {
+                failure["itemIdentifier"]
+                for failure in (response or {}).get("batchItemFailures", [])
+            }
+            # batchに含まれないidや重複は数えない
+            failed_ids &= {message.message_id for message in messages}
+            handler_error = False
+        except Exception:
+            failed_ids = {message.message_id for message in messages}
+            handler_error = True
+        elapsed = time.monotonic() - started
+
+        # 成功したmessageは削除し、失敗したmessageはvisibility timeout後に再び処理される
+        for message in messages:
+            if message.message_id not in failed_ids:
+                self.queue.delete_message(message.message_id)
+            elif self.failure_visibility_timeout is not None:
+                self.queue.change_message_visibility(
+                    message.message_id, self.failure_visibility_timeout
+                )
+        with self._metrics_lock:
+            self._metrics.batches += 1
+            self._metrics.messages += len(messages)
+            self._metrics.failed += len(failed_ids)
+            self._metrics.succeeded += len(messages) - len(failed_ids)
+            self._metrics.handler_errors += int(handler_error)
+            self._metrics.handler_seconds += elapsed
+
+    def describe(self) -> Dict:
+        with self._metrics_lock:
+            metrics = self._metrics.to_dict()
+        return {
+            "UUID": self.uuid,
+            "EventSourceArn": self.queue.queue_url,
+            "BatchSize": self.batch_size,
+            "MaximumBatchingWindowInSeconds": self.batch_window,
+            "Concurrency": self.concurrency,
+            "State": "Enabled" if self.running else "Disabled",
+            "Metrics": metrics,
+        }
+
+
+class EventSourceMappings:
+    def __init__(self):
+        self._mappings: Dict[str, EventSourceMapping] = {}
+        self._lock = threading.Lock()
+
+    def create(self, queue: Queue, handler: Handler, **kwargs) -> EventSourceMapping:
+        mapping = EventSourceMapping(queue, handler, **kwargs)
+        with self._lock:
+            self._mappings[mapping.uuid] = mapping
+        mapping.start()
+        return mapping
+
+    def get(self, mapping_uuid: str) -> Optional[EventSourceMapping]:
+        return self._mappings.get(mapping_uuid)
+
+    def list(self) -> List[EventSourceMapping]:
+        return list(self._mappings.values())
+
+    def delete(self, mapping_uuid: str) -> bool:
+        with self._lock:
+            mapping = self._mappings.pop(mapping_uuid, None)
+        if mapping is None:
+            return False
+        mapping.stop(STOP_TIMEOUT)
+        return True
+
+    def stop_all(self, timeout: Optional[float] = STOP_TIMEOUT):
+        for mapping in self.list():
+            mapping.stop(timeout)
@@ -0,0 +1,100 @@
+import bisect
+import enum
+import itertools
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+from faws.sqs.error import InternalError, RequestThrottled
+from faws.sqs.result import Result, SuccessResult
+
+
+class LatencyDistribution(enum.Enum):
+    FIXED = "fixed"
+    NORMAL = "normal"
+    LOGNORMAL = "lognormal"
+    HISTOGRAM = "histogram"
+
+
+def build_latency(
+    distribution: str = "fixed",
+    ms: float = 0,
+    mean_ms: float = 0,
+    stddev_ms: float = 0,
+    median_ms: float = 0,
+    sigma: float = 0,
+    buckets: List[List[float]] = None,
+) -> Callable[[random.Random], float]:
+    # 返すのは秒
+    distribution = LatencyDistribution(distribution)
+    if distribution == LatencyDistribution.FIXED:
+        return lambda rng: ms / 1000
+    if distribution == LatencyDistribution.NORMAL:
+        return lambda rng: max(rng.gauss(mean_ms, stddev_ms), 0) / 1000
+    if distribution == LatencyDistribution.LOGNORMAL:
+        mu = math.log(median_ms)
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    # 本番で計測した [[latency_ms, 件数], ...] のhistogramから引く
+    values = [b[0] for b in buckets]
+    cumulative = list(itertools.accumulate(b[1] for b in buckets))
+    return (
+        lambda rng: values[
+            bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+        ]
+        / 1000
+    )
+
+
+class ActionFault:
+    def __init__(
+        self, latency: Dict = None, error_rate: float = 0, throttle_rate: float = 0
+    ):
+        self.latency = build_latency(**latency) if latency is not None else None
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+
+class FaultInjector:
+    # requestを処理するthreadの中でsleepするだけなので、threadedなserverなら他のrequestは待たない
+    def __init__(
+        self,
+        actions: Dict[str, Dict] = None,
+        empty_receive: Dict = None,
+        seed: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._actions = {
+            action: ActionFault(**config) for action, config in (actions or {}).items()
+        }
+        self._empty_receive = (
+            build_latency(**empty_receive) if empty_receive is not None else None
+        )
+        self._random = random.Random(seed)
+        self._sleep = sleep
+
+    def _fault(self, action: str) -> Optional[ActionFault]:
+        return self._actions.get(action, self._actions.get("*"))
+
+    def before(self, action: str):
+        fault = self._fault(action)
+        if fault is None:
+            return
+        if fault.latency is not None:
+            self._sleep(fault.latency(self._random))
+        if fault.throttle_rate and self._random.random() < fault.throttle_rate:
+            raise RequestThrottled()
+        if fault.error_rate and self._random.random() < fault.error_rate:
+            raise InternalError()
+
+    def after(self, action: str, request_data: Dict, result: Result):
+        # long pollingの空のReceiveMessageは、WaitTimeSecondsを上限に遅れて返ってくるようにする
+        if (
+            self._empty_receive is None
+            or action != "ReceiveMessage"
+            or not isinstance(result, SuccessResult)
+            or result.result_data
+        ):
+            return
+        wait_time_seconds = int(request_data.get("WaitTimeSeconds", 0))
+        if wait_time_seconds > 0:
+            self._sleep(min(self._empty_receive(self._random), wait_time_seconds))
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import datetime
+import json
+import os
+import struct
+from typing import Dict
+from faws.sqs.queue import Queue, Tag
+from faws.sqs.transfer import (
+    BINARY,
+    decode_messages,
+    encode_messages,
+    export_messages,
+    import_messages,
+)
+
+# queueの設定(json)の長さ
+METADATA_HEADER = struct.Struct("<I")
+
+
+def hibernate(queue: Queue, path: str):
+    # queueの設定とmessage(exportと同じbinary形式)を1つのfileに書く
+    metadata = json.dumps(
+        {
+            "QueueName": queue.queue_name,
+            "DefaultVisibilityTimeout": queue.default_visibility_timeout,
+            "CreatedAt": queue.created_at.timestamp(),
+            "Tags": {tag.name: tag.value for tag in queue.list_tags()},
+        }
+    ).encode("utf-8")
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(METADATA_HEADER.pack(len(metadata)))
+        f.write(metadata)
+        for chunk in encode_messages(export_messages(queue), BINARY):
+            f.write(chunk)
+    os.replace(f"{path}.tmp", path)
+
+
+def rehydrate(path: str, **queue_kwargs) -> Queue:
+    with open(path, "rb") as f:
+        (length,) = METADATA_HEADER.unpack(f.read(METADATA_HEADER.size))
+        metadata: Dict = json.loads(f.read(length))
+        queue = Queue(
+            metadata["QueueName"],
+            default_visibility_timeout=metadata["DefaultVisibilityTimeout"],
+            created_at=datetime.datetime.fromtimestamp(metadata["CreatedAt"]),
+            **queue_kwargs,
+        )
+        for name, value in metadata["Tags"].items():
+            queue.set_tag(Tag(name, value))
+        # 元々あったmessageなのでmemory budgetでは拒否しない
+        import_messages(queue, decode_messages(f, BINARY), check_budget=False)
+    return queue
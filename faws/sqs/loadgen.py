@@ -0,0 +1,207 @@
+from __future__ import annotations
+import dataclasses
+import http.client
+import multiprocessing
+import queue
+import random
+import string
+import time
+from typing import Dict, List, Optional
+from faws.sqs.query_client import QueryClient
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if len(sorted_values) == 0:
+        return 0.0
+    index = min(int(round(p / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+@dataclasses.dataclass()
+class LoadConfig:
+    endpoint: str
+    queue_name: str = "faws-bench"
+    producers: int = 1
+    consumers: int = 1
+    duration: float = 10.0
+    message_size: int = 256
+    attribute_count: int = 0
+    batch_size: int = 1
+    visibility_timeout: Optional[int] = None
+
+
+@dataclasses.dataclass()
+class WorkerResult:
+    role: str
+    requests: int
+    messages: int
+    errors: int
+    latencies: List[float]
+
+
+def random_body(size: int) -> str:
+    return "".join(random.choice(string.ascii_letters) for _ in range(size))
+
+
+def message_attribute_params(attribute_count: int) -> Dict[str, str]:
+    params = {}
+    for i in range(1, attribute_count + 1):
+        params[f"MessageAttribute.{i}.Name"] = f"attr{i}"
+        params[f"MessageAttribute.{i}.Value.DataType"] = "String"
+        params[f"MessageAttribute.{i}.Value.StringValue"] = f"value{i}"
+    return params
+
+
+def queue_url_for(config: LoadConfig) -> str:
+    client = QueryClient(config.endpoint)
+    try:
+        response = client.call("CreateQueue", QueueName=config.queue_name)
+        if not response.ok:
+            raise RuntimeError(response.body.decode())
+        body = response.body.decode()
+        return body[body.index("<QueueUrl>") + 10 : body.index("</QueueUrl>")]
+    finally:
+        client.close()
+
+
+def produce(config: LoadConfig, queue_url: str, deadline: float) -> WorkerResult:
+    client = QueryClient(config.endpoint)
+    params = {"QueueUrl": queue_url, "MessageBody": random_body(config.message_size)}
+    params.update(message_attribute_params(config.attribute_count))
+    result = WorkerResult("producer", 0, 0, 0, [])
+    while time.time() < deadline:
+        t = time.perf_counter()
+        result.requests += 1
+        try:
+            response = client.call("SendMessage", **params)
+        except (OSError, http.client.HTTPException):
+            # timeout等もerrorとして数え、次のrequestでconnectionを張り直す
+            client.close()
+            result.errors += 1
+            continue
+        result.latencies.append(time.perf_counter() - t)
+        if response.ok:
+            result.messages += 1
+        else:
+            result.errors += 1
+    client.close()
+    return result
+
+
+def consume(config: LoadConfig, queue_url: str, deadline: float) -> WorkerResult:
+    client = QueryClient(config.endpoint)
+    params = {
+        "QueueUrl": queue_url,
+        "MaxNumberOfMessages": str(config.batch_size),
+        "MessageAttribute.1.Name": "All",
+    }
+    if config.visibility_timeout is not None:
+        params["VisibilityTimeout"] = str(config.visibility_timeout)
+    result = WorkerResult("consumer", 0, 0, 0, [])
+    while time.time() < deadline:
+        t = time.perf_counter()
+        result.requests += 1
+        try:
+            response = client.call("ReceiveMessage", **params)
+        except (OSError, http.client.HTTPException):
+            # timeout等もerrorとして数え、次のrequestでconnectionを張り直す
+            client.close()
+            result.errors += 1
+            continue
+        result.latencies.append(time.perf_counter() - t)
+        if response.ok:
+            result.messages += response.body.count(b"<MessageId>")
+        else:
+            result.errors += 1
+    client.close()
+    return result
+
+
+def _run_worker(
+    role: str, config: LoadConfig, queue_url: str, deadline: float, results
+):
+    worker = produce if role == "producer" else consume
+    try:
+        result = worker(config, queue_url, deadline)
+    except Exception:
+        # 何もputしないと親processが待ち続けるので、errorとして返す
+        result = WorkerResult(role, 0, 0, 1, [])
+    results.put(result)
+
+
+def _collect_results(results, processes) -> List[WorkerResult]:
+    # signal等で結果を返さずに終了したprocessがあっても待ち続けない
+    worker_results = []
+    while len(worker_results) < len(processes):
+        try:
+            worker_results.append(results.get(timeout=1))
+        except queue.Empty:
+            if not any(p.is_alive() for p in processes) and results.empty():
+                break
+    return worker_results
+
+
+def summarize(role: str, results: List[WorkerResult], elapsed: float) -> Dict:
+    latencies = sorted(l for r in results for l in r.latencies)
+    requests = sum(r.requests for r in results)
+    messages = sum(r.messages for r in results)
+    return {
+        "role": role,
+        "workers": len(results),
+        "requests": requests,
+        "messages": messages,
+        "errors": sum(r.errors for r in results),
+        "requests_per_second": requests / elapsed,
+        "messages_per_second": messages / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def run_load(config: LoadConfig) -> Dict:
+    queue_url = queue_url_for(config)
+    results = multiprocessing.Queue()
+    started_at = time.time()
+    deadline = started_at + config.duration
+    processes = [
+        multiprocessing.Process(
+            target=_run_worker, args=(role, config, queue_url, deadline, results)
+        )
+        for role, n in (("producer", config.producers), ("consumer", config.consumers))
+        for _ in range(n)
+    ]
+    for p in processes:
+        p.start()
+    # processのjoin前にqueueを空にしないとpipe bufferが詰まってdeadlockする
+    worker_results = _collect_results(results, processes)
+    for p in processes:
+        p.join()
+    elapsed = time.time() - started_at
+
+    return {
+        "queue_url": queue_url,
+        "duration": elapsed,
+        "producers": summarize(
+            "producer", [r for r in worker_results if r.role == "producer"], elapsed
+        ),
+        "consumers": summarize(
+            "consumer", [r for r in worker_results if r.role == "consumer"], elapsed
+        ),
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"queue: {report['queue_url']}  duration: {report['duration']:.1f}s"]
+    for key in ("producers", "consumers"):
+        s = report[key]
+        if s["workers"] == 0:
+            continue
+        lines.append(
+            f"{key:<10} workers={s['workers']:<3} "
+            f"req/s={s['requests_per_second']:.1f} msg/s={s['messages_per_second']:.1f} "
+            f"errors={s['errors']} p50={s['p50_ms']:.2f}ms p90={s['p90_ms']:.2f}ms "
+            f"p99={s['p99_ms']:.2f}ms max={s['max_ms']:.2f}ms"
+        )
+    return "\n".join(lines)
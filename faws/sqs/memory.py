@@ -0,0 +1,136 @@
+from __future__ import annotations
+import tempfile
+import threading
+from typing import Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from faws.sqs.partition import PartitionedQueueStorage
+
+REJECT = "reject"
+SPILL = "spill"
+
+
+class SpillFile:
+    # budgetを超えたmessageのbodyを追記していくfile。領域は再利用しない
+    def __init__(self, directory: str = None):
+        self._file = tempfile.TemporaryFile(prefix="faws-spill-", dir=directory)
+        self._end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._end
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            offset = self._end
+            self._file.seek(offset)
+            self._file.write(data)
+            self._end += len(data)
+            return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            self._file.flush()
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def close(self):
+        self._file.close()
+
+
+class MemoryBudget:
+    # 全queue合計とqueueごとのmessageのmemory(Message.memory_size)の上限
+    # 超える時はsendを拒否するか(reject)、bodyをfileに書き出して受け付ける(spill)
+    def __init__(
+        self,
+        max_bytes: int = None,
+        queue_max_bytes: int = None,
+        queues: Dict[str, Dict] = None,
+        on_exceeded: str = REJECT,
+        spill_directory: str = None,
+        **kwargs,
+    ):
+        if on_exceeded not in (REJECT, SPILL):
+            raise ValueError(f"on_exceeded must be {REJECT} or {SPILL}")
+        self.max_bytes = max_bytes
+        self.queue_max_bytes = queue_max_bytes
+        self._queues = queues or {}
+        self.on_exceeded = on_exceeded
+        self._spill_directory = spill_directory
+        self._spill_file: Optional[SpillFile] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    @property
+    def spill(self) -> bool:
+        return self.on_exceeded == SPILL
+
+    @property
+    def spill_file(self) -> SpillFile:
+        with self._lock:
+            if self._spill_file is None:
+                self._spill_file = SpillFile(self._spill_directory)
+            return self._spill_file
+
+    def queue_limit(self, queue_url: str) -> Optional[int]:
+        # partitionが違えば同じ名前でも別のqueueなので、queue urlで引く
+        return self._queues.get(queue_url, {}).get("max_bytes", self.queue_max_bytes)
+
+    def reserve(self, queue_url: str, queue_bytes: int, size: int) -> bool:
+        queue_limit = self.queue_limit(queue_url)
+        if queue_limit is not None and queue_bytes + size > queue_limit:
+            return False
+        with self._lock:
+            if self.max_bytes is not None and self._total_bytes + size > self.max_bytes:
+                return False
+            self._total_bytes += size
+        return True
+
+    def add(self, size: int):
+        # 上限を確認せずに加える(spillしたmessageやrestore)
+        with self._lock:
+            self._total_bytes += size
+
+    def release(self, size: int):
+        with self._lock:
+            self._total_bytes -= size
+
+    def status(self) -> Dict:
+        return {
+            "TotalBytes": self._total_bytes,
+            "MaxBytes": self.max_bytes,
+            "QueueMaxBytes": self.queue_max_bytes,
+            "OnExceeded": self.on_exceeded,
+            "SpilledBytes": self._spill_file.size if self._spill_file else 0,
+        }
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+
+
+def memory_report(
+    partitions: PartitionedQueueStorage, budget: Optional[MemoryBudget], top: int = 10
+) -> Dict:
+    queues = [
+        queue
+        for storage in partitions.partitions.values()
+        for queue in storage.get_queues()
+    ]
+    queues.sort(key=lambda queue: queue.memory_bytes, reverse=True)
+    report = budget.status() if budget is not None else {}
+    report.setdefault("TotalBytes", sum(queue.memory_bytes for queue in queues))
+    report["Queues"] = [
+        {
+            "QueueUrl": queue.queue_url,
+            "Bytes": queue.memory_bytes,
+            "Messages": sum(queue.count_messages().values()),
+        }
+        for queue in queues[:top]
+    ]
+    return report
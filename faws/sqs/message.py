@@ -2,14 +2,33 @@ from __future__ import annotations
 import dataclasses
 import datetime
 import enum
+import os
 import uuid
-from typing import Dict, Optional
+import zlib
+from typing import Dict, Generator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# SQSのmessage(body + attribute)の上限
+MAX_MESSAGE_SIZE = 262144
 
 
 def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+def generate_uuids(count: int) -> Generator[str]:
+    # uuid.UUIDを1件ずつ作るのは重いので、乱数をまとめて取ってから文字列にする
+    data = os.urandom(16 * count).hex()
+    for i in range(0, 32 * count, 32):
+        h = data[i : i + 32]
+        variant = "89ab"[int(h[16], 16) & 3]
+        yield f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{variant}{h[17:20]}-{h[20:]}"
+
+
 class MessageAttributeType(enum.Enum):
     BINARY = "Binary"
     STRING = "String"
@@ -66,6 +85,19 @@ class MessageAttribute:
 
         return message_attributes
 
+    @classmethod
+    def to_request_data(cls, attributes: Optional[Dict[str, Dict]]) -> Optional[Dict]:
+        # boto3の形式({"Name": {"DataType": ..., "StringValue": ...}})をrequest dataの形にする
+        if not attributes:
+            return None
+        request_data = {}
+        for i, (name, value) in enumerate(attributes.items(), 1):
+            request_data[f"MessageAttribute.{i}.Name"] = name
+            request_data[f"MessageAttribute.{i}.Value.DataType"] = value["DataType"]
+            value_key = "BinaryValue" if "BinaryValue" in value else "StringValue"
+            request_data[f"MessageAttribute.{i}.Value.{value_key}"] = value[value_key]
+        return request_data
+
     def to_dict(self) -> Dict[str, Dict]:
         return {
             # String/Numberの場合はStringValue, Binaryの場合はBinaryValueとする
@@ -76,28 +108,185 @@ class MessageAttribute:
         }
 
 
+class BodyCodec(enum.Enum):
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+
+
+@dataclasses.dataclass(frozen=True)
+class BodyCompression:
+    threshold: int
+    codec: BodyCodec = BodyCodec.ZLIB
+    # sendのlatencyを優先して速い圧縮levelをdefaultにする
+    level: int = 1
+
+    def __post_init__(self):
+        if self.codec == BodyCodec.ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+
+
+class MessageBody:
+    # bodyはrequestから取り出したbytesのまま(閾値以上なら圧縮して)1度だけ保持し、
+    # strへのdecodeはresponseを作る時にだけ行う
+    # immutableなので複数のmessage/queueで共有してよい
+    __slots__ = ("_data", "_codec", "_size")
+
+    def __init__(
+        self, data: bytes, codec: Optional[BodyCodec] = None, size: int = None
+    ):
+        self._data = data
+        self._codec = codec
+        self._size = len(data) if size is None else size
+
+    @classmethod
+    def build(
+        cls,
+        body: Union[str, bytes, MessageBody],
+        compression: Optional[BodyCompression] = None,
+    ) -> MessageBody:
+        if isinstance(body, MessageBody):
+            return body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if compression is None or len(body) < compression.threshold:
+            return cls(body)
+        if compression.codec == BodyCodec.ZSTD:
+            return cls(
+                zstandard.ZstdCompressor(level=compression.level).compress(body),
+                compression.codec,
+                len(body),
+            )
+        return cls(
+            zlib.compress(body, compression.level), compression.codec, len(body)
+        )
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def stored_size(self) -> int:
+        return len(self._data)
+
+    @property
+    def compressed(self) -> bool:
+        return self._codec is not None
+
+    def to_bytes(self) -> bytes:
+        data = self._load()
+        if self._codec is None:
+            return data
+        if self._codec == BodyCodec.ZSTD:
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def _load(self) -> bytes:
+        return self._data
+
+    def decode(self) -> str:
+        return self.to_bytes().decode("utf-8", errors="replace")
+
+    def spill(self, spill_file) -> MessageBody:
+        # (圧縮済みの)bytesをfileに書き出し、memoryには位置だけを持つbodyにする
+        return SpilledMessageBody(
+            spill_file,
+            spill_file.write(self._data),
+            len(self._data),
+            self._codec,
+            self._size,
+        )
+
+
+class SpilledMessageBody(MessageBody):
+    __slots__ = ("_spill_file", "_offset", "_length")
+
+    def __init__(
+        self,
+        spill_file,
+        offset: int,
+        length: int,
+        codec: Optional[BodyCodec] = None,
+        size: int = None,
+    ):
+        super().__init__(b"", codec, size)
+        self._spill_file = spill_file
+        self._offset = offset
+        self._length = length
+
+    @property
+    def stored_size(self) -> int:
+        # memory上には持たない
+        return 0
+
+    def _load(self) -> bytes:
+        return self._spill_file.read(self._offset, self._length)
+
+    def spill(self, spill_file) -> MessageBody:
+        return self
+
+
+def message_size(body: Union[str, bytes, MessageBody], message_attributes: Dict) -> int:
+    if isinstance(body, MessageBody):
+        size = body.size
+    elif isinstance(body, str):
+        size = len(body.encode("utf-8"))
+    else:
+        size = len(body)
+    # attributeはName, DataType, Valueの合計をsizeとする
+    for k, v in (message_attributes or {}).items():
+        if k.endswith(".Name") or k.endswith(".DataType") or k.endswith("Value"):
+            size += len(v.encode("utf-8")) if isinstance(v, str) else len(v)
+    return size
+
+
+# memory上のmessage 1件あたりの固定のsize(Message/id/時刻/storageのentry)と
+# attribute 1つあたりの固定のsize。tracemallocで測った値
+MESSAGE_OVERHEAD = 400
+ATTRIBUTE_OVERHEAD = 180
+
+
 class Message:
     def __init__(
         self,
-        message_body: str,
+        message_body: Union[str, bytes, MessageBody],
         message_attributes: Optional[Dict] = None,
         delay_seconds: int = 0,
         visibility_timeout: int = 30,
+        message_id: str = None,
+        inserted_at: datetime.datetime = None,
+        deliverable_at: datetime.datetime = None,
+        receive_count: int = 0,
     ):
-        self._message_body = message_body
+        self._message_body = MessageBody.build(message_body)
         self._message_attributes = MessageAttribute.from_request_data(
             message_attributes
         )
         self._delay_seconds = delay_seconds
-        self._message_id = generate_uuid()
-        self._message_inserted_at = datetime.datetime.now()
-        self._message_deliverable_time = self._message_inserted_at + datetime.timedelta(
-            seconds=self._delay_seconds
+        # まとめて追加する時はidと時刻を呼び出し側で用意できる
+        self._message_id = generate_uuid() if message_id is None else message_id
+        self._message_inserted_at = (
+            datetime.datetime.now() if inserted_at is None else inserted_at
         )
+        if deliverable_at is not None:
+            self._message_deliverable_time = deliverable_at
+        elif self._delay_seconds:
+            self._message_deliverable_time = (
+                self._message_inserted_at
+                + datetime.timedelta(seconds=self._delay_seconds)
+            )
+        else:
+            self._message_deliverable_time = self._message_inserted_at
         self._visibility_timeout = visibility_timeout
+        self._receive_count = receive_count
+        # copy-on-write用。storageに追加された時点のgenerationを持つ
+        self.generation = 0
 
     @property
     def message_body(self) -> str:
+        return self._message_body.decode()
+
+    @property
+    def body(self) -> MessageBody:
         return self._message_body
 
     @property
@@ -108,10 +297,37 @@ class Message:
     def message_id(self) -> str:
         return self._message_id
 
+    @property
+    def message_inserted_at(self) -> datetime:
+        return self._message_inserted_at
+
     @property
     def message_deliverable_time(self) -> datetime:
         return self._message_deliverable_time
 
+    @property
+    def receive_count(self) -> int:
+        return self._receive_count
+
+    def increment_receive_count(self):
+        self._receive_count += 1
+
+    @property
+    def memory_size(self) -> int:
+        size = MESSAGE_OVERHEAD + self._message_body.stored_size
+        for name, attribute in (self._message_attributes or {}).items():
+            # 文字数ではなくUTF-8でのbyte数で数える
+            size += (
+                ATTRIBUTE_OVERHEAD
+                + len(name.encode("utf-8"))
+                + len(attribute.data_type.value.encode("utf-8"))
+                + len(attribute.value.encode("utf-8"))
+            )
+        return size
+
+    def spill(self, spill_file):
+        self._message_body = self._message_body.spill(spill_file)
+
     def update_deliverable_time(self, visibility_timeout: int):
         self._message_deliverable_time = datetime.datetime.now() + datetime.timedelta(
             seconds=visibility_timeout
@@ -1,10 +1,22 @@
 from __future__ import annotations
+import copy
+import dataclasses
+import datetime
+import random
+import threading
+import time
+import zlib
 from abc import abstractmethod
+from array import array
 from enum import Enum
-from collections import OrderedDict
-from typing import Generator, List
+from typing import Dict, Generator, Iterator, List, Optional, Tuple
 from faws.sqs.message import Message
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 
 def build_message_storage(
     message_storage_type: MessageStorageType, **kwargs
@@ -13,24 +25,89 @@ def build_message_storage(
 
 
 class MessageStorage:
+    # trueならstorage自身がlockを持つので、queueのlockの外から呼べる
+    thread_safe = False
+
     @abstractmethod
     def get_messages(
         self, limit: int = 30, offset: int = 0
     ) -> Generator[List[Message]]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_message(self, message_id: str) -> Optional[Message]:
+        raise NotImplementedError
+
     @abstractmethod
     def add_message(self, message: Message):
         raise NotImplementedError
 
+    def add_messages(self, messages: List[Message]):
+        for message in messages:
+            self.add_message(message)
+
+    @abstractmethod
+    def delete_message(self, message_id: str) -> bool:
+        raise NotImplementedError
+
     @abstractmethod
     def truncate_messages(self):
         raise NotImplementedError
 
+    @abstractmethod
+    def writable(self, message: Message) -> Message:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        raise NotImplementedError
+
+    def sample_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        # 短いpollingでのreceive。分割していないstorageは全体を見る
+        return self.claim_messages(visibility_timeout, max_number_of_messages)
+
+    @abstractmethod
+    def change_visibility(self, message_id: str, visibility_timeout: int) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_messages(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def expire_messages(self, retention_seconds: float) -> List[Message]:
+        # 追加からretention_seconds以上経ったmessageを消して返す
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_messages(self) -> Iterator[Tuple[Message, float, int]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def snapshot(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def restore(self, snapshot):
+        raise NotImplementedError
+
 
 class InMemoryMessageStorage(MessageStorage):
+    # snapshot/restoreはcopy-on-writeで行う
+    # snapshotは現在のdictをそのまま共有し、次の書き込み時に初めてdictをcopyする
+    # messageはgenerationを持ち、snapshot以前のgenerationのmessageは書き換える前にcopyする
     def __init__(self, **kwargs):
-        self._messages = OrderedDict()
+        self._messages: Dict[str, Message] = {}
+        self._shared = False
+        self._generation = 0
 
     def get_messages(
         self, limit: int = 30, offset: int = 0
@@ -39,13 +116,473 @@ class InMemoryMessageStorage(MessageStorage):
         for i in range(offset, len(self._messages), limit):
             yield messages[offset + i : limit + i]
 
+    def get_message(self, message_id: str) -> Optional[Message]:
+        return self._messages.get(message_id)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
     def add_message(self, message: Message):
+        self._own()
+        message.generation = self._generation
         self._messages[message.message_id] = message
         return self._messages[message.message_id]
 
+    def add_messages(self, messages: List[Message]):
+        self._own()
+        for message in messages:
+            message.generation = self._generation
+        self._messages.update((m.message_id, m) for m in messages)
+
+    def delete_message(self, message_id: str) -> bool:
+        if message_id not in self._messages:
+            return False
+        self._own()
+        del self._messages[message_id]
+        return True
+
     def truncate_messages(self):
-        self._messages = OrderedDict()
+        self._messages = {}
+        self._shared = False
+
+    def writable(self, message: Message) -> Message:
+        if message.generation == self._generation:
+            return message
+        self._own()
+        copied = copy.copy(message)
+        copied.generation = self._generation
+        self._messages[copied.message_id] = copied
+        return copied
+
+    def claim_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        receive_messages = []
+        for message_generator in self.get_messages():
+            for message in message_generator:
+                if message.is_callable():
+                    message = self.writable(message)
+                    message.update_deliverable_time(visibility_timeout)
+                    message.increment_receive_count()
+                    receive_messages.append(message)
+                if len(receive_messages) == max_number_of_messages:
+                    return receive_messages
+        return receive_messages
+
+    def change_visibility(self, message_id: str, visibility_timeout: int) -> bool:
+        message = self.get_message(message_id)
+        if message is None:
+            return False
+        self.writable(message).update_deliverable_time(visibility_timeout)
+        return True
+
+    def count_messages(self) -> Dict[str, int]:
+        now = datetime.datetime.now()
+        visible = sum(
+            1 for m in self._messages.values() if m.message_deliverable_time <= now
+        )
+        return {
+            "ApproximateNumberOfMessages": visible,
+            "ApproximateNumberOfMessagesNotVisible": len(self._messages) - visible,
+        }
+
+    def expire_messages(self, retention_seconds: float) -> List[Message]:
+        expired_at = datetime.datetime.now() - datetime.timedelta(
+            seconds=retention_seconds
+        )
+        expired = [
+            m for m in self._messages.values() if m.message_inserted_at <= expired_at
+        ]
+        for message in expired:
+            self.delete_message(message.message_id)
+        return expired
+
+    def iter_messages(self) -> Iterator[Tuple[Message, float, int]]:
+        # snapshotしたdictを回すので、途中で書き込まれてもcopyされるのは書き込み側
+        for message in self.snapshot().values():
+            yield (
+                message,
+                message.message_deliverable_time.timestamp(),
+                message.receive_count,
+            )
+
+    def snapshot(self) -> Dict[str, Message]:
+        self._shared = True
+        self._generation += 1
+        return self._messages
+
+    def restore(self, snapshot: Dict[str, Message]):
+        self._messages = snapshot
+        self._shared = True
+        self._generation += 1
+
+    def _own(self):
+        if self._shared:
+            self._messages = dict(self._messages)
+            self._shared = False
+
+
+ACTIVE = 1
+DELETED = 0
+
+
+@dataclasses.dataclass()
+class ColumnarSnapshot:
+    deliverable: array
+    inserted: array
+    receive_count: array
+    state: array
+    slab: List[Optional[Message]]
+    rows: Dict[str, int]
+    deleted: int
+
+
+class ColumnarMessageStorage(MessageStorage):
+    # messageのmetadata(可視になる時刻、追加時刻、受信回数、状態)を行ごとに型付きの配列に並べ、
+    # body/attributeを持つMessageは別のslab(list)に置く
+    # 可視判定と期限切れの判定は配列のscan(numpyがあればvector演算)で行う
+    # 受け取ったmessageのMessage側の値も更新し、snapshotと共有しているMessageは先にcopyする
+    def __init__(self, compaction_threshold: int = 1024, **kwargs):
+        self._compaction_threshold = compaction_threshold
+        self._generation = 0
+        self.truncate_messages()
+
+    def get_messages(
+        self, limit: int = 30, offset: int = 0
+    ) -> Generator[List[Message]]:
+        messages = [m for m in self._slab if m is not None]
+        for i in range(offset, len(messages), limit):
+            yield messages[i : i + limit]
+
+    def get_message(self, message_id: str) -> Optional[Message]:
+        row = self._rows.get(message_id)
+        return None if row is None else self._slab[row]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add_message(self, message: Message):
+        self._rows[message.message_id] = len(self._slab)
+        self._slab.append(message)
+        self._deliverable.append(message.message_deliverable_time.timestamp())
+        self._inserted.append(message.message_inserted_at.timestamp())
+        self._receive_count.append(message.receive_count)
+        self._state.append(ACTIVE)
+        message.generation = self._generation
+        return message
+
+    def add_messages(self, messages: List[Message]):
+        # 列ごとにまとめてextendする
+        start = len(self._slab)
+        self._rows.update((m.message_id, start + i) for i, m in enumerate(messages))
+        self._slab.extend(messages)
+        self._deliverable.extend(
+            m.message_deliverable_time.timestamp() for m in messages
+        )
+        self._inserted.extend(m.message_inserted_at.timestamp() for m in messages)
+        self._receive_count.extend(m.receive_count for m in messages)
+        self._state.extend(ACTIVE for _ in messages)
+        for message in messages:
+            message.generation = self._generation
+
+    def delete_message(self, message_id: str) -> bool:
+        row = self._rows.pop(message_id, None)
+        if row is None:
+            return False
+        self._state[row] = DELETED
+        self._slab[row] = None
+        self._deleted += 1
+        # 削除済みの行が半分を超えたら詰める
+        if self._deleted > self._compaction_threshold and self._deleted * 2 > len(
+            self._slab
+        ):
+            self._compact()
+        return True
+
+    def truncate_messages(self):
+        self._deliverable = array("d")
+        self._inserted = array("d")
+        self._receive_count = array("l")
+        self._state = array("b")
+        self._slab: List[Optional[Message]] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted = 0
+
+    def writable(self, message: Message) -> Message:
+        return self._writable_row(self._rows[message.message_id])
+
+    def _writable_row(self, row: int) -> Message:
+        message = self._slab[row]
+        if message.generation == self._generation:
+            return message
+        copied = copy.copy(message)
+        copied.generation = self._generation
+        self._slab[row] = copied
+        return copied
+
+    def _select(self, column: array, now: float, visible: bool, limit: int = None):
+        # numpyのviewは配列をresizeできなくするので、この関数の中だけで使う
+        if numpy is not None:
+            values = numpy.frombuffer(column, dtype=numpy.float64)
+            active = numpy.frombuffer(self._state, dtype=numpy.int8) == ACTIVE
+            mask = active & ((values <= now) if visible else (values > now))
+            rows = numpy.flatnonzero(mask)
+            return (rows if limit is None else rows[:limit]).tolist()
+        state = self._state
+        rows = []
+        for row, value in enumerate(column):
+            if state[row] == ACTIVE and (value <= now) == visible:
+                rows.append(row)
+                if limit is not None and len(rows) == limit:
+                    break
+        return rows
+
+    def claim_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        now = time.time()
+        rows = self._select(self._deliverable, now, True, max_number_of_messages)
+        claimed = []
+        for row in rows:
+            self._deliverable[row] = now + visibility_timeout
+            self._receive_count[row] += 1
+            message = self._writable_row(row)
+            message.update_deliverable_time(visibility_timeout)
+            message.increment_receive_count()
+            claimed.append(message)
+        return claimed
+
+    def change_visibility(self, message_id: str, visibility_timeout: int) -> bool:
+        row = self._rows.get(message_id)
+        if row is None:
+            return False
+        self._deliverable[row] = time.time() + visibility_timeout
+        self._writable_row(row).update_deliverable_time(visibility_timeout)
+        return True
+
+    def count_messages(self) -> Dict[str, int]:
+        visible = len(self._select(self._deliverable, time.time(), True))
+        return {
+            "ApproximateNumberOfMessages": visible,
+            "ApproximateNumberOfMessagesNotVisible": len(self._rows) - visible,
+        }
+
+    def expire_messages(self, retention_seconds: float) -> List[Message]:
+        # 追加時刻の列を可視判定と同じようにscanする
+        rows = self._select(self._inserted, time.time() - retention_seconds, True)
+        expired = [self._slab[row] for row in rows]
+        # 削除中にcompactされると行番号がずれるので先にMessageにしておく
+        for message in expired:
+            self.delete_message(message.message_id)
+        return expired
+
+    def _compact(self):
+        rows = [row for row, state in enumerate(self._state) if state == ACTIVE]
+        self._deliverable = array("d", (self._deliverable[r] for r in rows))
+        self._inserted = array("d", (self._inserted[r] for r in rows))
+        self._receive_count = array("l", (self._receive_count[r] for r in rows))
+        self._state = array("b", (ACTIVE for _ in rows))
+        self._slab = [self._slab[r] for r in rows]
+        self._rows = {m.message_id: i for i, m in enumerate(self._slab)}
+        self._deleted = 0
+
+    def iter_messages(self) -> Iterator[Tuple[Message, float, int]]:
+        snapshot = self.snapshot()
+        for row, message in enumerate(snapshot.slab):
+            if message is not None:
+                yield message, snapshot.deliverable[row], snapshot.receive_count[row]
+
+    def snapshot(self) -> ColumnarSnapshot:
+        # 配列のcopyはmemcpyなのでmessage数に比例するが速い
+        # Messageは共有し、以降に書き換えるものはcopyする
+        self._generation += 1
+        return ColumnarSnapshot(
+            self._deliverable[:],
+            self._inserted[:],
+            self._receive_count[:],
+            self._state[:],
+            list(self._slab),
+            dict(self._rows),
+            self._deleted,
+        )
+
+    def restore(self, snapshot: ColumnarSnapshot):
+        self._deliverable = snapshot.deliverable[:]
+        self._inserted = snapshot.inserted[:]
+        self._receive_count = snapshot.receive_count[:]
+        self._state = snapshot.state[:]
+        self._slab = list(snapshot.slab)
+        self._rows = dict(snapshot.rows)
+        self._deleted = snapshot.deleted
+        self._generation += 1
+
+
+class PartitionedMessageStorage(MessageStorage):
+    # SQSのstandard queueのように、messageをidのhashで複数のpartitionに分けて持つ
+    # partitionごとにlockとstorageを持つので、このstorageはqueueのlockなしで呼んでよい
+    # 短いpolling(sample_messages)はrandomに選んだ一部のpartitionだけを見るので、
+    # messageがあっても空や一部だけのreceiveになることがある
+    thread_safe = True
+
+    def __init__(
+        self,
+        partitions: int = 4,
+        sampled_partitions: int = None,
+        partition_storage_type: MessageStorageType = None,
+        seed: int = None,
+        **kwargs,
+    ):
+        if partitions < 1:
+            raise ValueError("partitions must be 1 or more")
+        self._partitions = [
+            build_message_storage(
+                partition_storage_type or MessageStorageType.IN_MEMORY, **kwargs
+            )
+            for _ in range(partitions)
+        ]
+        self._locks = [threading.Lock() for _ in range(partitions)]
+        self._sampled_partitions = min(
+            partitions, sampled_partitions or (partitions + 1) // 2
+        )
+        self._random = random.Random(seed)
+
+    def _index(self, message_id: str) -> int:
+        return zlib.crc32(message_id.encode("utf-8")) % len(self._partitions)
+
+    def get_messages(
+        self, limit: int = 30, offset: int = 0
+    ) -> Generator[List[Message]]:
+        messages = []
+        for storage, lock in zip(self._partitions, self._locks):
+            with lock:
+                messages.extend(m for page in storage.get_messages() for m in page)
+        for i in range(offset, len(messages), limit):
+            yield messages[i : i + limit]
+
+    def get_message(self, message_id: str) -> Optional[Message]:
+        i = self._index(message_id)
+        with self._locks[i]:
+            return self._partitions[i].get_message(message_id)
+
+    def __len__(self) -> int:
+        return sum(len(storage) for storage in self._partitions)
+
+    def add_message(self, message: Message):
+        i = self._index(message.message_id)
+        with self._locks[i]:
+            return self._partitions[i].add_message(message)
+
+    def add_messages(self, messages: List[Message]):
+        grouped: Dict[int, List[Message]] = {}
+        for message in messages:
+            grouped.setdefault(self._index(message.message_id), []).append(message)
+        for i, partition_messages in grouped.items():
+            with self._locks[i]:
+                self._partitions[i].add_messages(partition_messages)
+
+    def delete_message(self, message_id: str) -> bool:
+        i = self._index(message_id)
+        with self._locks[i]:
+            return self._partitions[i].delete_message(message_id)
+
+    def truncate_messages(self):
+        for storage, lock in zip(self._partitions, self._locks):
+            with lock:
+                storage.truncate_messages()
+
+    def writable(self, message: Message) -> Message:
+        i = self._index(message.message_id)
+        with self._locks[i]:
+            return self._partitions[i].writable(message)
+
+    def claim_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        # 全partitionを見る(long polling)。同じpartitionばかり先に空にならないよう開始位置をずらす
+        start = self._random.randrange(len(self._partitions))
+        indexes = [
+            (start + i) % len(self._partitions) for i in range(len(self._partitions))
+        ]
+        return self._claim(indexes, visibility_timeout, max_number_of_messages)
+
+    def sample_messages(
+        self, visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        indexes = self._random.sample(
+            range(len(self._partitions)), self._sampled_partitions
+        )
+        return self._claim(indexes, visibility_timeout, max_number_of_messages)
+
+    def _claim(
+        self, indexes: List[int], visibility_timeout: int, max_number_of_messages: int
+    ) -> List[Message]:
+        receive_messages = []
+        for i in indexes:
+            with self._locks[i]:
+                receive_messages.extend(
+                    self._partitions[i].claim_messages(
+                        visibility_timeout,
+                        max_number_of_messages - len(receive_messages),
+                    )
+                )
+            if len(receive_messages) == max_number_of_messages:
+                break
+        return receive_messages
+
+    def change_visibility(self, message_id: str, visibility_timeout: int) -> bool:
+        i = self._index(message_id)
+        with self._locks[i]:
+            return self._partitions[i].change_visibility(
+                message_id, visibility_timeout
+            )
+
+    def count_messages(self) -> Dict[str, int]:
+        counts = {
+            "ApproximateNumberOfMessages": 0,
+            "ApproximateNumberOfMessagesNotVisible": 0,
+        }
+        for storage, lock in zip(self._partitions, self._locks):
+            with lock:
+                for k, v in storage.count_messages().items():
+                    counts[k] += v
+        return counts
+
+    def expire_messages(self, retention_seconds: float) -> List[Message]:
+        expired = []
+        for storage, lock in zip(self._partitions, self._locks):
+            with lock:
+                expired += storage.expire_messages(retention_seconds)
+        return expired
+
+    def iter_messages(self) -> Iterator[Tuple[Message, float, int]]:
+        for storage, lock in zip(self._partitions, self._locks):
+            # 最初の1件を取り出す時にsnapshotされるので、そこまでをlockの中で行う
+            with lock:
+                messages = storage.iter_messages()
+                first = next(messages, None)
+            if first is None:
+                continue
+            yield first
+            yield from messages
+
+    def snapshot(self) -> List:
+        # 全partitionのlockを取り、同じ時点のsnapshotにする
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            return [storage.snapshot() for storage in self._partitions]
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def restore(self, snapshot: List):
+        for storage, lock, partition_snapshot in zip(
+            self._partitions, self._locks, snapshot
+        ):
+            with lock:
+                storage.restore(partition_snapshot)
 
 
 class MessageStorageType(Enum):
     IN_MEMORY = InMemoryMessageStorage
+    COLUMNAR = ColumnarMessageStorage
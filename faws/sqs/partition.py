@@ -0,0 +1,134 @@
+from __future__ import annotations
+import dataclasses
+import re
+import threading
+from typing import Dict, Optional
+from faws.sqs.queue_storage import (
+    QueueStorage,
+    QueuesStorageType,
+    build_queues_storage,
+)
+
+DEFAULT_ACCOUNT_ID = "000000000000"
+DEFAULT_REGION = "us-east-1"
+
+_CREDENTIAL_SCOPE = re.compile(r"Credential=([^/,\s]+)/\d{8}/([a-z0-9-]+)/")
+_REGION_HOST = re.compile(r"sqs\.([a-z0-9-]+)\.")
+_PARTITIONED_URL = re.compile(r"https*://[^/]*/queues/([a-z0-9-]+)/(\d{12})/[^/]*$")
+
+
+@dataclasses.dataclass(frozen=True)
+class Partition:
+    account_id: str
+    region: str
+
+
+def partition_from_url(queue_url: str) -> Optional[Partition]:
+    m = _PARTITIONED_URL.match(queue_url)
+    if m is None:
+        return None
+    region, account_id = m.groups()
+    return Partition(account_id, region)
+
+
+def access_key_from_headers(headers: Dict[str, str]) -> Optional[str]:
+    m = _CREDENTIAL_SCOPE.search(headers.get("Authorization", ""))
+    if m is None:
+        return None
+    return m.groups()[0]
+
+
+def partition_from_request(
+    headers: Dict[str, str],
+    host: str,
+    default: Partition,
+    access_key_accounts: Dict[str, str] = None,
+) -> Partition:
+    account_id = default.account_id
+    region = default.region
+    # SigV4のcredential scope(Credential=AKID/20200101/us-east-1/sqs/aws4_request)を優先する
+    m = _CREDENTIAL_SCOPE.search(headers.get("Authorization", ""))
+    if m is not None:
+        access_key, region = m.groups()
+        if access_key_accounts and access_key in access_key_accounts:
+            account_id = access_key_accounts[access_key]
+        elif access_key.isdigit() and len(access_key) == 12:
+            account_id = access_key
+        return Partition(account_id, region)
+    m = _REGION_HOST.match(host or "")
+    if m is not None:
+        region = m.groups()[0]
+    return Partition(account_id, region)
+
+
+class PartitionedQueueStorage:
+    # account/regionごとにQueueStorageを持つ
+    # default partitionのqueueは従来通り https://localhost:5000/queues/{name} のurlになる
+    def __init__(
+        self,
+        storage_type: QueuesStorageType,
+        default_partition: Partition = Partition(DEFAULT_ACCOUNT_ID, DEFAULT_REGION),
+        **kwargs,
+    ):
+        self._storage_type = storage_type
+        self._storage_config = kwargs
+        self._default_partition = default_partition
+        self._default = build_queues_storage(storage_type, **kwargs)
+        self._partitions: Dict[Partition, QueueStorage] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def default_partition(self) -> Partition:
+        return self._default_partition
+
+    @property
+    def default(self) -> QueueStorage:
+        return self._default
+
+    @property
+    def partitions(self) -> Dict[Partition, QueueStorage]:
+        return {**self._partitions, self._default_partition: self._default}
+
+    def get(self, partition: Partition) -> QueueStorage:
+        if partition == self._default_partition:
+            return self._default
+        storage = self._partitions.get(partition)
+        if storage is not None:
+            return storage
+        with self._lock:
+            if partition not in self._partitions:
+                self._partitions[partition] = build_queues_storage(
+                    self._storage_type, partition=partition, **self._storage_config
+                )
+            return self._partitions[partition]
+
+    def init_storage(self):
+        self._default.init_storage()
+        partitions, self._partitions = self._partitions, {}
+        # 捨てるstorageのmessageもmemory budgetから外す
+        for storage in partitions.values():
+            storage.init_storage()
+
+    def snapshot(self) -> Dict[Partition, object]:
+        return {
+            partition: storage.snapshot()
+            for partition, storage in self.partitions.items()
+        }
+
+    def restore(self, snapshot: Dict[Partition, object]):
+        for partition, storage_snapshot in snapshot.items():
+            self.get(partition).restore(storage_snapshot)
+        for partition, storage in self.partitions.items():
+            if partition not in snapshot:
+                storage.init_storage()
+
+    def release_snapshot(self, snapshot: Dict[Partition, object]):
+        # init_storageで捨てたpartitionは対象外
+        partitions = self.partitions
+        for partition, storage_snapshot in snapshot.items():
+            if partition in partitions:
+                partitions[partition].release_snapshot(storage_snapshot)
+
+    def close(self):
+        for storage in self.partitions.values():
+            storage.close()
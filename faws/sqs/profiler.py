@@ -0,0 +1,153 @@
+from __future__ import annotations
+import cProfile
+import collections
+import enum
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+# actionはclientが送ってくる値なので、file名に使える文字だけにする
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_]")
+
+
+def action_key(action: Optional[str]) -> str:
+    return _UNSAFE_CHARS.sub("_", action or "") or "Unknown"
+
+
+class ProfilerMode(enum.Enum):
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+
+
+class Profiler:
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_every: int = 100,
+        mode: str = "cprofile",
+        output_dir: str = "profiles",
+        sampling_interval: float = 0.001,
+        **kwargs,
+    ):
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.mode = ProfilerMode(mode)
+        self.output_dir = output_dir
+        self.sampling_interval = sampling_interval
+        self._counter = itertools.count()
+        # cProfileは同時に1つしか有効にできないので、計測中のrequestがあればskipする
+        self._running = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._stacks: Dict[str, collections.Counter] = {}
+        self._num_profiled: Dict[str, int] = collections.Counter()
+
+    def should_profile(self) -> bool:
+        if not self.enabled:
+            return False
+        return next(self._counter) % self.sample_every == 0
+
+    def profile(self, func: Callable, action_name: Callable[[], str]):
+        if not self._running.acquire(blocking=False):
+            return func()
+        try:
+            if self.mode == ProfilerMode.CPROFILE:
+                profile = cProfile.Profile()
+                result = profile.runcall(func)
+                self._add_stats(action_name(), profile)
+            else:
+                sampler = StackSampler(threading.get_ident(), self.sampling_interval)
+                sampler.start()
+                try:
+                    result = func()
+                finally:
+                    sampler.stop()
+                self._add_stacks(action_name(), sampler.stacks)
+        finally:
+            self._running.release()
+        return result
+
+    def _add_stats(self, action: str, profile: cProfile.Profile):
+        action = action_key(action)
+        with self._lock:
+            if action in self._stats:
+                self._stats[action].add(profile)
+            else:
+                self._stats[action] = pstats.Stats(profile)
+            self._num_profiled[action] += 1
+
+    def _add_stacks(self, action: str, stacks: collections.Counter):
+        action = action_key(action)
+        with self._lock:
+            self._stacks.setdefault(action, collections.Counter()).update(stacks)
+            self._num_profiled[action] += 1
+
+    def status(self) -> Dict:
+        return {
+            "Enabled": self.enabled,
+            "SampleEvery": self.sample_every,
+            "Mode": self.mode.value,
+            "OutputDirectory": self.output_dir,
+            "ProfiledRequests": dict(self._num_profiled),
+        }
+
+    def dump(self) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        with self._lock:
+            for action, stats in self._stats.items():
+                path = os.path.join(self.output_dir, f"{action}.pstats")
+                stats.dump_stats(path)
+                paths.append(path)
+            for action, stacks in self._stacks.items():
+                path = os.path.join(self.output_dir, f"{action}.collapsed")
+                with open(path, "w") as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                paths.append(path)
+        return paths
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._stacks = {}
+            self._num_profiled = collections.Counter()
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.stacks = collections.Counter()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                return
+            self.stacks[collapse_stack(frame)] += 1
+
+
+def collapse_stack(frame) -> str:
+    # flamegraph.pl形式(root;...;leaf)に合わせてrootから並べる
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
@@ -0,0 +1,28 @@
+import pytest
+from faws.sqs import server
+from faws.sqs.client import Client
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+@pytest.fixture
+def faws_sqs_app_config():
+    # テスト側でoverrideしてapp configを変えられるようにfixtureにしておく
+    return {"QueuesStorageType": QueuesStorageType.IN_MEMORY, "TESTING": True}
+
+
+@pytest.fixture
+def faws_sqs_app(faws_sqs_app_config):
+    # testごとにappとstorageを作るので、pytest-xdistや並列実行でも状態を共有しない
+    return server.create_app(faws_sqs_app_config)
+
+
+@pytest.fixture
+def faws_sqs_http_client(faws_sqs_app):
+    with faws_sqs_app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def faws_sqs(faws_sqs_app):
+    # http clientと同じstorageを見るembedded client
+    return Client(faws_sqs_app.extensions["queues"])
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import dataclasses
+import http.client
+import urllib.parse
+from typing import Dict, Optional, Union
+
+
+@dataclasses.dataclass()
+class QueryResponse:
+    status: int
+    body: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+
+def encode_params(params: Dict[str, str]) -> str:
+    return "&".join(
+        f"{k}={urllib.parse.quote(str(v), safe='')}" for k, v in params.items()
+    )
+
+
+class QueryClient:
+    # boto等に依存せず、SQSのquery protocol(form encodeされたPOST)を直接話すclient
+    def __init__(self, endpoint: str, timeout: Optional[float] = 60):
+        url = urllib.parse.urlsplit(endpoint)
+        connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._connection = connection_class(url.hostname, url.port, timeout=timeout)
+        self._path = url.path or "/"
+
+    def call(
+        self, action: str, headers: Dict[str, str] = None, **params
+    ) -> QueryResponse:
+        return self.post(encode_params(dict(Action=action, **params)), headers)
+
+    def post(
+        self, body: Union[str, bytes], headers: Dict[str, str] = None
+    ) -> QueryResponse:
+        request_headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        if headers is not None:
+            request_headers.update(headers)
+        try:
+            self._connection.request(
+                "POST", self._path, body=body, headers=request_headers
+            )
+            response = self._connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # keep-aliveの切れたconnectionは1度だけ張り直す
+            self._connection.close()
+            self._connection.request(
+                "POST", self._path, body=body, headers=request_headers
+            )
+            response = self._connection.getresponse()
+        return QueryResponse(response.status, response.read())
+
+    def close(self):
+        self._connection.close()
@@ -1,10 +1,42 @@
 from __future__ import annotations
+import contextlib
 import dataclasses
 import datetime
+import functools
 import re
-from typing import Dict, Optional, List
-from faws.sqs.message import Message
-from faws.sqs.message_storage import build_message_storage, MessageStorageType
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    List,
+    Tuple,
+    Union,
+    TYPE_CHECKING,
+)
+from faws.sqs.error import OverLimit
+from faws.sqs.message import BodyCompression, Message, MessageBody
+from faws.sqs.message_storage import (
+    build_message_storage,
+    MessageStorageType,
+    PartitionedMessageStorage,
+)
+
+if TYPE_CHECKING:
+    from faws.sqs.memory import MemoryBudget
+    from faws.sqs.partition import Partition
+
+
+def queue_url_for(queue_name: str, partition: Optional[Partition] = None) -> str:
+    if partition is None:
+        return f"https://localhost:5000/queues/{queue_name}"
+    return (
+        f"https://localhost:5000/queues/"
+        f"{partition.region}/{partition.account_id}/{queue_name}"
+    )
 
 
 def name_from_url(queue_url: str) -> str:
@@ -18,19 +50,98 @@ def name_from_url(queue_url: str) -> str:
     return m.groups()[0]
 
 
+EXPIRY_INTERVAL = 60
+
+
+def _mutation(method):
+    # 書き込みを数える。hibernateされてstorageから外れた後の書き込みは、
+    # 読み戻したqueueに転送して取りこぼさない
+    @functools.wraps(method)
+    def wrapper(self: Queue, *args, **kwargs):
+        with self._mutation_lock:
+            successor = self._successor
+            if successor is None:
+                self._writers += 1
+                self._mutations += 1
+        if successor is not None:
+            return getattr(successor(), method.__name__)(*args, **kwargs)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            with self._mutation_lock:
+                self._writers -= 1
+
+    return wrapper
+
+
 class Queue:
-    def __init__(self, queue_name: str, default_visibility_timeout: int = 30):
+    def __init__(
+        self,
+        queue_name: str,
+        default_visibility_timeout: int = 30,
+        partition: Optional[Partition] = None,
+        body_compression: Optional[BodyCompression] = None,
+        message_storage_type: MessageStorageType = MessageStorageType.IN_MEMORY,
+        memory_budget: Optional[MemoryBudget] = None,
+        created_at: datetime.datetime = None,
+        partitions: int = 1,
+        sampled_partitions: int = None,
+        message_retention_seconds: float = None,
+    ):
         self._queue_name = queue_name
-        self._queue_url = f"https://localhost:5000/queues/{self.queue_name}"
-        self._created_at = datetime.datetime.now()
-        self._messages = build_message_storage(MessageStorageType.IN_MEMORY)
+        self._body_compression = body_compression
+        self._partition = partition
+        self._queue_url = queue_url_for(queue_name, partition)
+        self._created_at = datetime.datetime.now() if created_at is None else created_at
+        # 最後にmessageの操作があった時刻(idleなqueueのhibernate用)
+        self._last_accessed = time.monotonic()
+        self._messages = (
+            PartitionedMessageStorage(
+                partitions,
+                sampled_partitions,
+                partition_storage_type=message_storage_type,
+            )
+            if partitions > 1
+            else build_message_storage(message_storage_type)
+        )
         self._default_visibility_timeout = default_visibility_timeout
         self._tags = {}
+        # tagが変わるたびに増やす(response cacheの無効化に使う)
+        self._version = 0
+        # messageの追加を待っているreceive(stream)に通知する
+        self._condition = threading.Condition()
+        self._waiting = 0
+        # event source mappingやstreamが使っている間はhibernateしない
+        self._pins = 0
+        # 書き込みの回数と実行中の数。hibernateの前後で変わっていないことを確かめる
+        self._mutation_lock = threading.Lock()
+        self._mutations = 0
+        self._writers = 0
+        # hibernateされた後の書き込みの転送先(読み戻したqueueを返す)
+        self._successor: Optional[Callable[[], Queue]] = None
+        # 分割したstorageはpartitionごとにlockを持つので、queue全体のlockは取らない
+        # その場合もmemoryの計算だけは別のlockで守る
+        if self._messages.thread_safe:
+            self._lock = contextlib.nullcontext()
+            self._memory_lock = threading.Lock()
+        else:
+            self._lock = self._condition
+            self._memory_lock = contextlib.nullcontext()
+        self._memory_budget = memory_budget
+        # このqueueのmessageが使っているmemory(Message.memory_size の合計)
+        self._memory_bytes = 0
+        # 追加からこの秒数が経ったmessageは消す。receiveの時にEXPIRY_INTERVALごとに調べる
+        self._message_retention_seconds = message_retention_seconds
+        self._last_expiry = time.monotonic()
 
     @property
     def queue_name(self) -> str:
         return self._queue_name
 
+    @property
+    def partition(self) -> Optional[Partition]:
+        return self._partition
+
     @property
     def queue_url(self) -> str:
         return self._queue_url
@@ -39,54 +150,276 @@ class Queue:
     def created_at(self) -> datetime:
         return self._created_at
 
+    @property
+    def last_accessed(self) -> float:
+        return self._last_accessed
+
+    def touch(self):
+        self._last_accessed = time.monotonic()
+
+    @property
+    def pinned(self) -> bool:
+        # long pollingで待っているreceiveがある間も同じ扱い
+        return self._pins > 0 or self._waiting > 0
+
+    def mutations(self) -> Optional[int]:
+        # 書き込み中ならNone(書き出しても途中の状態になる)
+        with self._mutation_lock:
+            return None if self._writers else self._mutations
+
+    def detach(self, mutations: int, successor: Callable[[], Queue]) -> bool:
+        # mutations()から書き込みがなければstorageから外し、以降の書き込みをsuccessorに送る
+        with self._mutation_lock:
+            if self._writers or self._mutations != mutations or self.pinned:
+                return False
+            self._successor = successor
+            return True
+
+    def pin(self):
+        with self._condition:
+            self._pins += 1
+
+    def unpin(self):
+        with self._condition:
+            self._pins -= 1
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    @property
+    def depth(self) -> int:
+        # count_messagesと違い可視判定をしないので、lockを取らずにO(1)で返す
+        return len(self._messages)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
     @property
     def default_visibility_timeout(self) -> int:
         return self._default_visibility_timeout
 
-    def add_message(
+    def build_message(
         self,
-        message_body: str,
+        message_body: Union[str, bytes, MessageBody],
         message_attributes: Dict = None,
         delay_seconds: int = 0,
+        **kwargs,
     ) -> Message:
-        message = Message(
-            message_body,
+        return Message(
+            MessageBody.build(message_body, self._body_compression),
             message_attributes=message_attributes,
             delay_seconds=delay_seconds,
+            **kwargs,
         )
 
-        return self._messages.add_message(message)
+    @_mutation
+    def add_message(
+        self,
+        message_body: Union[str, bytes, MessageBody],
+        message_attributes: Dict = None,
+        delay_seconds: int = 0,
+    ) -> Message:
+        message = self.build_message(message_body, message_attributes, delay_seconds)
+
+        self._last_accessed = time.monotonic()
+        with self._lock:
+            self._admit([message])
+            self._messages.add_message(message)
+        self._notify()
+        return message
+
+    @_mutation
+    def add_messages(self, messages: List[Message], check_budget: bool = True):
+        self._last_accessed = time.monotonic()
+        with self._lock:
+            self._admit(messages, check_budget)
+            self._messages.add_messages(messages)
+        self._notify()
+
+    def _notify(self):
+        # long pollingで待っているreceiveがある時だけ起こす
+        if self._waiting:
+            with self._condition:
+                self._condition.notify_all()
 
+    def _admit(self, messages: List[Message], check_budget: bool = True):
+        size = sum(message.memory_size for message in messages)
+        budget = self._memory_budget
+        with self._memory_lock:
+            if budget is not None and not check_budget:
+                budget.add(size)
+            elif budget is not None and not budget.reserve(
+                self.queue_url, self._memory_bytes, size
+            ):
+                if not budget.spill:
+                    raise OverLimit(
+                        f"The memory budget of {self.queue_name} "
+                        f"or the whole service is exceeded."
+                    )
+                spill_file = budget.spill_file
+                for message in messages:
+                    message.spill(spill_file)
+                size = sum(message.memory_size for message in messages)
+                budget.add(size)
+            self._memory_bytes += size
+
+    def _release(self, size: int):
+        with self._memory_lock:
+            self._memory_bytes -= size
+            if self._memory_budget is not None:
+                self._memory_budget.release(size)
+
+    def release_memory(self):
+        # storageから外されたqueueの分をbudgetから除く
+        with self._lock:
+            self._release(self._memory_bytes)
+
+    @_mutation
     def get_message(
-        self, visibility_timeout: int = None, max_number_of_messages: int = 1
+        self,
+        visibility_timeout: int = None,
+        max_number_of_messages: int = 1,
+        wait_seconds: float = 0,
+        long_poll: bool = False,
     ) -> List[Message]:
-        receive_messages = []
-        for message_generator in self._messages.get_messages():
-            for message in message_generator:
-                if message.is_callable():
-                    if visibility_timeout is None:
-                        message.update_deliverable_time(self.default_visibility_timeout)
-                    else:
-                        message.update_deliverable_time(visibility_timeout)
-                    receive_messages.append(message)
-                if len(receive_messages) == max_number_of_messages:
+        # long_pollは待たずに全partitionを見る(ReceiveMessageのWaitTimeSeconds)
+        self._last_accessed = time.monotonic()
+        if (
+            self._message_retention_seconds is not None
+            and self._last_accessed - self._last_expiry >= EXPIRY_INTERVAL
+        ):
+            self.expire_messages()
+        if wait_seconds <= 0:
+            with self._lock:
+                if long_poll:
+                    return self._get_message(visibility_timeout, max_number_of_messages)
+                # 短いpollingは分割したqueueでは一部のpartitionだけを見る
+                return self._messages.sample_messages(
+                    self._visibility_timeout(visibility_timeout),
+                    max_number_of_messages,
+                )
+        with self._condition:
+            # 待っているreceiveがいることをmessageを探す前に知らせ、通知を取りこぼさない
+            self._waiting += 1
+            try:
+                receive_messages = self._get_message(
+                    visibility_timeout, max_number_of_messages
+                )
+                if receive_messages:
                     return receive_messages
-        return receive_messages
+                deadline = time.monotonic() + wait_seconds
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return receive_messages
+                    # visibility timeoutが切れて見えるようになるmessageは通知されないので1秒ごとに見直す
+                    self._condition.wait(min(remaining, 1))
+                    receive_messages = self._get_message(
+                        visibility_timeout, max_number_of_messages
+                    )
+                    if receive_messages:
+                        return receive_messages
+            finally:
+                self._waiting -= 1
+
+    @_mutation
+    def expire_messages(self) -> int:
+        self._last_expiry = time.monotonic()
+        if self._message_retention_seconds is None:
+            return 0
+        with self._lock:
+            expired = self._messages.expire_messages(self._message_retention_seconds)
+            self._release(sum(message.memory_size for message in expired))
+        return len(expired)
+
+    def _visibility_timeout(self, visibility_timeout: Optional[int]) -> int:
+        return (
+            self.default_visibility_timeout
+            if visibility_timeout is None
+            else visibility_timeout
+        )
+
+    def _get_message(
+        self, visibility_timeout: Optional[int], max_number_of_messages: int
+    ) -> List[Message]:
+        return self._messages.claim_messages(
+            self._visibility_timeout(visibility_timeout), max_number_of_messages
+        )
+
+    @_mutation
+    def delete_message(self, message_id: str) -> bool:
+        self._last_accessed = time.monotonic()
+        with self._lock:
+            message = self._messages.get_message(message_id)
+            if not self._messages.delete_message(message_id):
+                return False
+            self._release(message.memory_size)
+            return True
+
+    @_mutation
+    def change_message_visibility(self, message_id: str, visibility_timeout: int):
+        self._last_accessed = time.monotonic()
+        with self._lock:
+            changed = self._messages.change_visibility(message_id, visibility_timeout)
+        if changed:
+            self._notify()
+
+    def has_message(self, message_id: str) -> bool:
+        return self._messages.get_message(message_id) is not None
 
+    def iter_messages(self) -> Iterator[Tuple[Message, float, int]]:
+        # (message, 次に可視になる時刻, 受信回数)
+        return self._messages.iter_messages()
+
+    def count_messages(self) -> Dict[str, int]:
+        with self._lock:
+            return self._messages.count_messages()
+
+    @_mutation
     def purge_message(self):
-        self._messages.truncate_messages()
+        with self._lock:
+            self._messages.truncate_messages()
+            self._release(self._memory_bytes)
 
+    @_mutation
     def set_tag(self, tag: Tag):
         self._tags[tag.name] = tag
+        self._version += 1
 
+    @_mutation
     def un_tag(self, tag_name: str):
         if tag_name not in self._tags:
             return
         del self._tags[tag_name]
+        self._version += 1
 
     def list_tags(self) -> List[Tag]:
         return list(self._tags.values())
 
+    def snapshot(self) -> QueueSnapshot:
+        with self._lock:
+            return QueueSnapshot(
+                dict(self._tags), self._messages.snapshot(), self._memory_bytes
+            )
+
+    def restore(self, snapshot: QueueSnapshot):
+        # hibernateで外れていたqueueもstorageに戻るので、転送をやめる
+        with self._mutation_lock:
+            self._successor = None
+            self._mutations += 1
+        self._tags = dict(snapshot.tags)
+        self._version += 1
+        with self._lock:
+            self._messages.restore(snapshot.messages)
+            # messageのsizeはsnapshot時点の合計を使う(messageを数え直さない)
+            self._release(self._memory_bytes)
+            with self._memory_lock:
+                self._memory_bytes = snapshot.memory_bytes
+            if self._memory_budget is not None:
+                self._memory_budget.add(snapshot.memory_bytes)
+
     def __eq__(self, other: Queue) -> bool:
         return (
             self.queue_url == other.queue_url
@@ -99,3 +432,10 @@ class Queue:
 class Tag:
     name: str
     value: str
+
+
+@dataclasses.dataclass()
+class QueueSnapshot:
+    tags: Dict[str, Tag]
+    messages: Any
+    memory_bytes: int = 0
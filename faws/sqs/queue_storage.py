@@ -1,10 +1,30 @@
 from __future__ import annotations
+import collections
+import dataclasses
 import enum
+import functools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
 from abc import abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 from faws.sqs import Queue
+from faws.sqs.hibernation import hibernate, rehydrate
+from faws.sqs.message import BodyCodec, BodyCompression
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.queue import QueueSnapshot
 from faws.sqs.error import NonExistentQueue
 
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from faws.sqs.memory import MemoryBudget
+    from faws.sqs.partition import Partition
+
 
 def build_queues_storage(storage_type: QueuesStorageType, **kwargs) -> QueueStorage:
     return storage_type.value(**kwargs)
@@ -14,23 +34,31 @@ class QueueStorage:
     def __init__(self, **kwargs):
         pass
 
-    @classmethod
     @abstractmethod
-    def init_storage(cls):
+    def init_storage(self):
         raise NotImplementedError
 
     @abstractmethod
     def queues(self):
         raise NotImplementedError
 
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        raise NotImplementedError
+
     @abstractmethod
-    def create_queue(self, queue_name) -> Queue:
+    def create_queue(self, queue_name, default_visibility_timeout: int = 30) -> Queue:
         raise NotImplementedError
 
     @abstractmethod
     def get_queues(self) -> List[Queue]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_queue_urls(self) -> List[str]:
+        raise NotImplementedError
+
     @abstractmethod
     def get_queue(self, queue_name: str) -> Queue:
         raise NotImplementedError
@@ -39,42 +67,297 @@ class QueueStorage:
     def delete_queue(self, queue_name: str):
         raise NotImplementedError
 
+    @abstractmethod
+    def hibernate_idle(self) -> int:
+        raise NotImplementedError
 
-class InMemoryQueueStorage(QueueStorage):
-    _queues = {}
+    @abstractmethod
+    def snapshot(self) -> QueueStorageSnapshot:
+        raise NotImplementedError
 
-    def __init__(self, **kwargs):
+    @abstractmethod
+    def restore(self, snapshot: QueueStorageSnapshot):
+        raise NotImplementedError
+
+    @abstractmethod
+    def release_snapshot(self, snapshot: QueueStorageSnapshot):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError
+
+
+@dataclasses.dataclass()
+class QueueStorageSnapshot:
+    queues: Dict[str, Tuple[Queue, QueueSnapshot]]
+    hibernated: Dict[str, Tuple[str, str]] = dataclasses.field(default_factory=dict)
+
+
+class InMemoryQueueStorage(QueueStorage):
+    def __init__(
+        self,
+        partition: Partition = None,
+        body_compression_threshold: int = None,
+        body_compression_codec: str = "zlib",
+        message_storage_type: str = "IN_MEMORY",
+        memory_budget: MemoryBudget = None,
+        hibernate_after_seconds: float = None,
+        max_resident_queues: int = None,
+        hibernation_directory: str = None,
+        hibernation_interval: float = 60,
+        queue_partitions: int = 1,
+        sampled_queue_partitions: int = None,
+        message_retention_seconds: float = None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
+        self._partition = partition
+        self._body_compression = (
+            BodyCompression(
+                body_compression_threshold, BodyCodec(body_compression_codec)
+            )
+            if body_compression_threshold is not None
+            else None
+        )
+        self._message_storage_type = MessageStorageType[message_storage_type]
+        self._memory_budget = memory_budget
+        # 1より大きければqueueのmessageをpartitionに分け、短いpollingは一部だけを見る
+        self._queue_partitions = queue_partitions
+        self._sampled_queue_partitions = sampled_queue_partitions
+        self._message_retention_seconds = message_retention_seconds
+        self._queues = {}
+        # queueの作成/削除のたびに増やす(response cacheの無効化に使う)
+        self._version = 0
+        self._lock = threading.RLock()
+        # idleなqueueはfileに書き出してmemoryから外し、次にaccessされた時に読み戻す
+        self._hibernate_after_seconds = hibernate_after_seconds
+        self._max_resident_queues = max_resident_queues
+        self._hibernation_directory = hibernation_directory
+        self._owns_hibernation_directory = False
+        self._hibernation_interval = hibernation_interval
+        # queue名 -> (queue url, file)
+        self._hibernated: Dict[str, Tuple[str, str]] = {}
+        # snapshotから参照されているfileは消さない(file -> 参照しているsnapshotの数)
+        self._snapshot_files: Dict[str, int] = collections.Counter()
+        # 書き出しはrequestを止めないようにbackgroundのthreadで行う
+        self._sweep_stopped = threading.Event()
+        self._sweeper = None
+        if self.hibernation_enabled and hibernation_interval > 0:
+            self._sweeper = threading.Thread(
+                target=self._sweep, name="faws-hibernate", daemon=True
+            )
+            self._sweeper.start()
+
+    @property
+    def hibernation_enabled(self) -> bool:
+        return (
+            self._hibernate_after_seconds is not None
+            or self._max_resident_queues is not None
+        )
 
-    @classmethod
-    def init_storage(cls):
-        cls._queues = {}
+    def init_storage(self):
+        # dictを差し替えるだけなのでqueue数に関係なくO(1)
+        with self._lock:
+            queues, self._queues = self._queues, {}
+            hibernated, self._hibernated = self._hibernated, {}
+            if self._memory_budget is not None:
+                for queue in queues.values():
+                    queue.release_memory()
+            for _, path in hibernated.values():
+                self._remove_file(path)
+            self._version += 1
 
     @property
     def queues(self):
-        return InMemoryQueueStorage._queues
+        return self._queues
 
-    def create_queue(self, queue_name: str) -> Queue:
-        if queue_name in self.queues:
-            return self.queues[queue_name]
-        queue = Queue(queue_name=queue_name)
-        InMemoryQueueStorage._queues[queue_name] = queue
+    @property
+    def hibernated(self) -> Dict[str, Tuple[str, str]]:
+        return self._hibernated
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def create_queue(
+        self, queue_name: str, default_visibility_timeout: int = 30
+    ) -> Queue:
+        with self._lock:
+            if queue_name in self._hibernated:
+                return self._rehydrate(queue_name)
+            if queue_name in self.queues:
+                return self.queues[queue_name]
+            queue = Queue(
+                queue_name=queue_name,
+                default_visibility_timeout=default_visibility_timeout,
+                partition=self._partition,
+                body_compression=self._body_compression,
+                message_storage_type=self._message_storage_type,
+                memory_budget=self._memory_budget,
+                partitions=self._queue_partitions,
+                sampled_partitions=self._sampled_queue_partitions,
+                message_retention_seconds=self._message_retention_seconds,
+            )
+            self._queues[queue_name] = queue
+            self._version += 1
 
         return queue
 
     def get_queues(self) -> List[Queue]:
+        # memory上にあるqueueのみ
         return list(self.queues.values())
 
+    def get_queue_urls(self) -> List[str]:
+        with self._lock:
+            return [queue.queue_url for queue in self._queues.values()] + [
+                queue_url for queue_url, _ in self._hibernated.values()
+            ]
+
     def get_queue(self, queue_name: str) -> Optional[Queue]:
-        if queue_name not in self.queues:
-            raise NonExistentQueue()
-        return self.queues.get(queue_name)
+        queue = self.queues.get(queue_name)
+        if queue is None:
+            with self._lock:
+                if queue_name in self._hibernated:
+                    return self._rehydrate(queue_name)
+                queue = self.queues.get(queue_name)
+            if queue is None:
+                raise NonExistentQueue()
+        if self.hibernation_enabled:
+            queue.touch()
+        return queue
 
     def delete_queue(self, queue_name: str) -> bool:
-        self.get_queue(queue_name)
-        del self._queues[queue_name]
+        with self._lock:
+            hibernated = self._hibernated.pop(queue_name, None)
+            if hibernated is not None:
+                self._remove_file(hibernated[1])
+            else:
+                queue = self.get_queue(queue_name)
+                del self._queues[queue_name]
+                queue.release_memory()
+            self._version += 1
         return True
 
+    def hibernate_idle(self) -> int:
+        # idleな時間がhibernate_after_secondsを超えたqueueと、
+        # max_resident_queuesを超えた分の最近使われていないqueueをfileに書き出す
+        # consumerやstreamがpinしているqueueは対象にしない
+        with self._lock:
+            queues = sorted(
+                (q for q in self._queues.values() if not q.pinned),
+                key=lambda q: q.last_accessed,
+            )
+            targets = []
+            if self._max_resident_queues is not None:
+                excess = len(self._queues) - self._max_resident_queues
+                targets = queues[: max(excess, 0)]
+            if self._hibernate_after_seconds is not None:
+                idle_since = time.monotonic() - self._hibernate_after_seconds
+                targets += [
+                    q for q in queues[len(targets) :] if q.last_accessed < idle_since
+                ]
+            if targets and self._hibernation_directory is None:
+                self._hibernation_directory = tempfile.mkdtemp(prefix="faws-hibernate-")
+                self._owns_hibernation_directory = True
+        return sum(1 for queue in targets if self._hibernate(queue))
+
+    def _sweep(self):
+        while not self._sweep_stopped.wait(self._hibernation_interval):
+            try:
+                self.hibernate_idle()
+            except Exception:
+                logger.exception("failed to hibernate idle queues")
+
+    def _hibernate(self, queue: Queue) -> bool:
+        # fileへの書き出しはlockの外で行い、その間に書き込まれたqueueはmemoryに残す
+        # 外した後にrequestが持っていたqueueへ書き込まれても、読み戻したqueueに転送される
+        mutations = queue.mutations()
+        if mutations is None:
+            return False
+        path = os.path.join(self._hibernation_directory, f"{uuid.uuid4()}.queue")
+        hibernate(queue, path)
+        with self._lock:
+            if self._queues.get(queue.queue_name) is not queue or not queue.detach(
+                mutations, functools.partial(self.get_queue, queue.queue_name)
+            ):
+                os.remove(path)
+                return False
+            del self._queues[queue.queue_name]
+            queue.release_memory()
+            self._hibernated[queue.queue_name] = (queue.queue_url, path)
+            self._version += 1
+        return True
+
+    def _rehydrate(self, queue_name: str) -> Queue:
+        _, path = self._hibernated.pop(queue_name)
+        queue = rehydrate(
+            path,
+            partition=self._partition,
+            body_compression=self._body_compression,
+            message_storage_type=self._message_storage_type,
+            memory_budget=self._memory_budget,
+            partitions=self._queue_partitions,
+            sampled_partitions=self._sampled_queue_partitions,
+            message_retention_seconds=self._message_retention_seconds,
+        )
+        self._remove_file(path)
+        self._queues[queue_name] = queue
+        self._version += 1
+        return queue
+
+    def _remove_file(self, path: str):
+        if self._snapshot_files[path] <= 0:
+            os.remove(path)
+
+    def snapshot(self) -> QueueStorageSnapshot:
+        # messageはcopyせずに共有するので、queue数にのみ比例する
+        # hibernateしているqueueはfileを共有する
+        with self._lock:
+            self._snapshot_files.update(path for _, path in self._hibernated.values())
+            return QueueStorageSnapshot(
+                {
+                    name: (queue, queue.snapshot())
+                    for name, queue in self._queues.items()
+                },
+                dict(self._hibernated),
+            )
+
+    def release_snapshot(self, snapshot: QueueStorageSnapshot):
+        # snapshotだけが参照していたfileを消す
+        with self._lock:
+            in_use = {path for _, path in self._hibernated.values()}
+            for _, path in snapshot.hibernated.values():
+                self._snapshot_files[path] -= 1
+                if self._snapshot_files[path] <= 0:
+                    del self._snapshot_files[path]
+                    if path not in in_use:
+                        os.remove(path)
+
+    def restore(self, snapshot: QueueStorageSnapshot):
+        with self._lock:
+            queues = {}
+            for name, (queue, queue_snapshot) in snapshot.queues.items():
+                queue.restore(queue_snapshot)
+                queues[name] = queue
+            for name, queue in self._queues.items():
+                if queues.get(name) is not queue:
+                    queue.release_memory()
+            for name, (_, path) in self._hibernated.items():
+                if snapshot.hibernated.get(name, (None, None))[1] != path:
+                    self._remove_file(path)
+            self._queues = queues
+            self._hibernated = dict(snapshot.hibernated)
+            self._version += 1
+
+    def close(self):
+        # memory上のqueueはflushするものはない。hibernateしたfileは一時directoryなら消す
+        self._sweep_stopped.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+        if self._owns_hibernation_directory:
+            shutil.rmtree(self._hibernation_directory, ignore_errors=True)
+
 
 class QueuesStorageType(enum.Enum):
     IN_MEMORY = InMemoryQueueStorage
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import dataclasses
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from faws.sqs.capture import Record
+from faws.sqs.loadgen import percentile
+from faws.sqs.query_client import QueryClient
+
+
+@dataclasses.dataclass()
+class ReplayResult:
+    action: str
+    recorded_ms: float
+    replayed_ms: float
+    recorded_status: int
+    status: int
+
+
+def _replay_connection(
+    endpoint: str,
+    records: List[Record],
+    started: float,
+    origin: float,
+    speed: Optional[float],
+) -> List[ReplayResult]:
+    # 1つのconnectionのrequestは記録された順に、同じkeep-aliveの接続で送る
+    client = QueryClient(endpoint)
+    results = []
+    try:
+        for record in records:
+            if speed is not None:
+                wait = started + (record.timestamp - origin) / speed - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            request_started = time.perf_counter()
+            try:
+                status = client.post(record.body, record.headers).status
+            except OSError:
+                status = 0
+            results.append(
+                ReplayResult(
+                    record.action,
+                    record.duration_ms,
+                    (time.perf_counter() - request_started) * 1000,
+                    record.status,
+                    status,
+                )
+            )
+    finally:
+        client.close()
+    return results
+
+
+def replay(
+    records: Iterable[Record],
+    endpoint: str,
+    speed: Optional[float] = 1.0,
+    max_connections: int = 256,
+) -> List[ReplayResult]:
+    # speedがNoneなら待たずにできるだけ速く送る
+    connections: Dict[str, List[Record]] = OrderedDict()
+    for record in records:
+        connections.setdefault(record.connection, []).append(record)
+    if not connections:
+        return []
+    origin = min(r[0].timestamp for r in connections.values())
+    started = time.monotonic()
+    with ThreadPoolExecutor(min(len(connections), max_connections)) as executor:
+        futures = [
+            executor.submit(
+                _replay_connection, endpoint, records, started, origin, speed
+            )
+            for records in connections.values()
+        ]
+        return [result for future in futures for result in future.result()]
+
+
+def summarize(results: List[ReplayResult]) -> Dict:
+    actions: Dict[str, List[ReplayResult]] = {}
+    for result in results:
+        actions.setdefault(result.action, []).append(result)
+    report = {}
+    for action, action_results in sorted(actions.items()):
+        recorded = sorted(r.recorded_ms for r in action_results)
+        replayed = sorted(r.replayed_ms for r in action_results)
+        report[action] = {
+            "requests": len(action_results),
+            "status_mismatches": sum(
+                1 for r in action_results if r.status != r.recorded_status
+            ),
+            "recorded_p50_ms": percentile(recorded, 50),
+            "recorded_p99_ms": percentile(recorded, 99),
+            "replayed_p50_ms": percentile(replayed, 50),
+            "replayed_p99_ms": percentile(replayed, 99),
+            "delta_p50_ms": percentile(replayed, 50) - percentile(recorded, 50),
+            "delta_p99_ms": percentile(replayed, 99) - percentile(recorded, 99),
+        }
+    return report
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"{'action':<28}{'requests':>10}{'mismatch':>10}"
+        f"{'p50 rec':>10}{'p50 rep':>10}{'p99 rec':>10}{'p99 rep':>10}"
+    ]
+    for action, r in report.items():
+        lines.append(
+            f"{action:<28}{r['requests']:>10}{r['status_mismatches']:>10}"
+            f"{r['recorded_p50_ms']:>10.3f}{r['replayed_p50_ms']:>10.3f}"
+            f"{r['recorded_p99_ms']:>10.3f}{r['replayed_p99_ms']:>10.3f}"
+        )
+    return "\n".join(lines)
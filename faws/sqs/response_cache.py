@@ -0,0 +1,102 @@
+from __future__ import annotations
+import dataclasses
+import threading
+from typing import Dict, Optional, Tuple
+from faws.sqs.queue import name_from_url
+from faws.sqs.queue_storage import QueueStorage
+from faws.sqs.result import Result, SuccessResult
+
+# 読み取りだけのactionと、responseを決めるparameter
+CACHEABLE_ACTIONS = {
+    "GetQueueUrl": ("QueueName", "QueueOwnerAWSAccountId"),
+    "ListQueues": ("QueueNamePrefix", "MaxResults", "NextToken"),
+    "ListQueueTags": ("QueueUrl",),
+}
+
+
+@dataclasses.dataclass()
+class CachedResult(Result):
+    # request idより前と後のxmlを持っておき、request idだけ差し込む
+    prefix: str
+    suffix: str
+    request_id: str
+    response_code: int = 200
+
+    def generate_response(self) -> str:
+        return self.prefix + self.request_id + self.suffix
+
+
+class ResponseCache:
+    # entryはcacheした時点のstorage/queueのversionを持ち、versionが変わっていればmissにする
+    # queueの作成/削除/tagの変更はversionを増やすので、明示的に消す必要はない
+    def __init__(self, max_entries: int = 1024, **kwargs):
+        self._max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[Tuple, str, str]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _key(self, queues: QueueStorage, request_data: Dict) -> Optional[Tuple]:
+        action = request_data.get("Action")
+        parameters = CACHEABLE_ACTIONS.get(action)
+        if parameters is None or self._max_entries <= 0:
+            return None
+        return (queues, action) + tuple(request_data.get(p) for p in parameters)
+
+    def version(self, queues: QueueStorage, request_data: Dict) -> Optional[Tuple]:
+        if request_data.get("Action") != "ListQueueTags":
+            return (queues.version,)
+        try:
+            queue = queues.queues.get(name_from_url(request_data.get("QueueUrl", "")))
+        except ValueError:
+            return None
+        if queue is None:
+            return None
+        return queues.version, queue.version
+
+    def get(
+        self, queues: QueueStorage, request_data: Dict, request_id: str
+    ) -> Optional[CachedResult]:
+        key = self._key(queues, request_data)
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != self.version(queues, request_data):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return CachedResult(entry[1], entry[2], request_id)
+
+    def put(
+        self,
+        queues: QueueStorage,
+        request_data: Dict,
+        version: Optional[Tuple],
+        result: SuccessResult,
+    ) -> Result:
+        # versionは実行前に取っておく(実行中に変更されたらその後のgetでmissになる)
+        key = self._key(queues, request_data)
+        if key is None or version is None:
+            return result
+        request_id = f"<RequestId>{result.request_id}</RequestId>"
+        prefix, _, suffix = result.generate_response().rpartition(request_id)
+        cached = CachedResult(
+            prefix + "<RequestId>", "</RequestId>" + suffix, result.request_id
+        )
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self._max_entries:
+                # 一番古いentryを捨てる
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (version, cached.prefix, cached.suffix)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "Entries": len(self._entries),
+            "Hits": self._hits,
+            "Misses": self._misses,
+        }
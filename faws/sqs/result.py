@@ -48,12 +48,13 @@ class ErrorResult(Result):
     response_code: int = 400
 
     def generate_response(self) -> str:
+        error_type = "Receiver" if self.response_code >= 500 else "Sender"
         return dict2xml(
             {
                 f"ErrorResponse": {
                     "Error": {
-                        "Type": "Sender",
-                        "Code": f"AWS.SimpleQueueService.{self.error.__class__.__name__}",
+                        "Type": error_type,
+                        "Code": self.error.code,
                         "Message": self.error.message,
                         "Detail": {},
                     },
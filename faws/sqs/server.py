@@ -1,7 +1,14 @@
-import urllib
+import time
+import urllib.parse
 import uuid
-from flask import Flask, request, Response, g, current_app
-from typing import Dict
+from flask import Flask, request, Response, g, current_app, has_request_context
+from typing import Dict, Optional, Union
+from faws.s3.blob_store import BlobStore
+from faws.s3.server import register_blob_routes
+from faws.sns.server import register_sns
+from faws.sqs.admin import register_admin_routes
+from faws.sqs.bootstrap import bootstrap
+from faws.sqs.capture import TrafficRecorder
 from faws.sqs.actions.message import send_message, receive_message
 from faws.sqs.actions.queue import (
     create_queue,
@@ -14,46 +21,139 @@ from faws.sqs.actions.queue import (
     untag_queue,
 )
 from faws.sqs.error import SQSError
-from faws.sqs.queue_storage import build_queues_storage, QueuesStorageType
+from faws.sqs.event_source import EventSourceMappings
+from faws.sqs.fault import FaultInjector
+from faws.sqs.memory import MemoryBudget
+from faws.sqs.partition import (
+    DEFAULT_ACCOUNT_ID,
+    DEFAULT_REGION,
+    Partition,
+    PartitionedQueueStorage,
+    partition_from_request,
+    access_key_from_headers,
+    partition_from_url,
+)
+from faws.sqs.profiler import Profiler
+from faws.sqs.queue import name_from_url, queue_url_for
+from faws.sqs.queue_storage import QueueStorage, QueuesStorageType
+from faws.sqs.response_cache import ResponseCache
 from faws.sqs.result import Result, ErrorResult, SuccessResult
+from faws.sqs.slow_log import (
+    ACTION,
+    BODY_READ,
+    FAULT_INJECTION,
+    GENERATE_RESPONSE,
+    PARSE_REQUEST_DATA,
+    QUEUE_LOOKUP,
+    THROTTLE,
+    RequestTimer,
+    SlowRequestLog,
+    mark_phase,
+)
+from faws.sqs.stream import register_stream_routes
+from faws.sqs.throttle import Throttler
 
 
 def init_queues():
-    queues = get_queues()
-    queues.init_storage()
+    current_app.extensions["partitions"].init_storage()
+
+
+def get_queues(queue_url: str = None) -> QueueStorage:
+    # storageはappごとに持つので、同じprocess内の別appとは状態を共有しない
+    partitions = current_app.extensions["partitions"]
+    if not has_request_context():
+        return partitions.default
+    return partitions.get(request_partition(queue_url))
 
 
-def get_queues():
-    if "queues" not in g:
-        g.queues = build_queues_storage(
-            current_app.config["QueuesStorageType"],
-            **current_app.config.get("QueuesStorageTypeConfig", {}),
+def request_partition(queue_url: str = None) -> Partition:
+    # queue urlにaccount/regionが含まれていればそれを、なければrequestの認証情報/hostから決める
+    partition = partition_from_url(queue_url) if queue_url is not None else None
+    if partition is None:
+        partition = partition_from_request(
+            request.headers,
+            request.host,
+            current_app.extensions["partitions"].default_partition,
+            current_app.config.get("AccessKeyAccounts"),
+        )
+    return partition
+
+
+def throttle_queue_url(request_data: Dict) -> Optional[str]:
+    # 同じqueueを指すurlの書き方が違っても同じbucketになるように、partitionとqueue名から作り直す
+    queue_url = request_data.get("QueueUrl")
+    try:
+        queue_name = (
+            name_from_url(queue_url)
+            if queue_url is not None
+            else request_data.get("QueueName")
         )
+    except ValueError:
+        return None
+    if queue_name is None:
+        return None
+    partition = request_partition(queue_url)
+    if partition == current_app.extensions["partitions"].default_partition:
+        partition = None
+    return queue_url_for(queue_name, partition)
 
-        return g.queues
-    return g.queues
 
+# bodyはdecodeせずbytesのまま扱う(strへの変換はresponse生成時)
+BYTES_PARAMETERS = {"MessageBody"}
 
-def parse_request_data(request_data: str):
+
+def unquote_form(value: bytes) -> bytes:
+    # application/x-www-form-urlencodedでは"+"は空白、"%2B"が"+"
+    return urllib.parse.unquote_to_bytes(value.replace(b"+", b" "))
+
+
+def parse_request_data(request_data: Union[str, bytes]):
+    if isinstance(request_data, str):
+        request_data = request_data.encode("utf-8")
     parsed_data = {}
-    for param in request_data.split("&"):
-        key, value = param.split("=")
-        parsed_data[key] = urllib.parse.unquote(value)
+    for param in request_data.split(b"&"):
+        key, value = param.split(b"=")
+        key = unquote_form(key).decode("utf-8")
+        value = unquote_form(value)
+        if key in BYTES_PARAMETERS:
+            parsed_data[key] = value
+        else:
+            parsed_data[key] = value.decode("utf-8", errors="replace")
 
     return parsed_data
 
 
 def do_operation(request_data: Dict, request_id: str) -> Result:
     action = request_data["Action"]
-    queues = get_queues()
+    # 同じendpointで受ける他のservice(SNS等)のaction
+    operation = current_app.extensions["operations"].get(action)
+    if operation is not None:
+        return operation(request_data, request_id)
+    queues = get_queues(request_data.get("QueueUrl"))
+    response_cache = current_app.extensions["response_cache"]
+    cached = response_cache.get(queues, request_data, request_id)
+    mark_phase(QUEUE_LOOKUP)
+    if cached is not None:
+        return cached
+    version = response_cache.version(queues, request_data)
     try:
         if action == "ListQueues":
-            return SuccessResult(
-                action, get_list_queues(queues, **request_data), request_id
+            return response_cache.put(
+                queues,
+                request_data,
+                version,
+                SuccessResult(
+                    action, get_list_queues(queues, **request_data), request_id
+                ),
             )
         if action == "GetQueueUrl":
-            return SuccessResult(
-                action, get_queue_url(queues, **request_data), request_id
+            return response_cache.put(
+                queues,
+                request_data,
+                version,
+                SuccessResult(
+                    action, get_queue_url(queues, **request_data), request_id
+                ),
             )
         if action == "CreateQueue":
             return SuccessResult(
@@ -70,8 +170,13 @@ def do_operation(request_data: Dict, request_id: str) -> Result:
         if action == "TagQueue":
             return SuccessResult(action, tag_queue(queues, **request_data), request_id)
         if action == "ListQueueTags":
-            return SuccessResult(
-                action, list_queue_tags(queues, **request_data), request_id
+            return response_cache.put(
+                queues,
+                request_data,
+                version,
+                SuccessResult(
+                    action, list_queue_tags(queues, **request_data), request_id
+                ),
             )
         if action == "UntagQueue":
             return SuccessResult(
@@ -86,16 +191,47 @@ def do_operation(request_data: Dict, request_id: str) -> Result:
                 action, receive_message(queues, **request_data), request_id
             )
     except SQSError as e:
-        return ErrorResult(e, request_id)
+        return ErrorResult(e, request_id, e.status_code)
 
     raise NotImplementedError()
 
 
 def run_request_to_index(request_):
     request_id = str(uuid.uuid4())
-    request_data = parse_request_data(request_.get_data().decode(encoding="utf-8"))
+    body = request_.get_data()
+    mark_phase(BODY_READ)
+    request_data = parse_request_data(body)
+    mark_phase(PARSE_REQUEST_DATA)
+    g.action = request_data.get("Action")
+    g.queue_url = request_data.get("QueueUrl")
+
+    throttler = current_app.extensions["throttler"]
+    if throttler is not None:
+        try:
+            throttler.check(
+                throttle_queue_url(request_data),
+                access_key_from_headers(request_.headers) or request_.remote_addr,
+            )
+        except SQSError as e:
+            return ErrorResult(e, request_id, e.status_code)
+        finally:
+            mark_phase(THROTTLE)
 
+    fault_injector = current_app.extensions["fault_injector"]
+    if fault_injector is None:
+        result = do_operation(request_data, request_id)
+        mark_phase(ACTION)
+        return result
+    try:
+        fault_injector.before(g.action)
+    except SQSError as e:
+        return ErrorResult(e, request_id, e.status_code)
+    finally:
+        mark_phase(FAULT_INJECTION)
     result = do_operation(request_data, request_id)
+    mark_phase(ACTION)
+    fault_injector.after(g.action, request_data, result)
+    mark_phase(FAULT_INJECTION)
 
     return result
 
@@ -105,14 +241,132 @@ def create_app(app_config: Dict = None):
     app.config["QueuesStorageType"] = QueuesStorageType.IN_MEMORY
     if app_config is not None:
         app.config.update(app_config)
+    if isinstance(app.config["QueuesStorageType"], str):
+        # json等の設定fileからは名前で指定する
+        app.config["QueuesStorageType"] = QueuesStorageType[
+            app.config["QueuesStorageType"]
+        ]
+    # 設定がなければNoneにして、sendごとのcostをなくす
+    app.extensions["memory_budget"] = (
+        MemoryBudget(**app.config["MemoryBudgetConfig"])
+        if "MemoryBudgetConfig" in app.config
+        else None
+    )
+    app.extensions["partitions"] = PartitionedQueueStorage(
+        app.config["QueuesStorageType"],
+        default_partition=Partition(
+            app.config.get("DefaultAccountId", DEFAULT_ACCOUNT_ID),
+            app.config.get("DefaultRegion", DEFAULT_REGION),
+        ),
+        memory_budget=app.extensions["memory_budget"],
+        **app.config.get("QueuesStorageTypeConfig", {}),
+    )
+    app.extensions["queues"] = app.extensions["partitions"].default
+    if "BootstrapConfig" in app.config:
+        bootstrap(app.extensions["partitions"], **app.config["BootstrapConfig"])
+    app.extensions["profiler"] = Profiler(**app.config.get("ProfilerConfig", {}))
+    app.extensions["response_cache"] = ResponseCache(
+        **app.config.get("ResponseCacheConfig", {})
+    )
+    # 設定がなければNoneにして、requestごとのcostをなくす
+    app.extensions["throttler"] = (
+        Throttler(**app.config["ThrottleConfig"])
+        if "ThrottleConfig" in app.config
+        else None
+    )
+    app.extensions["fault_injector"] = (
+        FaultInjector(**app.config["FaultConfig"])
+        if "FaultConfig" in app.config
+        else None
+    )
+    app.extensions["operations"] = {}
+    if "SnsConfig" in app.config:
+        register_sns(app, **app.config["SnsConfig"])
+    app.extensions["event_source_mappings"] = EventSourceMappings()
+    # directoryを設定した時だけ、admin apiからその下のfileへcaptureを始められる
+    capture_config = dict(app.config.get("CaptureConfig", {}))
+    app.extensions["capture_directory"] = capture_config.pop("directory", None)
+    app.extensions["recorder"] = (
+        TrafficRecorder(**capture_config) if "path" in capture_config else None
+    )
+    app.extensions["slow_log"] = (
+        SlowRequestLog(**app.config["SlowRequestLogConfig"])
+        if "SlowRequestLogConfig" in app.config
+        else None
+    )
 
-    @app.route("/", methods=["POST"])
-    def index():
+    def close_recorder():
+        if app.extensions["recorder"] is not None:
+            app.extensions["recorder"].close()
+
+    def close_slow_log():
+        if app.extensions["slow_log"] is not None:
+            app.extensions["slow_log"].close()
+
+    def close_memory_budget():
+        if app.extensions["memory_budget"] is not None:
+            app.extensions["memory_budget"].close()
+
+    # consumerを止めてからstorageを閉じる
+    app.extensions["shutdown_hooks"] = [
+        app.extensions["event_source_mappings"].stop_all,
+        close_recorder,
+        close_slow_log,
+        app.extensions["partitions"].close,
+        close_memory_budget,
+    ]
+
+    def handle_request():
         response_data = run_request_to_index(request)
+        body = response_data.generate_response()
+        mark_phase(GENERATE_RESPONSE)
         return Response(
-            response_data.generate_response(),
+            body,
             mimetype="text/xml",
             status=response_data.response_code,
         )
 
+    def dispatch():
+        profiler = app.extensions["profiler"]
+        if profiler.should_profile():
+            return profiler.profile(handle_request, lambda: g.get("action", "Unknown"))
+        return handle_request()
+
+    def queue_depth(queue_url: str):
+        # hibernateしているqueueは読み戻さない
+        try:
+            queue_name = name_from_url(queue_url)
+        except ValueError:
+            return None
+        queue = get_queues(queue_url).queues.get(queue_name)
+        return queue.depth if queue is not None else None
+
+    @app.route("/", methods=["POST"])
+    def index():
+        recorder = app.extensions["recorder"]
+        slow_log = app.extensions["slow_log"]
+        if recorder is None and slow_log is None:
+            return dispatch()
+        started = time.time()
+        if slow_log is not None:
+            g.request_timer = RequestTimer()
+        response = dispatch()
+        if recorder is not None:
+            recorder.record_request(request, response, started)
+        if slow_log is not None:
+            slow_log.record_request(
+                g.request_timer,
+                g.get("action"),
+                g.get("queue_url"),
+                response.status_code,
+                lambda: queue_depth(g.queue_url),
+            )
+        return response
+
+    register_admin_routes(app)
+    register_stream_routes(app, get_queues)
+    # extended client(大きいpayloadをS3に置く)用のblob storeを同じprocessで動かす
+    if "BlobStoreConfig" in app.config:
+        register_blob_routes(app, BlobStore(**app.config["BlobStoreConfig"]))
+
     return app
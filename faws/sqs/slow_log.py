@@ -0,0 +1,124 @@
+from __future__ import annotations
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+BODY_READ = "BodyRead"
+PARSE_REQUEST_DATA = "ParseRequestData"
+THROTTLE = "Throttle"
+FAULT_INJECTION = "FaultInjection"
+QUEUE_LOOKUP = "QueueLookup"
+ACTION = "Action"
+GENERATE_RESPONSE = "GenerateResponse"
+
+
+class RequestTimer:
+    # 前回markしてからの経過時間をphaseの時間として足していく
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self._last = self.started
+
+    def mark(self, phase: str):
+        now = time.monotonic()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+def mark_phase(phase: str):
+    # slow logが無効な時はtimerがないので何もしない
+    timer: Optional[RequestTimer] = g.get("request_timer")
+    if timer is not None:
+        timer.mark(phase)
+
+
+class SlowRequestLog:
+    # threshold_msを超えたrequestのphaseごとの時間をjson linesで書く(pathがなければlogger)
+    # requestを処理するthreadではqueueに積むだけにし、書き込みは別threadで行う
+    def __init__(
+        self,
+        threshold_ms: float = 1000,
+        path: str = None,
+        max_pending: int = 10000,
+        recent: int = 100,
+    ):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.logged = 0
+        self.dropped = 0
+        self._recent = collections.deque(maxlen=recent)
+        self._pending: queue.Queue = queue.Queue(max_pending)
+        self._file = open(path, "a", encoding="utf-8") if path is not None else None
+        self._writer = threading.Thread(
+            target=self._write, name="faws-slow-log", daemon=True
+        )
+        self._writer.start()
+
+    def record_request(
+        self,
+        timer: RequestTimer,
+        action: Optional[str],
+        queue_url: Optional[str],
+        status: int,
+        queue_depth: Callable[[], Optional[int]],
+    ):
+        duration_ms = timer.elapsed * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        record = {
+            "Timestamp": time.time(),
+            "Action": action,
+            "QueueUrl": queue_url,
+            "Status": status,
+            "DurationMs": round(duration_ms, 3),
+            "Phases": {k: round(v * 1000, 3) for k, v in timer.phases.items()},
+            # 遅いrequestの時だけ数える
+            "QueueDepth": queue_depth() if queue_url is not None else None,
+        }
+        try:
+            self._pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            record: Optional[Dict] = self._pending.get()
+            if record is None:
+                break
+            line = json.dumps(record, separators=(",", ":"))
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+            else:
+                logger.warning("slow request: %s", line)
+            self._recent.append(record)
+            self.logged += 1
+        if self._file is not None:
+            self._file.close()
+
+    def recent(self) -> List[Dict]:
+        return list(self._recent)
+
+    def close(self):
+        self._pending.put(None)
+        self._writer.join()
+
+    def status(self) -> Dict:
+        return {
+            "ThresholdMs": self.threshold_ms,
+            "Path": self.path,
+            "Logged": self.logged,
+            "Dropped": self.dropped,
+            "Pending": self._pending.qsize(),
+        }
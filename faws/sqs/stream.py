@@ -0,0 +1,96 @@
+import json
+import math
+import uuid
+from typing import Generator, List, Optional
+from flask import Flask, Response, request
+from faws.sqs.actions.message import message_data
+from faws.sqs.error import InvalidParameterValue, SQSError
+from faws.sqs.queue import Queue, name_from_url
+from faws.sqs.result import ErrorResult
+
+
+def stream_messages(
+    queue: Queue,
+    visibility_timeout: Optional[int] = None,
+    max_number_of_messages: int = 10,
+    message_attribute_names: List[str] = None,
+    heartbeat_seconds: float = 15,
+    limit: Optional[int] = None,
+) -> Generator[str, None, None]:
+    # server-sent eventsで、見えるようになったmessageをReceiveMessageと同じく
+    # visibility timeoutを設定してから送る
+    # 切断されたclientに送ったmessageはvisibility timeout後に再び見えるようになる
+    sent = 0
+    # 送っている間にhibernateされると、このqueueへのsendが届かなくなる
+    queue.pin()
+    try:
+        while limit is None or sent < limit:
+            messages = queue.get_message(
+                visibility_timeout,
+                (
+                    max_number_of_messages
+                    if limit is None
+                    else min(max_number_of_messages, limit - sent)
+                ),
+                wait_seconds=heartbeat_seconds,
+            )
+            if not messages:
+                # 切断を検知するためにcommentを送る
+                yield ": heartbeat\n\n"
+                continue
+            for message in messages:
+                data = json.dumps(message_data(message, message_attribute_names or []))
+                yield f"id: {message.message_id}\nevent: message\ndata: {data}\n\n"
+            sent += len(messages)
+    finally:
+        queue.unpin()
+
+
+def register_stream_routes(app: Flask, get_queues):
+    @app.route("/stream", methods=["GET"])
+    def stream():
+        params = request.args
+        try:
+            if "QueueUrl" not in params:
+                raise InvalidParameterValue("QueueUrl is required.")
+            try:
+                queue_name = name_from_url(params["QueueUrl"])
+                options = dict(
+                    visibility_timeout=(
+                        int(params["VisibilityTimeout"])
+                        if "VisibilityTimeout" in params
+                        else None
+                    ),
+                    max_number_of_messages=int(params.get("MaxNumberOfMessages", 10)),
+                    message_attribute_names=[
+                        v
+                        for k, v in params.items()
+                        if k.startswith("MessageAttributeName")
+                    ],
+                    heartbeat_seconds=float(params.get("HeartbeatSeconds", 15)),
+                    limit=int(params["Limit"]) if "Limit" in params else None,
+                )
+            except ValueError as e:
+                raise InvalidParameterValue(str(e))
+            # 0秒のheartbeatは待たずに回り続け、0件以下の指定はqueue全体をclaimしてしまう
+            if not (0 < options["heartbeat_seconds"] < math.inf):
+                raise InvalidParameterValue("HeartbeatSeconds must be positive.")
+            if not 1 <= options["max_number_of_messages"] <= 10:
+                raise InvalidParameterValue(
+                    "MaxNumberOfMessages must be between 1 and 10."
+                )
+            if options["limit"] is not None and options["limit"] < 1:
+                raise InvalidParameterValue("Limit must be 1 or more.")
+            queue = get_queues(params["QueueUrl"]).get_queue(queue_name)
+        except SQSError as e:
+            result = ErrorResult(e, str(uuid.uuid4()), e.status_code)
+            return Response(
+                result.generate_response(),
+                mimetype="text/xml",
+                status=result.response_code,
+            )
+        return Response(
+            stream_messages(queue, **options),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
@@ -0,0 +1,101 @@
+import collections
+import threading
+import time
+from typing import Callable, Dict, Optional
+from faws.sqs.error import RequestThrottled
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, tokens: float = 1) -> bool:
+        with self._lock:
+            now = self._clock()
+            # 経過時間分だけ補充する(timerは持たない)
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+
+class BucketGroup:
+    # keyごとのTokenBucketを必要になった時に作る
+    # keyはclientが自由に変えられるので、max_buckets個を超えたら最近使われていないものから捨てる
+    def __init__(
+        self,
+        rate: Optional[float],
+        burst: Optional[float],
+        overrides: Dict[str, Dict],
+        clock: Callable[[], float],
+        max_buckets: int = 10000,
+    ):
+        self._rate = rate
+        self._burst = burst
+        self._overrides = overrides
+        self._clock = clock
+        self._max_buckets = max_buckets
+        self._buckets: Dict[str, Optional[TokenBucket]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _build(self, key: str) -> Optional[TokenBucket]:
+        limit = self._overrides.get(key, {"rate": self._rate, "burst": self._burst})
+        if limit.get("rate") is None:
+            return None
+        return TokenBucket(limit["rate"], limit.get("burst"), self._clock)
+
+    def consume(self, key: str) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None and key not in self._buckets:
+                bucket = self._buckets[key] = self._build(key)
+                if len(self._buckets) > self._max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket is None or bucket.consume()
+
+
+class Throttler:
+    def __init__(
+        self,
+        queue_rate: float = None,
+        queue_burst: float = None,
+        client_rate: float = None,
+        client_burst: float = None,
+        queues: Dict[str, Dict] = None,
+        clients: Dict[str, Dict] = None,
+        max_buckets: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._queues = BucketGroup(
+            queue_rate, queue_burst, queues or {}, clock, max_buckets
+        )
+        self._clients = BucketGroup(
+            client_rate, client_burst, clients or {}, clock, max_buckets
+        )
+
+    def check(self, queue_url: Optional[str], client: Optional[str]):
+        # 呼び出し元の制限を先に見て、暴走しているclientがqueueのtokenを使い切らないようにする
+        # partitionが違えば同じ名前でも別のqueueなので、queueはurlで区別する
+        if client is not None and not self._clients.consume(client):
+            raise RequestThrottled()
+        if queue_url is not None and not self._queues.consume(queue_url):
+            raise RequestThrottled()
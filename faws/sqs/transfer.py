@@ -0,0 +1,241 @@
+from __future__ import annotations
+import dataclasses
+import datetime
+import json
+import os
+import shutil
+import struct
+import urllib.parse
+import urllib.request
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+from faws.sqs.capture import open_capture
+from faws.sqs.message import MessageAttribute
+from faws.sqs.queue import Queue
+
+NDJSON = "ndjson"
+BINARY = "binary"
+FORMATS = (NDJSON, BINARY)
+
+BINARY_MAGIC = b"FAWSMSG1"
+# 送信時刻, 次に可視になる時刻, 受信回数, id/attribute/bodyの長さ
+MESSAGE_HEADER = struct.Struct("<ddIHII")
+
+
+@dataclasses.dataclass()
+class ExportedMessage:
+    message_id: str
+    body: bytes
+    attributes: Optional[Dict[str, Dict]]
+    sent_timestamp: float
+    visible_timestamp: float
+    receive_count: int = 0
+
+    def to_json(self) -> Dict:
+        data = {
+            "MessageId": self.message_id,
+            "Body": self.body.decode("utf-8", errors="replace"),
+            "SentTimestamp": int(self.sent_timestamp * 1000),
+            "VisibleTimestamp": int(self.visible_timestamp * 1000),
+            "ReceiveCount": self.receive_count,
+        }
+        if self.attributes:
+            data["MessageAttributes"] = self.attributes
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict) -> ExportedMessage:
+        sent_timestamp = data.get("SentTimestamp")
+        visible_timestamp = data.get("VisibleTimestamp", sent_timestamp)
+        return cls(
+            data.get("MessageId"),
+            data["Body"].encode("utf-8"),
+            data.get("MessageAttributes"),
+            sent_timestamp / 1000 if sent_timestamp is not None else None,
+            visible_timestamp / 1000 if visible_timestamp is not None else None,
+            int(data.get("ReceiveCount", 0)),
+        )
+
+
+def format_from_path(path: str) -> str:
+    if path.endswith(".gz"):
+        path = path[: -len(".gz")]
+    return NDJSON if path.endswith((".ndjson", ".jsonl")) else BINARY
+
+
+def export_messages(queue: Queue) -> Iterator[ExportedMessage]:
+    for message, visible_timestamp, receive_count in queue.iter_messages():
+        attributes = message.message_attributes
+        yield ExportedMessage(
+            message.message_id,
+            message.body.to_bytes(),
+            {k: v.to_dict() for k, v in attributes.items()} if attributes else None,
+            message.message_inserted_at.timestamp(),
+            visible_timestamp,
+            receive_count,
+        )
+
+
+def encode_messages(
+    messages: Iterable[ExportedMessage], format_: str, chunk_size: int = 1000
+) -> Iterator[bytes]:
+    # 1 messageずつではなくchunk_size件ごとにまとめてwriteする
+    if format_ == BINARY:
+        yield BINARY_MAGIC
+    chunk: List[bytes] = []
+    for message in messages:
+        if format_ == BINARY:
+            message_id = message.message_id.encode("utf-8")
+            attributes = (
+                json.dumps(message.attributes, separators=(",", ":")).encode("utf-8")
+                if message.attributes
+                else b""
+            )
+            chunk.append(
+                MESSAGE_HEADER.pack(
+                    message.sent_timestamp,
+                    message.visible_timestamp,
+                    message.receive_count,
+                    len(message_id),
+                    len(attributes),
+                    len(message.body),
+                )
+            )
+            chunk.extend((message_id, attributes, message.body))
+        else:
+            chunk.append(
+                json.dumps(message.to_json(), separators=(",", ":")).encode("utf-8")
+                + b"\n"
+            )
+        if len(chunk) >= chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def decode_messages(stream: BinaryIO, format_: str) -> Iterator[ExportedMessage]:
+    if format_ == NDJSON:
+        for line in stream:
+            if line.strip():
+                yield ExportedMessage.from_json(json.loads(line))
+        return
+    if _read(stream, len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("not a faws message export")
+    while True:
+        header = _read(stream, MESSAGE_HEADER.size)
+        if len(header) < MESSAGE_HEADER.size:
+            return
+        (
+            sent_timestamp,
+            visible_timestamp,
+            receive_count,
+            message_id_length,
+            attributes_length,
+            body_length,
+        ) = MESSAGE_HEADER.unpack(header)
+        message_id = _read(stream, message_id_length).decode("utf-8")
+        attributes = _read(stream, attributes_length)
+        yield ExportedMessage(
+            message_id,
+            _read(stream, body_length),
+            json.loads(attributes) if attributes else None,
+            sent_timestamp,
+            visible_timestamp,
+            receive_count,
+        )
+
+
+def _read(stream: BinaryIO, size: int) -> bytes:
+    # socketのstreamは要求した長さより短く返すことがあるので、揃うまで読む
+    # (werkzeugのLimitedStreamは0 byteのreadを切断として扱うので読まない)
+    if size == 0:
+        return b""
+    data = stream.read(size)
+    while 0 < len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def import_messages(
+    queue: Queue,
+    messages: Iterable[ExportedMessage],
+    chunk_size: int = 10000,
+    check_budget: bool = True,
+    stats: Dict[str, int] = None,
+) -> Dict[str, int]:
+    # chunk_size件ごとにまとめてstorageへ入れるので、memoryに持つのは1 chunk分だけ
+    # 同じidのmessageが既にあれば飛ばす
+    # statsを渡すと、途中で失敗してもそれまでに入れた件数が残る
+    stats = {} if stats is None else stats
+    stats.update(Imported=0, Skipped=0)
+    chunk = []
+    chunk_ids = set()
+    for message in messages:
+        if message.message_id is not None and (
+            message.message_id in chunk_ids or queue.has_message(message.message_id)
+        ):
+            stats["Skipped"] += 1
+            continue
+        chunk.append(_build_message(queue, message))
+        chunk_ids.add(message.message_id)
+        if len(chunk) >= chunk_size:
+            queue.add_messages(chunk, check_budget)
+            stats["Imported"] += len(chunk)
+            chunk = []
+            chunk_ids = set()
+    if chunk:
+        queue.add_messages(chunk, check_budget)
+        stats["Imported"] += len(chunk)
+    return stats
+
+
+def _build_message(queue: Queue, message: ExportedMessage):
+    return queue.build_message(
+        message.body,
+        message_attributes=MessageAttribute.to_request_data(message.attributes),
+        message_id=message.message_id,
+        inserted_at=(
+            datetime.datetime.fromtimestamp(message.sent_timestamp)
+            if message.sent_timestamp is not None
+            else None
+        ),
+        deliverable_at=(
+            datetime.datetime.fromtimestamp(message.visible_timestamp)
+            if message.visible_timestamp is not None
+            else None
+        ),
+        receive_count=message.receive_count,
+    )
+
+
+def download(endpoint: str, queue_url: str, path: str, format_: str = None):
+    # admin apiからのresponseをそのままfileへ書く(.gzならここで圧縮する)
+    format_ = format_ or format_from_path(path)
+    query = urllib.parse.urlencode({"QueueUrl": queue_url, "Format": format_})
+    url = f"{endpoint.rstrip('/')}/admin/queues/export?{query}"
+    with urllib.request.urlopen(url) as response, open_capture(path, "wb") as f:
+        shutil.copyfileobj(response, f, 1 << 20)
+
+
+def upload(endpoint: str, queue_url: str, path: str, format_: str = None) -> Dict:
+    # .gzのfileは展開せずに送り、server側でstreamのまま展開する
+    format_ = format_ or format_from_path(path)
+    query = urllib.parse.urlencode({"QueueUrl": queue_url, "Format": format_})
+    headers = {
+        "Content-Length": str(os.path.getsize(path)),
+        "Content-Type": "application/octet-stream",
+    }
+    if path.endswith(".gz"):
+        headers["Content-Encoding"] = "gzip"
+    with open(path, "rb") as f:
+        request = urllib.request.Request(
+            f"{endpoint.rstrip('/')}/admin/queues/import?{query}",
+            data=f,
+            headers=headers,
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
@@ -0,0 +1,7 @@
+import sys
+
+# poetry install済みならpytest11のentry point、-p指定なら引数で既に読み込まれている
+# 二重に登録すると"Plugin already registered"になるので、未読み込みの時だけ登録する
+pytest_plugins = (
+    [] if "faws.sqs.pytest_plugin" in sys.modules else ["faws.sqs.pytest_plugin"]
+)
@@ -0,0 +1,63 @@
+import hashlib
+import io
+import pytest
+from faws.s3.blob_store import BlobStore
+from faws.s3.error import InvalidBucketName, NoSuchKey
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(directory=str(tmp_path), chunk_size=4)
+
+
+def test_put_and_get_object(store):
+    body = b"large message payload"
+    info = store.put_object("test-bucket", "a/b.json", io.BytesIO(body), len(body))
+
+    assert info.size == len(body)
+    assert info.etag == f'"{hashlib.md5(body).hexdigest()}"'
+    blob = store.get_object("test-bucket", "a/b.json")
+    assert blob.etag == info.etag
+    assert list(blob.iter_chunks(8)) == [
+        b"large me",
+        b"ssage pa",
+        b"yload",
+    ]
+    assert store.get_object("test-bucket", "a/b.json").read() == body
+
+
+def test_put_object_reads_only_content_length(store):
+    info = store.put_object("test-bucket", "key", io.BytesIO(b"0123456789"), 6)
+
+    assert info.size == 6
+    assert store.get_object("test-bucket", "key").read() == b"012345"
+
+
+def test_put_empty_object(store):
+    store.put_object("test-bucket", "empty", io.BytesIO(b""), 0)
+
+    assert store.get_object("test-bucket", "empty").read() == b""
+    assert store.head_object("test-bucket", "empty").size == 0
+
+
+def test_long_key(store):
+    key = "k" * 300
+    store.put_object("test-bucket", key, io.BytesIO(b"a"), 1)
+
+    assert store.get_object("test-bucket", key).read() == b"a"
+
+
+def test_delete_object(store):
+    store.put_object("test-bucket", "key", io.BytesIO(b"a"), 1)
+    store.delete_object("test-bucket", "key")
+    store.delete_object("test-bucket", "key")
+
+    with pytest.raises(NoSuchKey):
+        store.get_object("test-bucket", "key")
+    with pytest.raises(NoSuchKey):
+        store.head_object("test-bucket", "key")
+
+
+def test_invalid_bucket_name(store):
+    with pytest.raises(InvalidBucketName):
+        store.create_bucket("../etc")
@@ -0,0 +1,76 @@
+import threading
+import boto3
+import pytest
+from werkzeug.serving import make_server
+from faws.s3 import server
+from faws.sqs import server as sqs_server
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = server.create_app({"BlobStoreConfig": {"directory": str(tmp_path)}})
+    return app.test_client()
+
+
+def test_put_get_delete_object(client):
+    assert client.put("/test-bucket").status_code == 200
+
+    response = client.put("/test-bucket/a/b.json", data=b"payload")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"321c3cf486ed509164edec1e1981fec8"'
+
+    response = client.get("/test-bucket/a/b.json")
+    assert response.status_code == 200
+    assert response.data == b"payload"
+    assert response.headers["Content-Length"] == "7"
+
+    response = client.head("/test-bucket/a/b.json")
+    assert response.status_code == 200
+    assert response.headers["Content-Length"] == "7"
+
+    assert client.delete("/test-bucket/a/b.json").status_code == 204
+    response = client.get("/test-bucket/a/b.json")
+    assert response.status_code == 404
+    assert b"<Code>NoSuchKey</Code>" in response.data
+
+
+def test_sqs_app_with_blob_store(tmp_path):
+    app = sqs_server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "BlobStoreConfig": {"directory": str(tmp_path)},
+        }
+    )
+    client = app.test_client()
+
+    assert client.put("/test-bucket/key", data=b"a").status_code == 200
+    assert client.get("/test-bucket/key").data == b"a"
+    response = client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+    assert response.status_code == 200
+
+
+def test_boto3_client(tmp_path):
+    app = server.create_app({"BlobStoreConfig": {"directory": str(tmp_path)}})
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    s3 = boto3.client(
+        "s3",
+        endpoint_url=f"http://127.0.0.1:{httpd.server_port}",
+        region_name="us-east-1",
+        aws_access_key_id="dummy",
+        aws_secret_access_key="dummy",
+    )
+    body = b"x" * 300000
+    try:
+        s3.create_bucket(Bucket="test-bucket")
+        s3.put_object(Bucket="test-bucket", Key="large/payload", Body=body)
+
+        response = s3.get_object(Bucket="test-bucket", Key="large/payload")
+        assert response["Body"].read() == body
+        s3.delete_object(Bucket="test-bucket", Key="large/payload")
+        with pytest.raises(s3.exceptions.NoSuchKey):
+            s3.get_object(Bucket="test-bucket", Key="large/payload")
+    finally:
+        httpd.shutdown()
@@ -0,0 +1,62 @@
+import pytest
+from faws.sns.error import InvalidParameter
+from faws.sns.filter_policy import compile_filter_policy
+
+
+@pytest.mark.parametrize(
+    "policy,attributes,expected",
+    [
+        (None, {}, True),
+        ({"store": ["example_corp"]}, {"store": ("String", "example_corp")}, True),
+        ({"store": ["example_corp"]}, {"store": ("String", "other")}, False),
+        ({"store": ["example_corp"]}, {}, False),
+        ({"price": [100]}, {"price": ("Number", "100.0")}, True),
+        ({"price": [100]}, {"price": ("String", "100")}, False),
+        (
+            {"price": [{"numeric": [">", 0, "<=", 150]}]},
+            {"price": ("Number", "150")},
+            True,
+        ),
+        (
+            {"price": [{"numeric": [">", 0, "<=", 150]}]},
+            {"price": ("Number", "151")},
+            False,
+        ),
+        ({"event": [{"prefix": "order-"}]}, {"event": ("String", "order-1")}, True),
+        (
+            {"event": [{"anything-but": ["cancel", "refund"]}]},
+            {"event": ("String", "refund")},
+            False,
+        ),
+        ({"event": [{"anything-but": "cancel"}]}, {"event": ("String", "buy")}, True),
+        ({"event": [{"exists": False}]}, {}, True),
+        ({"event": [{"exists": True}]}, {}, False),
+        (
+            {"store": ["a", {"prefix": "b"}], "event": ["x"]},
+            {"store": ("String", "bc"), "event": ("String", "x")},
+            True,
+        ),
+        ('{"store": ["a"]}', {"store": ("String", "a")}, True),
+    ],
+)
+def test_compile_filter_policy(policy, attributes, expected):
+    assert compile_filter_policy(policy)(attributes) is expected
+
+
+@pytest.mark.parametrize(
+    "policy",
+    [
+        "{",
+        {"store": "a"},
+        {"store": [{"suffix": "a"}]},
+        {"p": [{"numeric": [">"]}]},
+        {"p": [{"numeric": [">", "abc"]}]},
+        {"p": [{"numeric": [">", [1]]}]},
+        {"p": [{"numeric": [">", True]}]},
+        {"p": [{"numeric": [[">"], 1]}]},
+        {"p": [{"numeric": 1}]},
+    ],
+)
+def test_invalid_filter_policy(policy):
+    with pytest.raises(InvalidParameter):
+        compile_filter_policy(policy)
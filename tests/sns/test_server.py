@@ -0,0 +1,140 @@
+import json
+import threading
+import boto3
+import pytest
+from werkzeug.serving import make_server
+from faws.sns import server
+
+TOPIC_ARN = "arn:aws:sns:us-east-1:000000000000:test_topic"
+
+
+def queue_arn(name: str) -> str:
+    return f"arn:aws:sqs:us-east-1:000000000000:{name}"
+
+
+@pytest.fixture
+def app():
+    return server.create_app()
+
+
+@pytest.fixture
+def endpoint(app):
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def sns(endpoint):
+    return boto3.client(
+        "sns",
+        endpoint_url=endpoint,
+        region_name="us-east-1",
+        aws_access_key_id="dummy",
+        aws_secret_access_key="dummy",
+    )
+
+
+def test_fan_out(app, sns):
+    queues = app.extensions["queues"]
+    for i in range(3):
+        queues.create_queue(f"queue{i}")
+    topic_arn = sns.create_topic(Name="test_topic")["TopicArn"]
+    assert topic_arn == TOPIC_ARN
+    for i in range(3):
+        sns.subscribe(
+            TopicArn=topic_arn, Protocol="sqs", Endpoint=queue_arn(f"queue{i}")
+        )
+    sns.subscribe(TopicArn=topic_arn, Protocol="sqs", Endpoint=queue_arn("not_exist"))
+
+    message_id = sns.publish(
+        TopicArn=topic_arn,
+        Message="hello",
+        Subject="greeting",
+        MessageAttributes={"store": {"DataType": "String", "StringValue": "a"}},
+    )["MessageId"]
+
+    messages = [queues.get_queue(f"queue{i}").get_message()[0] for i in range(3)]
+    # bodyは全queueで同じobjectを共有する
+    assert messages[0].body is messages[1].body is messages[2].body
+    envelope = json.loads(messages[0].message_body)
+    assert envelope["MessageId"] == message_id
+    assert envelope["TopicArn"] == topic_arn
+    assert envelope["Message"] == "hello"
+    assert envelope["Subject"] == "greeting"
+    assert envelope["MessageAttributes"] == {"store": {"Type": "String", "Value": "a"}}
+    assert sns.list_topics()["Topics"] == [{"TopicArn": topic_arn}]
+    assert (
+        len(sns.list_subscriptions_by_topic(TopicArn=topic_arn)["Subscriptions"]) == 4
+    )
+
+
+def test_raw_delivery_and_filter_policy(app, sns):
+    queues = app.extensions["queues"]
+    queues.create_queue("orders")
+    queues.create_queue("others")
+    topic_arn = sns.create_topic(Name="test_topic")["TopicArn"]
+    sns.subscribe(
+        TopicArn=topic_arn,
+        Protocol="sqs",
+        Endpoint=queue_arn("orders"),
+        Attributes={
+            "RawMessageDelivery": "true",
+            "FilterPolicy": json.dumps({"event": [{"prefix": "order"}]}),
+        },
+    )
+    subscription_arn = sns.subscribe(
+        TopicArn=topic_arn, Protocol="sqs", Endpoint=queue_arn("others")
+    )["SubscriptionArn"]
+    sns.set_subscription_attributes(
+        SubscriptionArn=subscription_arn,
+        AttributeName="FilterPolicy",
+        AttributeValue=json.dumps({"event": [{"anything-but": [{"prefix": "order"}]}]}),
+    )
+
+    response = sns.publish_batch(
+        TopicArn=topic_arn,
+        PublishBatchRequestEntries=[
+            {
+                "Id": f"{i}",
+                "Message": f"message{i}",
+                "MessageAttributes": {
+                    "event": {"DataType": "String", "StringValue": event}
+                },
+            }
+            for i, event in enumerate(["order_created", "user_created"])
+        ],
+    )
+    assert [e["Id"] for e in response["Successful"]] == ["0", "1"]
+    assert response["Failed"] == []
+
+    orders = queues.get_queue("orders").get_message(max_number_of_messages=10)
+    assert [m.message_body for m in orders] == ["message0"]
+    assert orders[0].message_attributes["event"].value == "order_created"
+    others = queues.get_queue("others").get_message(max_number_of_messages=10)
+    assert [json.loads(m.message_body)["Message"] for m in others] == ["message1"]
+
+    sns.unsubscribe(SubscriptionArn=subscription_arn)
+    sns.publish(TopicArn=topic_arn, Message="after unsubscribe")
+    assert queues.get_queue("others").get_message() == []
+
+
+def test_publish_to_non_exist_topic(sns):
+    with pytest.raises(sns.exceptions.NotFoundException):
+        sns.publish(TopicArn=TOPIC_ARN, Message="hello")
+
+
+@pytest.mark.parametrize(
+    "filter_policy", ["{", json.dumps({"a": [{"numeric": [">", "abc"]}]})]
+)
+def test_invalid_filter_policy(sns, filter_policy):
+    topic_arn = sns.create_topic(Name="test_topic")["TopicArn"]
+    with pytest.raises(sns.exceptions.InvalidParameterException):
+        sns.subscribe(
+            TopicArn=topic_arn,
+            Protocol="sqs",
+            Endpoint=queue_arn("queue"),
+            Attributes={"FilterPolicy": filter_policy},
+        )
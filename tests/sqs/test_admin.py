@@ -0,0 +1,28 @@
+def test_snapshot_and_restore(faws_sqs, faws_sqs_http_client):
+    queue_url = faws_sqs.create_queue(QueueName="test_queue")["QueueUrl"]
+    for i in range(10):
+        faws_sqs.send_message(QueueUrl=queue_url, MessageBody=f"{i}")
+    snapshot_id = faws_sqs_http_client.post("/admin/snapshots").get_json()["SnapshotId"]
+    assert faws_sqs_http_client.get("/admin/snapshots").get_json() == {
+        "SnapshotIds": [snapshot_id]
+    }
+
+    faws_sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)
+    faws_sqs.delete_queue(QueueUrl=queue_url)
+
+    response = faws_sqs_http_client.post(f"/admin/snapshots/{snapshot_id}/restore")
+    assert response.status_code == 200
+    messages = faws_sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)
+    assert [m["Body"] for m in messages["Messages"]] == [f"{i}" for i in range(10)]
+
+    response = faws_sqs_http_client.delete(f"/admin/snapshots/{snapshot_id}")
+    assert response.status_code == 200
+    assert faws_sqs_http_client.get("/admin/snapshots").get_json() == {
+        "SnapshotIds": []
+    }
+
+
+def test_restore_non_exist_snapshot(faws_sqs_http_client):
+    response = faws_sqs_http_client.post("/admin/snapshots/not_exist/restore")
+
+    assert response.status_code == 404
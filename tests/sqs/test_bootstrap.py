@@ -0,0 +1,108 @@
+import json
+import pytest
+from faws.sqs import server
+from faws.sqs.bootstrap import bootstrap
+from faws.sqs.partition import Partition, PartitionedQueueStorage
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+@pytest.fixture
+def bootstrap_dir(tmp_path):
+    with open(tmp_path / "orders.jsonl", "w") as f:
+        for i in range(3):
+            f.write(json.dumps({"MessageBody": f"order {i}"}) + "\n")
+    config = {
+        "Queues": [
+            {
+                "QueueName": "orders",
+                "Attributes": {"VisibilityTimeout": "60"},
+                "Tags": {"env": "ci"},
+                "Messages": [
+                    {
+                        "MessageBody": "hello",
+                        "MessageAttributes": {
+                            "City": {"DataType": "String", "StringValue": "Tokyo"}
+                        },
+                    },
+                    {"MessageBody": "later", "DelaySeconds": 60},
+                ],
+                "MessageFiles": ["orders.jsonl"],
+            },
+            {"QueueName": "other", "AccountId": "111111111111", "Region": "eu-west-1"},
+        ]
+    }
+    with open(tmp_path / "bootstrap.json", "w") as f:
+        json.dump(config, f)
+    return tmp_path
+
+
+def test_bootstrap(bootstrap_dir):
+    partitions = PartitionedQueueStorage(QueuesStorageType.IN_MEMORY)
+    stats = bootstrap(partitions, path=str(bootstrap_dir / "bootstrap.json"))
+    assert stats == {"Queues": 2, "Messages": 5}
+
+    queue = partitions.default.get_queue("orders")
+    assert queue.default_visibility_timeout == 60
+    assert [(tag.name, tag.value) for tag in queue.list_tags()] == [("env", "ci")]
+    assert queue.count_messages() == {
+        "ApproximateNumberOfMessages": 4,
+        "ApproximateNumberOfMessagesNotVisible": 1,
+    }
+    messages = queue.get_message(max_number_of_messages=10)
+    assert [m.message_body for m in messages] == [
+        "hello",
+        "order 0",
+        "order 1",
+        "order 2",
+    ]
+    assert messages[0].message_attributes["City"].value == "Tokyo"
+    assert len({m.message_id for m in messages}) == 4
+
+    other = partitions.get(Partition("111111111111", "eu-west-1")).get_queue("other")
+    assert other.queue_url.endswith("/eu-west-1/111111111111/other")
+
+
+def test_bootstrap_yaml(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    with open(tmp_path / "bootstrap.yaml", "w") as f:
+        yaml.safe_dump(
+            {"Queues": [{"QueueName": "test", "Messages": [{"MessageBody": "a"}]}]}, f
+        )
+    partitions = PartitionedQueueStorage(QueuesStorageType.IN_MEMORY)
+    bootstrap(partitions, path=str(tmp_path / "bootstrap.yaml"))
+    assert partitions.default.get_queue("test").count_messages() == {
+        "ApproximateNumberOfMessages": 1,
+        "ApproximateNumberOfMessagesNotVisible": 0,
+    }
+
+
+@pytest.mark.parametrize(
+    "queue_config",
+    [
+        {"Attributes": {"VisibilityTimeout": "30"}},
+        {"QueueName": "test", "Attributes": {"RedrivePolicy": "{}"}},
+    ],
+)
+def test_bootstrap_invalid(queue_config):
+    partitions = PartitionedQueueStorage(QueuesStorageType.IN_MEMORY)
+    with pytest.raises(ValueError):
+        bootstrap(partitions, queues=[queue_config])
+
+
+@pytest.mark.parametrize("message_storage_type", ["IN_MEMORY", "COLUMNAR"])
+def test_create_app_with_bootstrap(bootstrap_dir, message_storage_type):
+    app = server.create_app(
+        {
+            "BootstrapConfig": {"path": str(bootstrap_dir / "bootstrap.json")},
+            "QueuesStorageTypeConfig": {"message_storage_type": message_storage_type},
+        }
+    )
+    with app.test_client() as client:
+        response = client.post(
+            "/",
+            data="Action=ReceiveMessage&MaxNumberOfMessages=10"
+            "&QueueUrl=https://localhost:5000/queues/orders",
+        )
+        assert response.data.count(b"<Body>") == 4
+        response = client.post("/", data="Action=GetQueueUrl&QueueName=orders")
+        assert response.status_code == 200
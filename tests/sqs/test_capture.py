@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import pytest
+from werkzeug.serving import make_server
+from faws import cli
+from faws.serve import ServeConfig, build_server
+from faws.sqs import server
+from faws.sqs.capture import Record, open_capture, read_records, write_record
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue_storage import QueuesStorageType
+from faws.sqs.replay import replay, summarize
+
+QUEUE_URL = "https://localhost:5000/queues/test_queue"
+
+
+def serve(app):
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, f"http://127.0.0.1:{httpd.server_port}"
+
+
+@pytest.fixture
+def target():
+    app = server.create_app({"QueuesStorageType": QueuesStorageType.IN_MEMORY})
+    httpd, endpoint = serve(app)
+    yield app, endpoint
+    httpd.shutdown()
+
+
+@pytest.mark.parametrize("name", ["capture.log", "capture.log.gz"])
+def test_write_and_read_records(tmp_path, name):
+    path = str(tmp_path / name)
+    records = [
+        Record(1.5, 0.25, 200, "127.0.0.1:1", {"Host": "localhost"}, b"Action=A"),
+        Record(2.5, 1.0, 400, "127.0.0.1:2", {}, b"Action=B&MessageBody=%00"),
+    ]
+    with open_capture(path, "wb") as f:
+        for record in records:
+            write_record(f, record)
+
+    assert list(read_records(path)) == records
+    assert [r.action for r in records] == ["A", "B"]
+
+
+def test_capture_and_replay(tmp_path, target, capsys):
+    pytest.importorskip("waitress")
+    path = str(tmp_path / "capture.log")
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "CaptureConfig": {"path": path},
+        }
+    )
+    # keep-aliveの接続ごとの順序を記録するため、waitressで動かす
+    capture_server = build_server(app, ServeConfig(port=0))
+    thread = threading.Thread(target=capture_server.run, daemon=True)
+    thread.start()
+    client = QueryClient(f"http://127.0.0.1:{capture_server.effective_port}")
+    try:
+        assert client.call("CreateQueue", QueueName="test_queue").ok
+        for i in range(5):
+            assert client.call("SendMessage", QueueUrl=QUEUE_URL, MessageBody=f"{i}").ok
+        assert not client.call("GetQueueUrl", QueueName="not_exist").ok
+        http_client = app.test_client()
+        assert http_client.get("/admin/capture").get_json()["Path"] == path
+        assert http_client.delete("/admin/capture").get_json()["Recorded"] == 7
+    finally:
+        client.close()
+        capture_server.close()
+
+    records = list(read_records(path))
+    assert [r.action for r in records] == ["CreateQueue"] + ["SendMessage"] * 5 + [
+        "GetQueueUrl"
+    ]
+    # keep-aliveの同じ接続のrequestとして記録される
+    assert len({r.connection for r in records}) == 1
+
+    target_app, target_endpoint = target
+    report = summarize(replay(records, target_endpoint, speed=None))
+    assert report["SendMessage"]["requests"] == 5
+    assert all(r["status_mismatches"] == 0 for r in report.values())
+    messages = (
+        target_app.extensions["queues"]
+        .get_queue("test_queue")
+        .get_message(max_number_of_messages=10)
+    )
+    assert [m.message_body for m in messages] == [f"{i}" for i in range(5)]
+
+    cli.main(["replay", path, "--endpoint", target_endpoint, "--speed", "100"])
+    assert "SendMessage" in capsys.readouterr().out
+
+
+def test_replay_speed(target):
+    _, endpoint = target
+    records = [Record(t, 1.0, 200, "c", {}, b"Action=ListQueues") for t in [0.0, 0.2]]
+    started = time.monotonic()
+    replay(records, endpoint, speed=2)
+    assert time.monotonic() - started >= 0.1
+
+
+def test_admin_capture_is_limited_to_directory(tmp_path):
+    with server.create_app().test_client() as client:
+        assert client.post("/admin/capture", json={"Path": "a.log"}).status_code == 404
+
+    app = server.create_app({"CaptureConfig": {"directory": str(tmp_path)}})
+    assert app.extensions["recorder"] is None
+    with app.test_client() as client:
+        for path in [str(tmp_path / "a.log"), "../a.log", "a/../../a.log", "", None]:
+            response = client.post("/admin/capture", json={"Path": path})
+            assert response.status_code == 400
+        # directoryの外を指すsymlinkも辿らない
+        (tmp_path / "link").symlink_to(tmp_path.parent)
+        assert (
+            client.post("/admin/capture", json={"Path": "link/a.log"}).status_code
+            == 400
+        )
+
+        response = client.post("/admin/capture", json={"Path": "capture.log"})
+        assert response.get_json()["Path"] == os.path.realpath(tmp_path / "capture.log")
+        assert client.delete("/admin/capture").status_code == 200
@@ -0,0 +1,127 @@
+import pytest
+from unittest import mock
+from faws.sqs.client import Client, install_botocore_hook
+from faws.sqs.error import NonExistentQueue
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+def without_metadata(response):
+    assert response.pop("ResponseMetadata")["HTTPStatusCode"] == 200
+    return response
+
+
+def test_create_queue(client):
+    assert without_metadata(client.create_queue(QueueName="test_queue")) == {
+        "QueueUrl": "https://localhost:5000/queues/test_queue"
+    }
+    assert without_metadata(client.get_queue_url(QueueName="test_queue")) == {
+        "QueueUrl": "https://localhost:5000/queues/test_queue"
+    }
+
+
+def test_get_queue_url_non_exist(client):
+    with pytest.raises(NonExistentQueue):
+        client.get_queue_url(QueueName="test_queue")
+
+
+def test_list_queues(client):
+    assert without_metadata(client.list_queues()) == {}
+    client.create_queue(QueueName="test_queue_1")
+    client.create_queue(QueueName="other_queue")
+
+    assert without_metadata(client.list_queues()) == {
+        "QueueUrls": [
+            "https://localhost:5000/queues/test_queue_1",
+            "https://localhost:5000/queues/other_queue",
+        ]
+    }
+    assert without_metadata(client.list_queues(QueueNamePrefix="test")) == {
+        "QueueUrls": ["https://localhost:5000/queues/test_queue_1"]
+    }
+
+
+def test_delete_queue(client):
+    queue_url = client.create_queue(QueueName="test_queue")["QueueUrl"]
+    client.delete_queue(QueueUrl=queue_url)
+
+    assert without_metadata(client.list_queues()) == {}
+
+
+def test_tags(client):
+    queue_url = client.create_queue(QueueName="test_queue", tags={"a": "1"})["QueueUrl"]
+    client.tag_queue(QueueUrl=queue_url, Tags={"b": "2", "c": "3"})
+    client.untag_queue(QueueUrl=queue_url, TagKeys=["c"])
+
+    assert without_metadata(client.list_queue_tags(QueueUrl=queue_url)) == {
+        "Tags": {"a": "1", "b": "2"}
+    }
+
+
+def test_send_and_receive_message(client):
+    queue_url = client.create_queue(QueueName="test_queue")["QueueUrl"]
+    with mock.patch("faws.sqs.message.generate_uuid", return_value="1111"):
+        response = client.send_message(
+            QueueUrl=queue_url,
+            MessageBody="hello",
+            MessageAttributes={
+                "City": {"DataType": "String", "StringValue": "Tokyo"},
+                "Population": {"DataType": "Number", "StringValue": "100"},
+            },
+        )
+    assert without_metadata(response) == {
+        "MD5OfMessageBody": "hogehoge",
+        "MD5OfMessageAttributes": "hugahuga",
+        "MessageId": "1111",
+    }
+
+    assert without_metadata(
+        client.receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=10, MessageAttributeNames=["City"]
+        )
+    ) == {
+        "Messages": [
+            {
+                "MessageId": "1111",
+                "ReceiptHandle": "barbar",
+                "MD5OfBody": "hogehoge",
+                "Body": "hello",
+                "MessageAttributes": {
+                    "City": {"DataType": "String", "StringValue": "Tokyo"}
+                },
+            }
+        ]
+    }
+    # 受信済みのmessageは不可視になる
+    assert without_metadata(client.receive_message(QueueUrl=queue_url)) == {}
+
+
+def test_purge_queue(client):
+    queue_url = client.create_queue(QueueName="test_queue")["QueueUrl"]
+    client.send_message(QueueUrl=queue_url, MessageBody="hello")
+    client.purge_queue(QueueUrl=queue_url)
+
+    assert without_metadata(client.receive_message(QueueUrl=queue_url)) == {}
+
+
+def test_botocore_hook(client):
+    boto3 = pytest.importorskip("boto3")
+    botocore_exceptions = pytest.importorskip("botocore.exceptions")
+    sqs = boto3.client(
+        "sqs",
+        region_name="us-east-1",
+        endpoint_url="http://localhost:1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    install_botocore_hook(sqs, client)
+
+    queue_url = sqs.create_queue(QueueName="test_queue")["QueueUrl"]
+    sqs.send_message(QueueUrl=queue_url, MessageBody="hello")
+
+    assert sqs.receive_message(QueueUrl=queue_url)["Messages"][0]["Body"] == "hello"
+    with pytest.raises(botocore_exceptions.ClientError):
+        sqs.get_queue_url(QueueName="not_exist")
@@ -0,0 +1,172 @@
+import threading
+from unittest import mock
+import pytest
+from werkzeug.serving import make_server
+from faws import cli
+from faws.sqs import server
+from faws.sqs.consistency import (
+    CHANGE_VISIBILITY,
+    DELETE,
+    DUPLICATE_DELIVERY,
+    LOST_MESSAGE,
+    RECEIVE,
+    REDELIVERED_AFTER_DELETE,
+    SEND,
+    UNKNOWN_MESSAGE,
+    Operation,
+    StressConfig,
+    check_history,
+    run_http,
+    run_in_process,
+    summarize,
+)
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.query_client import QueryClient
+from faws.sqs.queue import Queue
+
+
+@pytest.fixture
+def endpoint():
+    app = server.create_app()
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def send(started, message_id="m1", worker="w1"):
+    return Operation(worker, SEND, started, started + 0.01, [message_id])
+
+
+def receive(started, visibility_timeout=30, message_id="m1", worker="w2"):
+    return Operation(
+        worker, RECEIVE, started, started + 0.01, [message_id], visibility_timeout
+    )
+
+
+def kinds(history):
+    return [violation.kind for violation in check_history(history)]
+
+
+def test_check_history_without_violations():
+    assert (
+        kinds(
+            [
+                send(0),
+                receive(1, 2),
+                # visibility timeoutが切れてからの再配信
+                receive(3.5, 30, worker="w3"),
+                Operation("w3", DELETE, 4, 4.01, ["m1"]),
+            ]
+        )
+        == []
+    )
+
+
+def test_duplicate_delivery():
+    assert kinds([send(0), receive(1), receive(2, worker="w3")]) == [DUPLICATE_DELIVERY]
+    # visibilityを0にした後なら受信できる
+    change = Operation("w2", CHANGE_VISIBILITY, 1.5, 1.51, ["m1"], 0)
+    assert kinds([send(0), receive(1), change, receive(2, worker="w3")]) == []
+
+
+def test_overlapping_receives_can_be_reordered():
+    # w3の受信がw2より先に起き、w3がvisibilityを0にした後にw2の受信が終わったとみなせる
+    first = Operation("w2", RECEIVE, 1, 1.5, ["m1"], 30)
+    second = Operation("w3", RECEIVE, 1.1, 1.11, ["m1"], 30)
+    change = Operation("w3", CHANGE_VISIBILITY, 1.2, 1.21, ["m1"], 0)
+    assert kinds([send(0), first, second, change]) == []
+
+
+def test_lost_and_unknown_messages():
+    assert kinds([send(0)]) == [LOST_MESSAGE]
+    assert kinds([send(0), receive(1, message_id="m2")]) == [
+        LOST_MESSAGE,
+        UNKNOWN_MESSAGE,
+    ]
+    assert kinds([send(1), receive(0)]) == [UNKNOWN_MESSAGE]
+    # 失敗したsendがserverに届いていた可能性がある時はunknownにしない
+    failed = Operation("w1", SEND, 0, 0.01, [], ok=False)
+    assert kinds([failed, receive(1)]) == []
+
+
+def test_redelivered_after_delete():
+    history = [
+        send(0),
+        receive(1, 1),
+        Operation("w2", DELETE, 1.1, 1.11, ["m1"]),
+        receive(3, worker="w3"),
+    ]
+    assert kinds(history) == [REDELIVERED_AFTER_DELETE]
+    # 存在しないmessageのdelete(False)は数えない
+    history[2].ok = False
+    assert kinds(history) == []
+
+
+@pytest.mark.parametrize("partitions", [1, 4])
+@pytest.mark.parametrize("message_storage_type", list(MessageStorageType))
+def test_run_in_process(message_storage_type, partitions):
+    queue = Queue(
+        "test", message_storage_type=message_storage_type, partitions=partitions
+    )
+    history = run_in_process(
+        queue, StressConfig(workers=4, duration=0.3, visibility_timeouts=(1,), seed=1)
+    )
+    report = summarize(history, check_history(history))
+    assert report["Violations"] == []
+    assert {SEND, RECEIVE, DELETE, CHANGE_VISIBILITY} <= set(report["Operations"])
+    assert report["Messages"] > 0
+
+
+def test_broken_visibility_is_detected():
+    queue = Queue("test")
+    original = queue._messages.claim_messages
+    # visibility timeoutを無視してすぐに見えるようにしてしまうstorage
+    with mock.patch.object(
+        queue._messages, "claim_messages", side_effect=lambda vt, n: original(0, n)
+    ):
+        history = run_in_process(
+            queue,
+            StressConfig(
+                workers=4,
+                duration=0.3,
+                visibility_timeouts=(1,),
+                delete_ratio=0,
+                change_visibility_ratio=0,
+            ),
+        )
+    assert DUPLICATE_DELIVERY in kinds(history)
+
+
+def test_run_http(endpoint):
+    queue_url = "https://localhost:5000/queues/test"
+    client = QueryClient(endpoint)
+    client.call("CreateQueue", QueueName="test")
+    client.close()
+    history = run_http(
+        endpoint,
+        queue_url,
+        StressConfig(workers=2, duration=0.3, visibility_timeouts=(1,)),
+    )
+    assert check_history(history) == []
+    assert {SEND, RECEIVE} == {operation.kind for operation in history}
+
+
+def test_cli_in_process(capsys):
+    assert (
+        cli.main(
+            [
+                "stress",
+                "--in-process",
+                "--duration",
+                "0.2",
+                "--workers",
+                "2",
+                "--visibility-timeouts",
+                "1",
+            ]
+        )
+        == 0
+    )
+    assert "violations: 0" in capsys.readouterr().out
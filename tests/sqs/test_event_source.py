@@ -0,0 +1,254 @@
+import sys
+import threading
+import time
+import pytest
+from faws.sqs import server
+from faws.sqs.event_source import EventSourceMappings, build_event, command_handler
+from faws.sqs.queue import Queue
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError()
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def mappings():
+    mappings = EventSourceMappings()
+    yield mappings
+    mappings.stop_all()
+
+
+def test_build_event():
+    queue = Queue("test_queue")
+    message = queue.add_message(
+        "body",
+        message_attributes={
+            "MessageAttribute.1.Name": "City",
+            "MessageAttribute.1.Value.DataType": "String",
+            "MessageAttribute.1.Value.StringValue": "Tokyo",
+        },
+    )
+
+    assert build_event(queue, [message]) == {
+        "Records": [
+            {
+                "messageId": message.message_id,
+                "receiptHandle": message.message_id,
+                "body": "body",
+                "attributes": {},
+                "messageAttributes": {
+                    "City": {"StringValue": "Tokyo", "DataType": "String"}
+                },
+                "eventSource": "aws:sqs",
+                "eventSourceARN": "arn:aws:sqs:us-east-1:000000000000:test_queue",
+                "awsRegion": "us-east-1",
+            }
+        ]
+    }
+
+
+def test_mapping_deletes_succeeded_messages(mappings):
+    queue = Queue("test_queue")
+    bodies = []
+    lock = threading.Lock()
+
+    def handler(event):
+        with lock:
+            bodies.extend(record["body"] for record in event["Records"])
+
+    for i in range(20):
+        queue.add_message(f"{i}")
+    mapping = mappings.create(
+        queue, handler, batch_size=5, concurrency=2, poll_seconds=0.05
+    )
+    wait_until(lambda: mapping.describe()["Metrics"]["Succeeded"] == 20)
+
+    assert sorted(bodies, key=int) == [f"{i}" for i in range(20)]
+    assert queue.get_message() == []
+    metrics = mapping.describe()["Metrics"]
+    assert metrics["Batches"] >= 4
+    assert metrics["Failed"] == 0
+
+
+def test_mapping_batch_window(mappings):
+    queue = Queue("test_queue")
+    batches = []
+    mapping = mappings.create(
+        queue,
+        lambda event: batches.append(len(event["Records"])),
+        batch_size=3,
+        batch_window=1,
+        poll_seconds=0.05,
+    )
+    for i in range(3):
+        queue.add_message(f"{i}")
+        time.sleep(0.05)
+    wait_until(lambda: mapping.describe()["Metrics"]["Batches"] == 1)
+
+    assert batches == [3]
+
+
+def test_mapping_failures(mappings):
+    queue = Queue("test_queue")
+    ok = queue.add_message("ok")
+    ng = queue.add_message("ng")
+    calls = []
+
+    def handler(event):
+        calls.append(len(event["Records"]))
+        if len(calls) == 1:
+            return {"batchItemFailures": [{"itemIdentifier": ng.message_id}]}
+        raise RuntimeError()
+
+    mapping = mappings.create(
+        queue, handler, failure_visibility_timeout=0, poll_seconds=0.05
+    )
+    wait_until(lambda: mapping.describe()["Metrics"]["HandlerErrors"] >= 1)
+    mappings.delete(mapping.uuid)
+
+    metrics = mapping.describe()["Metrics"]
+    assert calls[:2] == [2, 1]
+    assert metrics["Succeeded"] == 1
+    assert queue._messages.get_message(ok.message_id) is None
+    assert queue._messages.get_message(ng.message_id) is not None
+    assert mapping.describe()["State"] == "Disabled"
+
+
+def test_mapping_ignores_unknown_failures(mappings):
+    queue = Queue("test_queue")
+    ok = queue.add_message("ok")
+    ng = queue.add_message("ng")
+
+    def handler(event):
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": ng.message_id},
+                {"itemIdentifier": ng.message_id},
+                {"itemIdentifier": "unknown"},
+            ]
+        }
+
+    mapping = mappings.create(
+        queue, handler, failure_visibility_timeout=60, poll_seconds=0.05
+    )
+    wait_until(lambda: mapping.describe()["Metrics"]["Messages"] == 2)
+
+    metrics = mapping.describe()["Metrics"]
+    assert metrics["Succeeded"] == 1
+    assert metrics["Failed"] == 1
+    assert queue._messages.get_message(ok.message_id) is None
+
+
+def test_mapping_stop_keeps_pin_until_workers_exit(mappings):
+    queue = Queue("test_queue")
+    queue.add_message("body")
+    entered = threading.Event()
+    release = threading.Event()
+
+    def handler(event):
+        entered.set()
+        release.wait()
+
+    mapping = mappings.create(queue, handler, poll_seconds=0.05)
+    assert entered.wait(5)
+    mapping.stop(0.05)
+
+    assert mapping.running
+    assert queue.pinned
+
+    release.set()
+    wait_until(lambda: not mapping.running)
+    wait_until(lambda: not queue.pinned)
+
+
+def test_command_handler():
+    handler = command_handler(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys; event = json.load(sys.stdin); "
+            "print(json.dumps({'batchItemFailures': "
+            "[{'itemIdentifier': event['Records'][0]['messageId']}]}))",
+        ]
+    )
+
+    assert handler({"Records": [{"messageId": "1"}]}) == {
+        "batchItemFailures": [{"itemIdentifier": "1"}]
+    }
+
+
+def test_admin_event_source_mappings():
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "EventSourceCommands": {"noop": [sys.executable, "-c", "pass"]},
+        }
+    )
+    client = app.test_client()
+    app.extensions["queues"].create_queue("test_queue")
+
+    response = client.post(
+        "/admin/event-source-mappings",
+        json={
+            "QueueUrl": "https://localhost:5000/queues/test_queue",
+            "Command": "noop",
+            "BatchSize": 5,
+            "VisibilityTimeout": "30",
+        },
+    )
+    assert response.status_code == 200
+    mapping_uuid = response.get_json()["UUID"]
+    assert response.get_json()["BatchSize"] == 5
+    mapping = app.extensions["event_source_mappings"].get(mapping_uuid)
+    assert mapping.visibility_timeout == 30
+    assert client.get(f"/admin/event-source-mappings/{mapping_uuid}").get_json()[
+        "State"
+    ] == ("Enabled")
+    assert (
+        client.delete(f"/admin/event-source-mappings/{mapping_uuid}").status_code == 200
+    )
+    assert client.get("/admin/event-source-mappings").get_json() == {
+        "EventSourceMappings": []
+    }
+
+    response = client.post(
+        "/admin/event-source-mappings",
+        json={"QueueUrl": "https://localhost:5000/queues/not_exist", "Command": "noop"},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        # 登録されていないcommand
+        {"Command": "rm -rf /tmp/x"},
+        {"Command": ["true"]},
+        {"Command": "noop", "VisibilityTimeout": "abc"},
+        {"Command": "noop", "FailureVisibilityTimeout": [1]},
+    ],
+)
+def test_admin_event_source_mappings_bad_request(params):
+    app = server.create_app({"EventSourceCommands": {"noop": ["true"]}})
+    app.extensions["queues"].create_queue("test_queue")
+    response = app.test_client().post(
+        "/admin/event-source-mappings",
+        json=dict(params, QueueUrl="https://localhost:5000/queues/test_queue"),
+    )
+    assert response.status_code == 400
+    assert app.extensions["event_source_mappings"].list() == []
+
+
+def test_admin_event_source_mappings_without_commands():
+    app = server.create_app()
+    app.extensions["queues"].create_queue("test_queue")
+    response = app.test_client().post(
+        "/admin/event-source-mappings",
+        json={"QueueUrl": "https://localhost:5000/queues/test_queue", "Command": "true"},
+    )
+    assert response.status_code == 404
@@ -0,0 +1,76 @@
+import random
+import pytest
+from faws.sqs import server
+from faws.sqs.error import InternalError, RequestThrottled
+from faws.sqs.fault import FaultInjector, build_latency
+from faws.sqs.queue_storage import QueuesStorageType
+from faws.sqs.result import SuccessResult
+
+
+@pytest.mark.parametrize(
+    "config,expected",
+    [
+        ({"distribution": "fixed", "ms": 20}, 0.02),
+        ({"distribution": "histogram", "buckets": [[5, 0], [30, 1], [500, 0]]}, 0.03),
+    ],
+)
+def test_build_latency(config, expected):
+    assert build_latency(**config)(random.Random(0)) == expected
+
+
+def test_build_latency_distributions():
+    rng = random.Random(0)
+    normal = build_latency("normal", mean_ms=10, stddev_ms=100)
+    lognormal = build_latency("lognormal", median_ms=10, sigma=0.5)
+
+    assert all(normal(rng) >= 0 for _ in range(100))
+    samples = sorted(lognormal(rng) for _ in range(1001))
+    assert 0.008 < samples[500] < 0.012
+
+
+def test_fault_injector():
+    slept = []
+    injector = FaultInjector(
+        actions={
+            "SendMessage": {"latency": {"ms": 10}, "error_rate": 1},
+            "*": {"throttle_rate": 1},
+        },
+        empty_receive={"ms": 20000},
+        sleep=slept.append,
+    )
+
+    with pytest.raises(InternalError):
+        injector.before("SendMessage")
+    with pytest.raises(RequestThrottled):
+        injector.before("ListQueues")
+    assert slept == [0.01]
+
+    injector.after(
+        "ReceiveMessage",
+        {"WaitTimeSeconds": "5"},
+        SuccessResult("ReceiveMessage", {}, "1"),
+    )
+    injector.after("ReceiveMessage", {}, SuccessResult("ReceiveMessage", {}, "1"))
+    injector.after(
+        "ReceiveMessage",
+        {"WaitTimeSeconds": "5"},
+        SuccessResult("ReceiveMessage", {"Message": []}, "1"),
+    )
+    assert slept == [0.01, 5]
+
+
+def test_injected_error_response():
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "FaultConfig": {"actions": {"CreateQueue": {"error_rate": 1}}},
+        }
+    )
+    response = app.test_client().post(
+        "/", data="Action=CreateQueue&QueueName=test_queue"
+    )
+
+    assert response.status_code == 500
+    assert b"<Code>InternalError</Code>" in response.data
+    assert b"<Type>Receiver</Type>" in response.data
+    assert app.extensions["queues"].get_queues() == []
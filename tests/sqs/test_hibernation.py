@@ -0,0 +1,212 @@
+import os
+import time
+from unittest import mock
+import pytest
+from faws.sqs import server
+from faws.sqs.error import NonExistentQueue
+from faws.sqs.event_source import EventSourceMapping
+from faws.sqs.hibernation import hibernate, rehydrate
+from faws.sqs.memory import MemoryBudget
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.queue import Queue, Tag
+from faws.sqs.queue_storage import InMemoryQueueStorage
+
+
+@pytest.mark.parametrize("message_storage_type", list(MessageStorageType))
+def test_hibernate_and_rehydrate(tmp_path, message_storage_type):
+    queue = Queue(
+        "test", default_visibility_timeout=10, message_storage_type=message_storage_type
+    )
+    queue.set_tag(Tag("env", "ci"))
+    queue.add_message("a")
+    queue.add_message("b")
+    queue.add_message("later", delay_seconds=60)
+    queue.get_message()
+    path = str(tmp_path / "test.queue")
+    hibernate(queue, path)
+
+    restored = rehydrate(path, message_storage_type=message_storage_type)
+    assert restored == queue
+    assert restored.default_visibility_timeout == 10
+    assert [(t.name, t.value) for t in restored.list_tags()] == [("env", "ci")]
+    assert restored.count_messages() == queue.count_messages()
+    assert [
+        m.message_body for m in restored.get_message(max_number_of_messages=10)
+    ] == ["b"]
+
+
+def test_idle_queues_are_hibernated(tmp_path):
+    budget = MemoryBudget()
+    queues = InMemoryQueueStorage(
+        hibernate_after_seconds=60,
+        hibernation_directory=str(tmp_path),
+        memory_budget=budget,
+    )
+    with mock.patch("time.monotonic", return_value=1000):
+        idle = queues.create_queue("idle")
+        idle.add_message("hello")
+        queues.create_queue("active")
+    with mock.patch("time.monotonic", return_value=1050):
+        queues.get_queue("active").add_message("hello")
+    with mock.patch("time.monotonic", return_value=1070):
+        assert queues.hibernate_idle() == 1
+    assert list(queues.queues) == ["active"]
+    assert list(queues.hibernated) == ["idle"]
+    assert len(os.listdir(tmp_path)) == 1
+    assert budget.total_bytes == queues.get_queue("active").memory_bytes
+    assert sorted(queues.get_queue_urls()) == [
+        "https://localhost:5000/queues/active",
+        "https://localhost:5000/queues/idle",
+    ]
+
+    # accessされたら読み戻す
+    rehydrated = queues.get_queue("idle")
+    assert rehydrated.get_message()[0].message_body == "hello"
+    assert list(queues.hibernated) == []
+    assert os.listdir(tmp_path) == []
+    assert budget.total_bytes == sum(q.memory_bytes for q in queues.get_queues())
+
+
+def test_least_recently_used_queues_are_hibernated(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=2, hibernation_directory=str(tmp_path)
+    )
+    for i, name in enumerate(["a", "b", "c"]):
+        with mock.patch("time.monotonic", return_value=1000 + i):
+            queues.create_queue(name)
+    with mock.patch("time.monotonic", return_value=1010):
+        queues.get_queue("a")
+    assert queues.hibernate_idle() == 1
+    assert sorted(queues.queues) == ["a", "c"]
+    assert list(queues.hibernated) == ["b"]
+    # 作成済みのqueueのCreateQueueも読み戻す
+    assert queues.create_queue("b").queue_name == "b"
+
+
+def test_background_sweep(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=1,
+        hibernation_interval=0.01,
+        hibernation_directory=str(tmp_path),
+    )
+    with mock.patch("time.monotonic", return_value=1000):
+        queues.create_queue("idle")
+    queues.create_queue("active")
+    for _ in range(500):
+        if queues.hibernated:
+            break
+        time.sleep(0.01)
+    queues.close()
+    assert list(queues.hibernated) == ["idle"]
+    assert list(queues.queues) == ["active"]
+
+
+def test_pinned_queues_are_not_hibernated(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=0, hibernation_directory=str(tmp_path)
+    )
+    queue = queues.create_queue("test")
+    mapping = EventSourceMapping(queue, lambda messages: None, poll_seconds=0.01)
+    mapping.start()
+    assert queues.hibernate_idle() == 0
+
+    # consumerが持っているqueueに送ったmessageが届く
+    queues.get_queue("test").add_message("hello")
+    for _ in range(500):
+        if mapping.describe()["Metrics"]["Succeeded"]:
+            break
+        time.sleep(0.01)
+    mapping.stop()
+    assert mapping.describe()["Metrics"]["Succeeded"] == 1
+    assert queues.hibernate_idle() == 1
+
+
+def test_queue_used_while_writing_stays_resident(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=0, hibernation_directory=str(tmp_path)
+    )
+    queue = queues.create_queue("test")
+
+    def write_and_send(queue, path):
+        hibernate(queue, path)
+        queue.add_message("hello")
+
+    with mock.patch("faws.sqs.queue_storage.hibernate", write_and_send):
+        assert queues.hibernate_idle() == 0
+    assert queues.get_queue("test") is queue
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_to_hibernated_queue_is_forwarded(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=0, hibernation_directory=str(tmp_path)
+    )
+    # requestがget_queueで受け取った後にhibernateされても、書き込みは失われない
+    queue = queues.create_queue("test")
+    queue.add_message("hello")
+    assert queues.hibernate_idle() == 1
+    queue.add_message("late")
+    assert list(queues.hibernated) == []
+    assert queues.get_queue("test") is not queue
+    assert [
+        m.message_body
+        for m in queues.get_queue("test").get_message(max_number_of_messages=10)
+    ] == ["hello", "late"]
+
+
+def test_deleted_snapshot_releases_files(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=0, hibernation_directory=str(tmp_path)
+    )
+    queues.create_queue("test")
+    queues.hibernate_idle()
+    snapshot = queues.snapshot()
+    queues.get_queue("test")
+    assert len(os.listdir(tmp_path)) == 1
+    queues.release_snapshot(snapshot)
+    assert os.listdir(tmp_path) == []
+
+
+def test_delete_and_snapshot_hibernated_queue(tmp_path):
+    queues = InMemoryQueueStorage(
+        max_resident_queues=0, hibernation_directory=str(tmp_path)
+    )
+    queues.create_queue("test").add_message("hello")
+    queues.hibernate_idle()
+    snapshot = queues.snapshot()
+    queues.delete_queue("test")
+    assert queues.get_queue_urls() == []
+    with pytest.raises(NonExistentQueue):
+        queues.get_queue("test")
+
+    # snapshotから参照されているfileは残っている
+    queues.restore(snapshot)
+    assert queues.get_queue("test").get_message()[0].message_body == "hello"
+
+
+def test_list_queues_and_admin(tmp_path):
+    app = server.create_app(
+        {
+            "QueuesStorageTypeConfig": {
+                "hibernate_after_seconds": 0,
+                "hibernation_directory": str(tmp_path),
+            }
+        }
+    )
+    with app.test_client() as client:
+        client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+        assert client.post("/admin/hibernate").get_json() == {
+            "Hibernated": 1,
+            "ResidentQueues": 0,
+            "HibernatedQueues": 1,
+        }
+        response = client.post("/", data="Action=ListQueues")
+        assert b"<QueueUrl>https://localhost:5000/queues/test_queue</QueueUrl>" in (
+            response.data
+        )
+        queue_url = "https://localhost:5000/queues/test_queue"
+        response = client.post(
+            "/", data=f"Action=SendMessage&QueueUrl={queue_url}&MessageBody=hello"
+        )
+        assert response.status_code == 200
+        assert app.extensions["queues"].hibernated == {}
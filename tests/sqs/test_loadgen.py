@@ -0,0 +1,122 @@
+import socket
+import threading
+import pytest
+from werkzeug.serving import make_server
+from faws import cli
+from faws.sqs import loadgen, server
+from faws.sqs.loadgen import (
+    LoadConfig,
+    message_attribute_params,
+    percentile,
+    run_load,
+)
+from faws.sqs.query_client import QueryClient, encode_params
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+@pytest.fixture
+def endpoint():
+    app = server.create_app({"QueuesStorageType": QueuesStorageType.IN_MEMORY})
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+@pytest.mark.parametrize(
+    "values,p,expected",
+    [([], 50, 0.0), ([1.0], 99, 1.0), ([1.0, 2.0, 3.0, 4.0, 5.0], 50, 3.0)],
+)
+def test_percentile(values, p, expected):
+    assert percentile(values, p) == expected
+
+
+def test_message_attribute_params():
+    assert message_attribute_params(1) == {
+        "MessageAttribute.1.Name": "attr1",
+        "MessageAttribute.1.Value.DataType": "String",
+        "MessageAttribute.1.Value.StringValue": "value1",
+    }
+
+
+def test_encode_params():
+    assert (
+        encode_params({"QueueUrl": "http://localhost/queues/a", "MessageBody": "a b"})
+        == "QueueUrl=http%3A%2F%2Flocalhost%2Fqueues%2Fa&MessageBody=a%20b"
+    )
+
+
+def test_query_client(endpoint):
+    client = QueryClient(endpoint)
+    response = client.call("CreateQueue", QueueName="test_queue")
+    assert response.ok
+    assert b"<QueueUrl>https://localhost:5000/queues/test_queue</QueueUrl>" in (
+        response.body
+    )
+
+    response = client.call("GetQueueUrl", QueueName="not_exist")
+    assert response.status == 400
+    client.close()
+
+
+def test_run_load(endpoint):
+    report = run_load(
+        LoadConfig(
+            endpoint=endpoint,
+            producers=2,
+            consumers=1,
+            duration=0.5,
+            message_size=16,
+            attribute_count=2,
+            batch_size=10,
+        )
+    )
+
+    assert report["queue_url"] == "https://localhost:5000/queues/faws-bench"
+    assert report["producers"]["workers"] == 2
+    assert report["producers"]["messages"] > 0
+    assert report["producers"]["errors"] == 0
+    assert report["consumers"]["workers"] == 1
+    assert report["consumers"]["errors"] == 0
+
+
+def test_run_load_counts_worker_errors(endpoint, monkeypatch):
+    def timeout(*args, **kwargs):
+        raise socket.timeout()
+
+    # 例外で終わったworkerがあっても待ち続けずにerrorとして数える
+    monkeypatch.setattr(loadgen, "queue_url_for", lambda config: "queue_url")
+    monkeypatch.setattr(loadgen, "consume", timeout)
+    monkeypatch.setattr(QueryClient, "call", timeout)
+    report = run_load(
+        LoadConfig(
+            endpoint=endpoint, producers=1, consumers=1, duration=0.2, message_size=16
+        )
+    )
+
+    assert report["producers"]["requests"] == report["producers"]["errors"] > 0
+    assert report["consumers"]["workers"] == 1
+    assert report["consumers"]["errors"] == 1
+
+
+def test_cli_bench(endpoint, tmp_path, capsys):
+    output = tmp_path / "report.json"
+    cli.main(
+        [
+            "bench",
+            "--endpoint",
+            endpoint,
+            "--producers",
+            "1",
+            "--consumers",
+            "0",
+            "--duration",
+            "0.2",
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert "producers" in capsys.readouterr().out
+    assert output.exists()
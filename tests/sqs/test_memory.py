@@ -0,0 +1,207 @@
+import pytest
+from faws.sqs import server
+from faws.sqs.error import OverLimit
+from faws.sqs.memory import MemoryBudget, SpillFile
+from faws.sqs.message import MESSAGE_OVERHEAD, ATTRIBUTE_OVERHEAD, Message
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.partition import Partition
+from faws.sqs.queue_storage import InMemoryQueueStorage
+
+SIZE = MESSAGE_OVERHEAD + 100
+
+
+def test_message_memory_size():
+    message = Message(
+        b"x" * 100,
+        message_attributes={
+            "MessageAttribute.1.Name": "City",
+            "MessageAttribute.1.Value.DataType": "String",
+            "MessageAttribute.1.Value.StringValue": "Tokyo",
+        },
+    )
+    assert message.memory_size == SIZE + ATTRIBUTE_OVERHEAD + len("CityStringTokyo")
+
+
+def test_message_memory_size_counts_utf8_bytes():
+    message = Message(
+        b"x" * 100,
+        message_attributes={
+            "MessageAttribute.1.Name": "都市",
+            "MessageAttribute.1.Value.DataType": "String",
+            "MessageAttribute.1.Value.StringValue": "東京",
+        },
+    )
+    assert message.memory_size == SIZE + ATTRIBUTE_OVERHEAD + 6 + 6 + 6
+
+
+@pytest.mark.parametrize("message_storage_type", ["IN_MEMORY", "COLUMNAR"])
+def test_accounting(message_storage_type):
+    budget = MemoryBudget()
+    queues = InMemoryQueueStorage(
+        memory_budget=budget, message_storage_type=message_storage_type
+    )
+    queue = queues.create_queue("test")
+    messages = [queue.add_message(b"x" * 100) for _ in range(3)]
+    assert queue.memory_bytes == budget.total_bytes == SIZE * 3
+
+    queue.delete_message(messages[0].message_id)
+    queue.delete_message("none")
+    assert queue.memory_bytes == budget.total_bytes == SIZE * 2
+
+    snapshot = queues.snapshot()
+    queue.purge_message()
+    assert queue.memory_bytes == budget.total_bytes == 0
+    queues.restore(snapshot)
+    assert queue.memory_bytes == budget.total_bytes == SIZE * 2
+
+    queues.delete_queue("test")
+    assert budget.total_bytes == 0
+    queues.restore(snapshot)
+    assert budget.total_bytes == SIZE * 2
+    queues.init_storage()
+    assert budget.total_bytes == 0
+
+
+def test_reject():
+    budget = MemoryBudget(
+        max_bytes=SIZE * 5,
+        queue_max_bytes=SIZE * 2,
+        queues={"https://localhost:5000/queues/big": {"max_bytes": None}},
+    )
+    queues = InMemoryQueueStorage(memory_budget=budget)
+    small = queues.create_queue("small")
+    small.add_message(b"x" * 100)
+    small.add_message(b"x" * 100)
+    with pytest.raises(OverLimit):
+        small.add_message(b"x" * 100)
+
+    big = queues.create_queue("big")
+    big.add_message(b"x" * 100)
+    big.add_messages([big.build_message(b"x" * 100), big.build_message(b"x" * 100)])
+    # 全体の上限
+    with pytest.raises(OverLimit):
+        big.add_message(b"x" * 100)
+    assert budget.total_bytes == SIZE * 5
+
+    small.purge_message()
+    big.add_message(b"x" * 100)
+
+
+@pytest.mark.parametrize("message_storage_type", list(MessageStorageType))
+def test_spill(tmp_path, message_storage_type):
+    budget = MemoryBudget(
+        queue_max_bytes=SIZE, on_exceeded="spill", spill_directory=str(tmp_path)
+    )
+    queues = InMemoryQueueStorage(
+        memory_budget=budget,
+        message_storage_type=message_storage_type.name,
+        body_compression_threshold=1000,
+    )
+    queue = queues.create_queue("test")
+    queue.add_message(b"a" * 100)
+    queue.add_message(b"b" * 100)
+    queue.add_message(b"c" * 2000)
+    # 2件目以降はbodyをfileに書き出し、memoryには固定のsizeだけ数える
+    assert queue.memory_bytes == SIZE + MESSAGE_OVERHEAD * 2
+    assert budget.status()["SpilledBytes"] > 100
+    messages = queue.get_message(max_number_of_messages=10)
+    assert [m.message_body for m in messages] == ["a" * 100, "b" * 100, "c" * 2000]
+    budget.close()
+
+
+def test_spill_file(tmp_path):
+    spill_file = SpillFile(str(tmp_path))
+    offsets = [spill_file.write(data) for data in [b"abc", b"", b"de"]]
+    assert [spill_file.read(o, n) for o, n in zip(offsets, [3, 0, 2])] == [
+        b"abc",
+        b"",
+        b"de",
+    ]
+    spill_file.close()
+
+
+def test_send_over_budget_and_report():
+    app = server.create_app({"MemoryBudgetConfig": {"queue_max_bytes": SIZE * 2}})
+    with app.test_client() as client:
+        for name in ["a", "b"]:
+            client.post("/", data=f"Action=CreateQueue&QueueName={name}")
+        queue_url = "https://localhost:5000/queues/a"
+        send = f"Action=SendMessage&QueueUrl={queue_url}&MessageBody={'x' * 100}"
+        assert client.post("/", data=send).status_code == 200
+        assert client.post("/", data=send).status_code == 200
+        response = client.post("/", data=send)
+        assert response.status_code == 403
+        assert b"<Code>OverLimit</Code>" in response.data
+
+        report = client.get("/admin/memory?Top=1").get_json()
+        assert report["TotalBytes"] == SIZE * 2
+        assert report["QueueMaxBytes"] == SIZE * 2
+        assert report["Queues"] == [
+            {"QueueUrl": queue_url, "Bytes": SIZE * 2, "Messages": 2}
+        ]
+
+
+@pytest.mark.parametrize("top", ["abc", "1.5", "-1"])
+def test_report_with_invalid_top(top):
+    app = server.create_app()
+    with app.test_client() as client:
+        assert client.get(f"/admin/memory?Top={top}").status_code == 400
+
+
+def test_queue_limit_is_per_partition():
+    budget = MemoryBudget(
+        queue_max_bytes=SIZE,
+        queues={
+            "https://localhost:5000/queues/ap-northeast-1/123456789012/big": {
+                "max_bytes": None
+            }
+        },
+    )
+    big = InMemoryQueueStorage(
+        partition=Partition("123456789012", "ap-northeast-1"), memory_budget=budget
+    ).create_queue("big")
+    other = InMemoryQueueStorage(
+        partition=Partition("210987654321", "ap-northeast-1"), memory_budget=budget
+    ).create_queue("big")
+    big.add_message(b"x" * 100)
+    big.add_message(b"x" * 100)
+    other.add_message(b"x" * 100)
+    with pytest.raises(OverLimit):
+        other.add_message(b"x" * 100)
+
+
+def test_import_over_budget():
+    source_url = "https://localhost:5000/queues/source"
+    app = server.create_app(
+        {
+            "MemoryBudgetConfig": {
+                "queue_max_bytes": SIZE * 2,
+                "queues": {source_url: {"max_bytes": None}},
+            }
+        }
+    )
+    source = app.extensions["queues"].create_queue("source")
+    with app.test_client() as client:
+        for _ in range(3):
+            source.add_message(b"x" * 100)
+        exported = client.get(f"/admin/queues/export?QueueUrl={source_url}").data
+        queue_url = "https://localhost:5000/queues/a"
+        response = client.post(
+            f"/admin/queues/import?QueueUrl={queue_url}", data=exported
+        )
+        assert response.status_code == 403
+        assert response.get_json() == {
+            "Code": "OverLimit",
+            "Message": "The memory budget of a or the whole service is exceeded.",
+            "Imported": 0,
+            "Skipped": 0,
+        }
+
+
+def test_report_without_budget():
+    app = server.create_app()
+    app.extensions["queues"].create_queue("a").add_message(b"x" * 100)
+    with app.test_client() as client:
+        report = client.get("/admin/memory").get_json()
+        assert report["TotalBytes"] == SIZE
+        assert report["Queues"][0]["Bytes"] == SIZE
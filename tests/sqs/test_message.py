@@ -1,7 +1,16 @@
 import datetime
 import pytest
+import uuid
 from unittest import mock
-from faws.sqs.message import Message, MessageAttribute, MessageAttributeType
+from faws.sqs.message import (
+    BodyCompression,
+    Message,
+    MessageAttribute,
+    MessageAttributeType,
+    MessageBody,
+    generate_uuids,
+    message_size,
+)
 
 
 def test_from_request_data():
@@ -90,3 +99,54 @@ def test_is_callable():
 
         dt.now.return_value = now_after_delay
         assert message.is_callable()
+
+
+@pytest.mark.parametrize("body", ["hoge", b"hoge", "日本語"])
+def test_message_body_build(body):
+    message_body = MessageBody.build(body)
+    expected = body if isinstance(body, str) else body.decode()
+
+    assert not message_body.compressed
+    assert message_body.decode() == expected
+    assert Message(body).message_body == expected
+
+
+def test_message_body_is_shared():
+    message_body = MessageBody.build(b"hoge")
+
+    assert MessageBody.build(message_body) is message_body
+    assert Message(message_body).body is message_body
+
+
+def test_message_body_compression():
+    body = b"a" * 1024
+    compression = BodyCompression(threshold=512)
+
+    compressed = MessageBody.build(body, compression)
+    assert compressed.compressed
+    assert compressed.size == 1024
+    assert compressed.stored_size < 1024
+    assert compressed.to_bytes() == body
+    # 閾値未満は圧縮しない
+    assert not MessageBody.build(b"a" * 100, compression).compressed
+
+
+def test_message_size():
+    attributes = {
+        "MessageAttribute.1.Name": "City",
+        "MessageAttribute.1.Value.DataType": "String",
+        "MessageAttribute.1.Value.StringValue": "Tokyo",
+    }
+
+    assert message_size(b"hoge", None) == 4
+    assert message_size("日本", attributes) == 6 + 4 + 6 + 5
+
+
+def test_generate_uuids():
+    ids = list(generate_uuids(100))
+    assert len(set(ids)) == 100
+    for message_id in ids:
+        parsed = uuid.UUID(message_id)
+        assert str(parsed) == message_id
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
@@ -1,12 +1,18 @@
+import datetime
 import pytest
+from faws.sqs import message_storage
 from faws.sqs.message import Message
 from faws.sqs.message_storage import (
+    ColumnarMessageStorage,
     MessageStorageType,
     MessageStorage,
     InMemoryMessageStorage,
+    PartitionedMessageStorage,
     build_message_storage,
 )
 
+HOUR = datetime.timedelta(hours=1)
+
 
 class TestInMemoryMessageStorage:
     @pytest.fixture
@@ -41,3 +47,161 @@ class TestInMemoryMessageStorage:
         in_memory_messages.truncate_messages()
 
         assert len(in_memory_messages._messages) == 0
+
+    def test_writable_without_snapshot(self, in_memory_messages: MessageStorage):
+        message = Message("test")
+        in_memory_messages.add_message(message)
+
+        assert in_memory_messages.writable(message) is message
+
+    def test_snapshot_and_restore(self, in_memory_messages: MessageStorage):
+        snapshot = in_memory_messages.snapshot()
+        message = in_memory_messages.get_messages(1).__next__()[0]
+        writable = in_memory_messages.writable(message)
+        writable.update_deliverable_time(30)
+        in_memory_messages.add_message(Message("added"))
+
+        # snapshot時点のmessage、dictは書き換わらない
+        assert writable is not message
+        assert message.is_callable()
+        assert len(snapshot) == 100
+        assert len(in_memory_messages._messages) == 101
+
+        in_memory_messages.restore(snapshot)
+        assert len(in_memory_messages._messages) == 100
+        assert in_memory_messages.get_messages(1).__next__()[0] is message
+        # restore後の書き込みもsnapshotを壊さない
+        in_memory_messages.truncate_messages()
+        in_memory_messages.restore(snapshot)
+        assert len(in_memory_messages._messages) == 100
+
+    def test_delete_message(self, in_memory_messages: MessageStorage):
+        snapshot = in_memory_messages.snapshot()
+        message = in_memory_messages.get_messages(1).__next__()[0]
+
+        assert in_memory_messages.get_message(message.message_id) is message
+        assert in_memory_messages.delete_message(message.message_id)
+        assert not in_memory_messages.delete_message(message.message_id)
+        assert in_memory_messages.get_message(message.message_id) is None
+        assert len(snapshot) == 100
+
+
+class TestColumnarMessageStorage:
+    @pytest.fixture(params=["numpy", "array"])
+    def columnar_messages(self, request, monkeypatch) -> ColumnarMessageStorage:
+        if request.param == "array":
+            monkeypatch.setattr(message_storage, "numpy", None)
+        s = ColumnarMessageStorage(compaction_threshold=10)
+        for i in range(0, 100):
+            s.add_message(Message(f"{i}"))
+        return s
+
+    def test_build_message_storage(self):
+        actual = build_message_storage(MessageStorageType.COLUMNAR)
+        assert actual.__class__ == ColumnarMessageStorage
+
+    def test_get_messages(self, columnar_messages: ColumnarMessageStorage):
+        messages = columnar_messages.get_messages(10, 30).__next__()
+
+        assert [m.message_body for m in messages] == [f"{i}" for i in range(30, 40)]
+
+    def test_claim_messages(self, columnar_messages: ColumnarMessageStorage):
+        claimed = columnar_messages.claim_messages(30, 10)
+
+        assert [m.message_body for m in claimed] == [f"{i}" for i in range(10)]
+        # Message側の値も列と同じになる
+        assert claimed[0].receive_count == 1
+        assert not claimed[0].is_callable()
+        assert next(columnar_messages.iter_messages())[2] == 1
+        assert [m.message_body for m in columnar_messages.claim_messages(30, 1)] == [
+            "10"
+        ]
+        assert columnar_messages.count_messages() == {
+            "ApproximateNumberOfMessages": 89,
+            "ApproximateNumberOfMessagesNotVisible": 11,
+        }
+        assert columnar_messages.change_visibility(claimed[0].message_id, 0)
+        reclaimed = columnar_messages.claim_messages(30, 1)
+        assert [m.message_id for m in reclaimed] == [claimed[0].message_id]
+        assert reclaimed[0].receive_count == 2
+        assert next(columnar_messages.iter_messages())[2] == 2
+
+    def test_delete_and_compact(self, columnar_messages: ColumnarMessageStorage):
+        messages = columnar_messages.get_messages(100).__next__()
+        for message in messages[:60]:
+            assert columnar_messages.delete_message(message.message_id)
+        assert not columnar_messages.delete_message(messages[0].message_id)
+
+        # 51件目の削除で詰められる
+        assert len(columnar_messages._slab) == 49
+        assert columnar_messages.get_message(messages[60].message_id) is messages[60]
+        assert columnar_messages.claim_messages(30, 1) == [messages[60]]
+
+    def test_expire_messages(self, columnar_messages: ColumnarMessageStorage):
+        assert columnar_messages.expire_messages(3600) == []
+        old = Message("old", inserted_at=datetime.datetime.now() - HOUR)
+        columnar_messages.add_message(old)
+        assert columnar_messages.expire_messages(1800) == [old]
+        assert len(columnar_messages) == 100
+        assert len(columnar_messages.expire_messages(-1)) == 100
+        assert list(columnar_messages.get_messages(100)) == []
+
+    def test_snapshot_and_restore(self, columnar_messages: ColumnarMessageStorage):
+        snapshot = columnar_messages.snapshot()
+        claimed = columnar_messages.claim_messages(30, 100)
+        # snapshotと共有しているMessageは書き換えない
+        assert snapshot.slab[0].receive_count == 0
+        assert claimed[0] is not snapshot.slab[0]
+        columnar_messages.delete_message(claimed[0].message_id)
+        columnar_messages.truncate_messages()
+
+        columnar_messages.restore(snapshot)
+        assert len(columnar_messages.claim_messages(30, 100)) == 100
+        columnar_messages.restore(snapshot)
+        assert columnar_messages.count_messages()["ApproximateNumberOfMessages"] == 100
+
+
+class TestPartitionedMessageStorage:
+    @pytest.fixture(params=list(MessageStorageType))
+    def partitioned_messages(self, request) -> PartitionedMessageStorage:
+        s = PartitionedMessageStorage(
+            4, sampled_partitions=1, partition_storage_type=request.param, seed=1
+        )
+        s.add_messages([Message(f"{i}") for i in range(100)])
+        return s
+
+    def test_messages_are_spread(self, partitioned_messages):
+        sizes = [len(p) for p in partitioned_messages._partitions]
+        assert sum(sizes) == len(partitioned_messages) == 100
+        assert all(size > 0 for size in sizes)
+        message = Message("test")
+        partitioned_messages.add_message(message)
+        assert partitioned_messages.get_message(message.message_id) is message
+        assert partitioned_messages.change_visibility(message.message_id, 10)
+        assert partitioned_messages.delete_message(message.message_id)
+        assert partitioned_messages.get_message(message.message_id) is None
+
+    def test_sample_messages(self, partitioned_messages):
+        # 1 partitionだけを見るので、そのpartitionのmessageしか返らない
+        messages = partitioned_messages.sample_messages(30, 100)
+        partition_sizes = [len(p) for p in partitioned_messages._partitions]
+        assert len(messages) in partition_sizes
+        assert len({partitioned_messages._index(m.message_id) for m in messages}) == 1
+
+    def test_claim_messages(self, partitioned_messages):
+        assert len(partitioned_messages.claim_messages(30, 60)) == 60
+        assert len(partitioned_messages.claim_messages(30, 60)) == 40
+        assert partitioned_messages.claim_messages(30, 60) == []
+        assert partitioned_messages.count_messages() == {
+            "ApproximateNumberOfMessages": 0,
+            "ApproximateNumberOfMessagesNotVisible": 100,
+        }
+
+    def test_snapshot_and_restore(self, partitioned_messages):
+        snapshot = partitioned_messages.snapshot()
+        partitioned_messages.truncate_messages()
+        assert len(partitioned_messages) == 0
+        partitioned_messages.restore(snapshot)
+        assert sorted(
+            int(m.message_body) for m, _, _ in partitioned_messages.iter_messages()
+        ) == list(range(100))
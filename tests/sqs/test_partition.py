@@ -0,0 +1,90 @@
+import pytest
+from faws.sqs.partition import (
+    Partition,
+    PartitionedQueueStorage,
+    partition_from_request,
+    partition_from_url,
+)
+from faws.sqs.queue_storage import QueuesStorageType
+
+DEFAULT = Partition("000000000000", "us-east-1")
+
+
+def authorization(access_key: str, region: str) -> str:
+    return (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/20200601/{region}/sqs/aws4_request, "
+        "SignedHeaders=content-type;host;x-amz-date, Signature=abcdef"
+    )
+
+
+@pytest.mark.parametrize(
+    "queue_url,expected",
+    [
+        (
+            "https://localhost:5000/queues/ap-northeast-1/111111111111/test_queue",
+            Partition("111111111111", "ap-northeast-1"),
+        ),
+        ("https://localhost:5000/queues/test_queue", None),
+        ("http://localhost/quueus/test_queue_1", None),
+    ],
+)
+def test_partition_from_url(queue_url, expected):
+    assert partition_from_url(queue_url) == expected
+
+
+@pytest.mark.parametrize(
+    "headers,host,expected",
+    [
+        ({}, "localhost:5000", DEFAULT),
+        ({}, "sqs.eu-west-1.localhost:5000", Partition("000000000000", "eu-west-1")),
+        (
+            {"Authorization": authorization("test", "ap-northeast-1")},
+            "localhost:5000",
+            Partition("000000000000", "ap-northeast-1"),
+        ),
+        (
+            {"Authorization": authorization("111111111111", "us-east-1")},
+            "localhost:5000",
+            Partition("111111111111", "us-east-1"),
+        ),
+        (
+            {"Authorization": authorization("AKIDTEAM", "us-east-1")},
+            "localhost:5000",
+            Partition("222222222222", "us-east-1"),
+        ),
+    ],
+)
+def test_partition_from_request(headers, host, expected):
+    actual = partition_from_request(
+        headers, host, DEFAULT, access_key_accounts={"AKIDTEAM": "222222222222"}
+    )
+    assert actual == expected
+
+
+def test_partitioned_queue_storage():
+    partitions = PartitionedQueueStorage(QueuesStorageType.IN_MEMORY, DEFAULT)
+    other = Partition("111111111111", "ap-northeast-1")
+    default_queue = partitions.get(DEFAULT).create_queue("test_queue")
+    other_queue = partitions.get(other).create_queue("test_queue")
+
+    assert partitions.get(DEFAULT) is partitions.default
+    assert partitions.get(other) is partitions.get(other)
+    assert default_queue.queue_url == "https://localhost:5000/queues/test_queue"
+    assert other_queue.queue_url == (
+        "https://localhost:5000/queues/ap-northeast-1/111111111111/test_queue"
+    )
+    assert default_queue is not other_queue
+
+
+def test_partitioned_snapshot_and_restore():
+    partitions = PartitionedQueueStorage(QueuesStorageType.IN_MEMORY, DEFAULT)
+    other = Partition("111111111111", "ap-northeast-1")
+    partitions.get(other).create_queue("seeded")
+    snapshot = partitions.snapshot()
+
+    partitions.init_storage()
+    partitions.get(DEFAULT).create_queue("added")
+    partitions.restore(snapshot)
+
+    assert partitions.get(DEFAULT).get_queues() == []
+    assert [q.queue_name for q in partitions.get(other).get_queues()] == ["seeded"]
@@ -0,0 +1,124 @@
+import os
+import pstats
+import pytest
+from faws.sqs import server
+from faws.sqs.profiler import Profiler, action_key, collapse_stack
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+@pytest.fixture
+def profiled_client(tmp_path):
+    app_config = {
+        "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+        "TESTING": True,
+        "ProfilerConfig": {"sample_every": 1, "output_dir": str(tmp_path)},
+    }
+    app = server.create_app(app_config)
+    with app.test_client() as client:
+        with app.app_context():
+            server.init_queues()
+        yield client
+
+
+def test_should_profile_every_nth_request():
+    profiler = Profiler(enabled=True, sample_every=3)
+
+    assert [profiler.should_profile() for _ in range(6)] == [
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_should_not_profile_when_disabled():
+    profiler = Profiler(enabled=False, sample_every=1)
+
+    assert not profiler.should_profile()
+
+
+def test_profile_aggregates_per_action(tmp_path):
+    profiler = Profiler(enabled=True, sample_every=1, output_dir=str(tmp_path))
+    for _ in range(2):
+        assert profiler.profile(lambda: sum(range(100)), lambda: "ListQueues") == 4950
+
+    assert profiler.status()["ProfiledRequests"] == {"ListQueues": 2}
+    assert profiler.dump() == [os.path.join(str(tmp_path), "ListQueues.pstats")]
+    pstats.Stats(os.path.join(str(tmp_path), "ListQueues.pstats"))
+
+
+@pytest.mark.parametrize(
+    "action,expected",
+    [
+        ("SendMessage", "SendMessage"),
+        ("../../x", "______x"),
+        ("a/b\\c.d", "a_b_c_d"),
+        ("", "Unknown"),
+        (None, "Unknown"),
+    ],
+)
+def test_action_key(action, expected):
+    assert action_key(action) == expected
+
+
+def test_dump_stays_in_output_dir(tmp_path):
+    output_dir = tmp_path / "profiles"
+    profiler = Profiler(enabled=True, sample_every=1, output_dir=str(output_dir))
+    profiler.profile(lambda: None, lambda: "../../x")
+
+    assert profiler.status()["ProfiledRequests"] == {"______x": 1}
+    assert profiler.dump() == [os.path.join(str(output_dir), "______x.pstats")]
+    assert os.listdir(str(tmp_path)) == ["profiles"]
+
+
+def test_profile_with_sampler(tmp_path):
+    profiler = Profiler(
+        enabled=True,
+        sample_every=1,
+        mode="sample",
+        output_dir=str(tmp_path),
+        sampling_interval=0.0001,
+    )
+
+    def busy():
+        return sum(i for i in range(200000))
+
+    profiler.profile(busy, lambda: "SendMessage")
+    paths = profiler.dump()
+
+    assert paths == [os.path.join(str(tmp_path), "SendMessage.collapsed")]
+    with open(paths[0]) as f:
+        lines = f.read().splitlines()
+    assert len(lines) > 0
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_collapse_stack():
+    import sys
+
+    stack = collapse_stack(sys._getframe())
+
+    assert stack.split(";")[-1].startswith("test_profiler.py:test_collapse_stack:")
+
+
+def test_admin_toggle(profiled_client):
+    assert profiled_client.get("/admin/profiler").get_json()["Enabled"] is False
+
+    response = profiled_client.post("/admin/profiler", json={"Enabled": True})
+    assert response.get_json()["Enabled"] is True
+
+    profiled_client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+    profiled_client.post("/", data="Action=ListQueues")
+    status = profiled_client.get("/admin/profiler").get_json()
+    assert status["ProfiledRequests"] == {"CreateQueue": 1, "ListQueues": 1}
+
+    files = profiled_client.post("/admin/profiler/dump").get_json()["Files"]
+    assert sorted(os.path.basename(f) for f in files) == [
+        "CreateQueue.pstats",
+        "ListQueues.pstats",
+    ]
+
+    profiled_client.post("/admin/profiler/reset")
+    assert profiled_client.get("/admin/profiler").get_json()["ProfiledRequests"] == {}
@@ -0,0 +1,46 @@
+from faws.sqs import server
+from faws.sqs.client import Client
+from faws.sqs.queue_storage import QueuesStorageType
+
+
+def test_apps_do_not_share_storage():
+    app_config = {"QueuesStorageType": QueuesStorageType.IN_MEMORY}
+    app = server.create_app(app_config)
+    other = server.create_app(app_config)
+    app.extensions["queues"].create_queue("test_queue")
+
+    assert [q.queue_name for q in app.extensions["queues"].get_queues()] == [
+        "test_queue"
+    ]
+    assert other.extensions["queues"].get_queues() == []
+
+
+def test_embedded_clients_do_not_share_storage():
+    client = Client()
+    client.create_queue(QueueName="test_queue")
+
+    assert "QueueUrls" not in Client().list_queues()
+
+
+def test_init_storage_resets_only_own_app(faws_sqs_app):
+    other = server.create_app({"QueuesStorageType": QueuesStorageType.IN_MEMORY})
+    faws_sqs_app.extensions["queues"].create_queue("test_queue")
+    other.extensions["queues"].create_queue("test_queue")
+    with faws_sqs_app.app_context():
+        server.init_queues()
+
+    assert faws_sqs_app.extensions["queues"].get_queues() == []
+    assert len(other.extensions["queues"].get_queues()) == 1
+
+
+def test_fixtures_share_app_storage(faws_sqs, faws_sqs_http_client):
+    faws_sqs.create_queue(QueueName="test_queue")
+
+    response = faws_sqs_http_client.post(
+        "/", data="Action=GetQueueUrl&QueueName=test_queue"
+    )
+    assert response.status_code == 200
+
+
+def test_fixtures_are_isolated_per_test(faws_sqs):
+    assert "QueueUrls" not in faws_sqs.list_queues()
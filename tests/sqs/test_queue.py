@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from faws.sqs import queue as queue_module
+from faws.sqs.memory import MemoryBudget
+from faws.sqs.message_storage import MessageStorageType
 from faws.sqs.queue import Queue, name_from_url, Tag
 from unittest import mock
 import pytest
@@ -123,3 +126,69 @@ def test_list_tags():
     queue.set_tag(tag)
 
     assert queue.list_tags() == [tag]
+
+
+def test_delete_message_and_change_visibility():
+    queue = Queue("test-queue")
+    message = queue.add_message("test")
+    queue.add_message("test2")
+
+    assert queue.get_message()[0].message_id == message.message_id
+    queue.change_message_visibility(message.message_id, 0)
+    assert queue.get_message()[0].message_id == message.message_id
+    assert queue.delete_message(message.message_id)
+    assert [m.message_body for m in queue.get_message()] == ["test2"]
+
+
+def test_partitioned_queue():
+    queue = Queue("test-queue", partitions=4, sampled_partitions=1)
+    messages = [queue.add_message(f"{i}") for i in range(40)]
+    assert queue.depth == 40
+
+    # 短いpollingは一部のpartitionだけを見る
+    received = queue.get_message(max_number_of_messages=10)
+    assert 0 < len(received) <= 10
+    # long pollingは全partitionを見る
+    received += queue.get_message(max_number_of_messages=40, wait_seconds=1)
+    assert sorted(m.message_id for m in received) == sorted(
+        m.message_id for m in messages
+    )
+    assert queue.get_message(max_number_of_messages=10, wait_seconds=0.01) == []
+
+    queue.change_message_visibility(messages[0].message_id, 0)
+    assert queue.get_message(wait_seconds=1)[0].message_id == messages[0].message_id
+    assert queue.delete_message(messages[0].message_id)
+    queue.purge_message()
+    assert queue.depth == 0
+    assert queue.memory_bytes == 0
+
+
+def test_partitioned_queue_long_poll_without_waiting():
+    queue = Queue("test-queue", partitions=8, sampled_partitions=1)
+    messages = [queue.add_message(f"{i}") for i in range(80)]
+    # ReceiveMessageのWaitTimeSecondsは待たずに全partitionを見る
+    received = queue.get_message(max_number_of_messages=80, long_poll=True)
+    assert len(received) == len(messages)
+
+
+@pytest.mark.parametrize("message_storage_type", list(MessageStorageType))
+def test_message_retention(message_storage_type, monkeypatch):
+    budget = MemoryBudget()
+    queue = Queue(
+        "test",
+        message_storage_type=message_storage_type,
+        memory_budget=budget,
+        message_retention_seconds=60,
+    )
+    queue.add_message("new")
+    queue.add_messages(
+        [queue.build_message("old", inserted_at=datetime.now() - timedelta(minutes=2))]
+    )
+
+    # receiveの時に期限切れのmessageを消し、memoryも戻す
+    monkeypatch.setattr(queue_module, "EXPIRY_INTERVAL", 0)
+    assert [m.message_body for m in queue.get_message(max_number_of_messages=10)] == [
+        "new"
+    ]
+    assert queue.depth == 1
+    assert budget.total_bytes == queue.memory_bytes
@@ -2,6 +2,7 @@ import datetime
 from pytest import fixture, raises
 from faws.sqs import Queue
 from faws.sqs.error import NonExistentQueue
+from faws.sqs.queue import Tag
 from faws.sqs.queue_storage import InMemoryQueueStorage
 from unittest import mock
 
@@ -79,3 +80,35 @@ class TestInMemoryQueuesStorage:
             added_queues.delete_queue(queue_name)
         # 存在しているqueueを消していないか
         assert added_queues.get_queue("test_queue") is not None
+
+    def test_snapshot_and_restore(self, added_queues):
+        queue = added_queues.get_queue("test_queue")
+        queue.add_message("seed")
+        queue.set_tag(Tag("key", "value"))
+        snapshot = added_queues.snapshot()
+
+        queue.get_message()
+        queue.un_tag("key")
+        added_queues.create_queue("other_queue")
+        added_queues.delete_queue("test_queue")
+
+        added_queues.restore(snapshot)
+        assert list(added_queues.queues.keys()) == ["test_queue"]
+        restored = added_queues.get_queue("test_queue")
+        assert restored.list_tags() == [Tag("key", "value")]
+        assert [m.message_body for m in restored.get_message()] == ["seed"]
+        # 同じsnapshotに何度でも戻せる
+        added_queues.restore(snapshot)
+        assert [m.message_body for m in restored.get_message()] == ["seed"]
+
+    def test_columnar_message_storage(self):
+        queues = InMemoryQueueStorage(message_storage_type="COLUMNAR")
+        queue = queues.create_queue("test_queue")
+        for i in range(3):
+            queue.add_message(f"{i}")
+
+        assert [m.message_body for m in queue.get_message(None, 2)] == ["0", "1"]
+        assert queue.count_messages() == {
+            "ApproximateNumberOfMessages": 1,
+            "ApproximateNumberOfMessagesNotVisible": 2,
+        }
@@ -0,0 +1,78 @@
+from faws.sqs.queue import Tag
+from faws.sqs.queue_storage import InMemoryQueueStorage
+from faws.sqs.response_cache import ResponseCache
+from faws.sqs.result import SuccessResult
+
+
+def cached_call(cache, queues, request_data, request_id, result_data):
+    cached = cache.get(queues, request_data, request_id)
+    if cached is not None:
+        return cached
+    version = cache.version(queues, request_data)
+    return cache.put(
+        queues,
+        request_data,
+        version,
+        SuccessResult(request_data["Action"], result_data(), request_id),
+    )
+
+
+def test_cached_response_has_own_request_id():
+    cache = ResponseCache()
+    queues = InMemoryQueueStorage()
+    queues.create_queue("test")
+    request_data = {"Action": "GetQueueUrl", "QueueName": "test"}
+    expected = SuccessResult("GetQueueUrl", {"QueueUrl": "a"}, "2").generate_response()
+    cached_call(cache, queues, request_data, "1", lambda: {"QueueUrl": "a"})
+    result = cached_call(cache, queues, request_data, "2", lambda: {"QueueUrl": "b"})
+    assert result.generate_response() == expected
+    assert cache.stats() == {"Entries": 1, "Hits": 1, "Misses": 1}
+
+
+def test_queue_changes_invalidate():
+    cache = ResponseCache()
+    queues = InMemoryQueueStorage()
+    request_data = {"Action": "ListQueues"}
+    cached_call(cache, queues, request_data, "1", lambda: {})
+    assert cache.get(queues, request_data, "2") is not None
+    queue = queues.create_queue("test")
+    assert cache.get(queues, request_data, "3") is None
+
+    request_data = {"Action": "ListQueueTags", "QueueUrl": queue.queue_url}
+    cached_call(cache, queues, request_data, "4", lambda: {})
+    assert cache.get(queues, request_data, "5") is not None
+    queue.set_tag(Tag("env", "dev"))
+    assert cache.get(queues, request_data, "6") is None
+    cached_call(cache, queues, request_data, "7", lambda: {})
+    snapshot = queues.snapshot()
+    queues.restore(snapshot)
+    assert cache.get(queues, request_data, "8") is None
+
+
+def test_not_cached():
+    cache = ResponseCache()
+    queues = InMemoryQueueStorage()
+    # 変更を伴うactionと存在しないqueueはcacheしない
+    request_data = {"Action": "CreateQueue", "QueueName": "test"}
+    cached_call(cache, queues, request_data, "1", lambda: {})
+    request_data = {
+        "Action": "ListQueueTags",
+        "QueueUrl": "https://localhost:5000/queues/none",
+    }
+    cached_call(cache, queues, request_data, "2", lambda: {})
+    assert cache.stats()["Entries"] == 0
+
+    cache = ResponseCache(max_entries=0)
+    cached_call(cache, queues, {"Action": "ListQueues"}, "3", lambda: {})
+    assert cache.stats()["Entries"] == 0
+
+
+def test_oldest_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    queues = InMemoryQueueStorage()
+    for name in ["a", "b", "c"]:
+        request_data = {"Action": "GetQueueUrl", "QueueName": name}
+        cached_call(cache, queues, request_data, "1", lambda: {"QueueUrl": name})
+    assert cache.stats()["Entries"] == 2
+    assert cache.get(queues, {"Action": "GetQueueUrl", "QueueName": "a"}, "2") is None
+    assert cache.get(queues, {"Action": "GetQueueUrl", "QueueName": "c"}, "2")
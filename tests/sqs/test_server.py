@@ -627,3 +627,157 @@ def test_visibility_after_receiving(uuid, client):
 def test_determine_operation_raises_when_non_exist_operation(client):
     with pytest.raises(NotImplementedError):
         client.post("/", data="Action=NotImplementedAction")
+
+
+def test_queues_are_partitioned_by_account_and_region(client):
+    authorization = (
+        "AWS4-HMAC-SHA256 Credential=111111111111/20200601/ap-northeast-1/sqs/"
+        "aws4_request, SignedHeaders=host, Signature=abcdef"
+    )
+    response = client.post(
+        "/",
+        data="Action=CreateQueue&QueueName=test_queue",
+        headers={"Authorization": authorization},
+    )
+    queue_url = "https://localhost:5000/queues/ap-northeast-1/111111111111/test_queue"
+    assert f"<QueueUrl>{queue_url}</QueueUrl>".encode() in response.data
+    # default partitionからは見えない
+    assert get_queue_url(client, "test_queue").status_code == 400
+    # queue urlにpartitionが含まれていれば認証情報がなくても届く
+    assert send_message(client, queue_url, "hello").status_code == 200
+    response = client.post(
+        "/",
+        data="Action=ReceiveMessage&QueueUrl=" + queue_url,
+        headers={"Authorization": authorization},
+    )
+    assert b"<Body>hello</Body>" in response.data
+
+
+def test_parse_request_data_keeps_message_body_bytes():
+    actual = server.parse_request_data(
+        b"Action=SendMessage&MessageBody=%E3%81%82%20a&QueueUrl=http%3A%2F%2Fhoge"
+    )
+
+    assert actual == {
+        "Action": "SendMessage",
+        "MessageBody": "あ a".encode(),
+        "QueueUrl": "http://hoge",
+    }
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [(b"a+b", b"a b"), (b"a%2Bb", b"a+b"), (b"a%20b", b"a b"), (b"a++", b"a  ")],
+)
+def test_unquote_form(value, expected):
+    assert server.unquote_form(value) == expected
+
+
+def test_parse_request_data_plus_as_space():
+    actual = server.parse_request_data(
+        b"Action=SendMessage&MessageBody=a+b%2Bc&MessageAttribute.1.Name=x+y"
+    )
+
+    assert actual == {
+        "Action": "SendMessage",
+        "MessageBody": b"a b+c",
+        "MessageAttribute.1.Name": "x y",
+    }
+
+
+def test_send_message_with_form_encoded_plus(client):
+    create_queue(client, "test_queue")
+    queue_url = "https%3A%2F%2Flocalhost%3A5000%2Fqueues%2Ftest_queue"
+    response = client.post(
+        "/",
+        data=f"Action=SendMessage&QueueUrl={queue_url}&MessageBody=a+b%2Bc",
+    )
+    assert response.status_code == 200
+
+    response = client.post("/", data=f"Action=ReceiveMessage&QueueUrl={queue_url}")
+    assert b"<Body>a b+c</Body>" in response.data
+
+
+def test_send_too_large_message(client):
+    create_queue(client, "test_queue_1")
+    response = send_message(
+        client, "http://localhost:5000/queues/test_queue_1", "a" * 262145
+    )
+
+    assert response.status_code == 400
+    assert b"AWS.SimpleQueueService.InvalidParameterValue" in response.data
+    assert b"Message must be shorter than 262144 bytes." in response.data
+
+
+def test_send_compressed_message():
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "QueuesStorageTypeConfig": {"body_compression_threshold": 1024},
+        }
+    )
+    client = app.test_client()
+    create_queue(client, "test_queue_1")
+    queue_url = "http://localhost:5000/queues/test_queue_1"
+    send_message(client, queue_url, "a" * 2048)
+
+    assert f"<Body>{'a' * 2048}</Body>".encode() in receive_message(
+        client, queue_url
+    ).data
+    queue = app.extensions["queues"].get_queue("test_queue_1")
+    message = queue._messages.get_messages().__next__()[0]
+    assert message.body.compressed
+
+
+def test_read_only_responses_are_cached_until_changed(client):
+    queue_url = "https://localhost:5000/queues/test_queue"
+    create_queue(client, "test_queue")
+    with mock.patch("uuid.uuid4", return_value="725275ae-0b9b-4762-b238-436d7c65a1ac"):
+        first = list_queues(client).data
+    with mock.patch("uuid.uuid4", return_value="11111111-0b9b-4762-b238-436d7c65a1ac"):
+        second = list_queues(client).data
+    # 2回目はcacheから返るがrequest idはrequestごと
+    assert second == first.replace(
+        b"725275ae-0b9b-4762-b238-436d7c65a1ac",
+        b"11111111-0b9b-4762-b238-436d7c65a1ac",
+    )
+    cache = client.application.extensions["response_cache"]
+    assert cache.stats()["Hits"] == 1
+
+    create_queue(client, "test_queue2")
+    assert b"test_queue2" in list_queues(client).data
+
+    tag_queue(client, queue_url, {"Tag.1.Key": "env", "Tag.1.Value": "dev"})
+    assert b"<Value>dev</Value>" in list_queue_tags(client, queue_url).data
+    tag_queue(client, queue_url, {"Tag.1.Key": "env", "Tag.1.Value": "prd"})
+    assert b"<Value>prd</Value>" in list_queue_tags(client, queue_url).data
+    untag_queue(client, queue_url, ["env"])
+    assert b"<Tag>" not in list_queue_tags(client, queue_url).data
+
+    assert get_queue_url(client, "test_queue").status_code == 200
+    delete_queue(client, queue_url)
+    assert get_queue_url(client, "test_queue").status_code == 400
+
+
+def test_receive_message_from_partitioned_queue():
+    app = server.create_app(
+        {
+            "QueuesStorageTypeConfig": {
+                "queue_partitions": 8,
+                "sampled_queue_partitions": 1,
+            }
+        }
+    )
+    queue_url = "https://localhost:5000/queues/test_queue"
+    with app.test_client() as client:
+        client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+        for i in range(80):
+            client.post(
+                "/", data=f"Action=SendMessage&QueueUrl={queue_url}&MessageBody={i}"
+            )
+        response = client.post(
+            "/",
+            data=f"Action=ReceiveMessage&QueueUrl={queue_url}"
+            f"&MaxNumberOfMessages=100&WaitTimeSeconds=1",
+        )
+        assert response.data.count(b"<MessageId>") == 80
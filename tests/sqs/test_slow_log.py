@@ -0,0 +1,73 @@
+import json
+from unittest import mock
+from faws.sqs import server
+from faws.sqs.slow_log import RequestTimer, SlowRequestLog
+
+QUEUE_URL = "https://localhost:5000/queues/test_queue"
+
+
+def test_request_timer():
+    with mock.patch("time.monotonic", side_effect=[10.0, 10.5, 10.75, 11.0, 12.0]):
+        timer = RequestTimer()
+        timer.mark("A")
+        timer.mark("B")
+        timer.mark("A")
+        assert timer.phases == {"A": 0.75, "B": 0.25}
+        assert timer.elapsed == 2.0
+
+
+def test_fast_requests_are_not_logged(tmp_path):
+    slow_log = SlowRequestLog(threshold_ms=1000, path=str(tmp_path / "slow.jsonl"))
+    timer = RequestTimer()
+    depth = mock.Mock()
+    slow_log.record_request(timer, "SendMessage", QUEUE_URL, 200, depth)
+    slow_log.close()
+    assert slow_log.logged == 0
+    depth.assert_not_called()
+    assert (tmp_path / "slow.jsonl").read_text() == ""
+
+
+def test_slow_requests_are_logged(tmp_path):
+    path = tmp_path / "slow.jsonl"
+    app = server.create_app(
+        {"SlowRequestLogConfig": {"threshold_ms": 0, "path": str(path)}}
+    )
+    with app.test_client() as client:
+        client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+        client.post(
+            "/", data=f"Action=SendMessage&QueueUrl={QUEUE_URL}&MessageBody=hello"
+        )
+        client.post("/", data=f"Action=ReceiveMessage&QueueUrl={QUEUE_URL}")
+    app.extensions["slow_log"].close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["Action"] for r in records] == [
+        "CreateQueue",
+        "SendMessage",
+        "ReceiveMessage",
+    ]
+    assert records[0]["QueueUrl"] is None
+    assert records[0]["QueueDepth"] is None
+    assert records[1]["QueueDepth"] == 1
+    assert records[2]["Status"] == 200
+    assert set(records[2]["Phases"]) == {
+        "BodyRead",
+        "ParseRequestData",
+        "QueueLookup",
+        "Action",
+        "GenerateResponse",
+    }
+    assert sum(records[2]["Phases"].values()) <= records[2]["DurationMs"] + 0.01
+
+
+def test_admin_slow_requests():
+    app = server.create_app({"SlowRequestLogConfig": {"threshold_ms": 0}})
+    with app.test_client() as client:
+        client.post("/", data="Action=ListQueues")
+        app.extensions["slow_log"].close()
+        response = client.get("/admin/slow-requests").get_json()
+        assert response["Logged"] == 1
+        assert response["Requests"][0]["Action"] == "ListQueues"
+
+    with server.create_app().test_client() as client:
+        assert client.get("/admin/slow-requests").status_code == 404
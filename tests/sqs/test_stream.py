@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+import pytest
+from faws.sqs import server
+from faws.sqs.queue import Queue
+from faws.sqs.queue_storage import QueuesStorageType
+from faws.sqs.stream import stream_messages
+
+QUEUE_URL = "https://localhost:5000/queues/test_queue"
+
+
+@pytest.fixture
+def app():
+    app = server.create_app({"QueuesStorageType": QueuesStorageType.IN_MEMORY})
+    app.extensions["queues"].create_queue("test_queue")
+    return app
+
+
+def events(body: str):
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_get_message_waits_for_new_message():
+    queue = Queue("test_queue")
+    threading.Timer(0.1, lambda: queue.add_message("a")).start()
+
+    started = time.monotonic()
+    messages = queue.get_message(wait_seconds=5)
+    assert [m.message_body for m in messages] == ["a"]
+    assert time.monotonic() - started < 5
+
+
+def test_get_message_wait_timeout():
+    queue = Queue("test_queue")
+
+    assert queue.get_message(wait_seconds=0.1) == []
+
+
+def test_stream_messages():
+    queue = Queue("test_queue")
+    queue.add_message("a")
+    queue.add_message("b")
+    stream = stream_messages(queue, heartbeat_seconds=0.01, limit=3)
+
+    assert next(stream).startswith("id: ")
+    assert '"Body": "b"' in next(stream)
+    assert next(stream) == ": heartbeat\n\n"
+    # 送ったmessageはvisibility timeoutの間は再送されない
+    queue.add_message("c")
+    assert '"Body": "c"' in next(stream)
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+def test_stream_route(app):
+    queue = app.extensions["queues"].get_queue("test_queue")
+    for body in ["a", "b", "c"]:
+        queue.add_message(body)
+
+    response = app.test_client().get(
+        "/stream", query_string={"QueueUrl": QUEUE_URL, "Limit": 3}
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert [e["Body"] for e in events(response.get_data(as_text=True))] == [
+        "a",
+        "b",
+        "c",
+    ]
+    assert queue.get_message() == []
+
+
+def test_stream_non_exist_queue(app):
+    response = app.test_client().get(
+        "/stream", query_string={"QueueUrl": "https://localhost:5000/queues/not_exist"}
+    )
+
+    assert response.status_code == 400
+    assert b"NonExistentQueue" in response.data
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        {},
+        {"QueueUrl": "not_a_url"},
+        {"QueueUrl": QUEUE_URL, "Limit": "x"},
+        {"QueueUrl": QUEUE_URL, "Limit": "0"},
+        {"QueueUrl": QUEUE_URL, "HeartbeatSeconds": "0"},
+        {"QueueUrl": QUEUE_URL, "HeartbeatSeconds": "-1"},
+        {"QueueUrl": QUEUE_URL, "HeartbeatSeconds": "nan"},
+        {"QueueUrl": QUEUE_URL, "MaxNumberOfMessages": "0"},
+        {"QueueUrl": QUEUE_URL, "MaxNumberOfMessages": "11"},
+    ],
+)
+def test_stream_invalid_parameter(app, query_string):
+    app.extensions["queues"].create_queue("test_queue")
+    response = app.test_client().get("/stream", query_string=query_string)
+
+    assert response.status_code == 400
+    assert b"InvalidParameterValue" in response.data
@@ -0,0 +1,105 @@
+import pytest
+from faws.sqs import server
+from faws.sqs.error import RequestThrottled
+from faws.sqs.partition import Partition
+from faws.sqs.queue_storage import QueuesStorageType
+from faws.sqs.throttle import BucketGroup, Throttler, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+
+    assert [bucket.consume() for _ in range(4)] == [True, True, True, False]
+    clock.now = 0.5
+    assert bucket.consume()
+    assert not bucket.consume()
+    clock.now = 100
+    assert [bucket.consume() for _ in range(4)] == [True, True, True, False]
+
+
+def test_throttler_per_queue_and_client():
+    clock = Clock()
+    throttler = Throttler(
+        queue_rate=2,
+        client_rate=10,
+        queues={"hot_queue": {"rate": 1}},
+        clients={"trusted": {"rate": None}},
+        clock=clock,
+    )
+
+    throttler.check("hot_queue", "client_a")
+    with pytest.raises(RequestThrottled):
+        throttler.check("hot_queue", "client_a")
+    throttler.check("test_queue", "client_a")
+    throttler.check("test_queue", "client_b")
+    with pytest.raises(RequestThrottled):
+        throttler.check("test_queue", "client_b")
+    for _ in range(100):
+        throttler.check(None, "trusted")
+
+
+def test_throttled_response():
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "ThrottleConfig": {"queue_rate": 1, "queue_burst": 2},
+        }
+    )
+    client = app.test_client()
+    client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+    data = (
+        "Action=SendMessage&QueueUrl=https%3A%2F%2Flocalhost%3A5000%2Fqueues"
+        "%2Ftest_queue&MessageBody=a"
+    )
+
+    assert client.post("/", data=data).status_code == 200
+    response = client.post("/", data=data)
+    assert response.status_code == 403
+    assert b"<Code>RequestThrottled</Code>" in response.data
+
+
+def test_bucket_group_evicts_least_recently_used():
+    clock = Clock()
+    buckets = BucketGroup(1, None, {}, clock, max_buckets=2)
+
+    assert buckets.consume("a")
+    assert buckets.consume("b")
+    assert not buckets.consume("a")
+    assert buckets.consume("c")
+    assert len(buckets) == 2
+    # 最近使われた"a"は残り、"b"は捨てられて新しいbucketになる
+    assert not buckets.consume("a")
+    assert buckets.consume("b")
+
+
+def test_throttle_buckets_are_per_partition():
+    app = server.create_app(
+        {
+            "QueuesStorageType": QueuesStorageType.IN_MEMORY,
+            "ThrottleConfig": {"queue_rate": 1},
+        }
+    )
+    other = Partition("123456789012", "ap-northeast-1")
+    app.extensions["queues"].create_queue("test_queue")
+    app.extensions["partitions"].get(other).create_queue("test_queue")
+    client = app.test_client()
+
+    def send(queue_url):
+        data = f"Action=SendMessage&QueueUrl={queue_url}&MessageBody=a"
+        return client.post("/", data=data).status_code
+
+    assert send("https://localhost:5000/queues/test_queue") == 200
+    assert send("https://localhost:5000/queues/test_queue") == 403
+    assert (
+        send("https://localhost:5000/queues/ap-northeast-1/123456789012/test_queue")
+        == 200
+    )
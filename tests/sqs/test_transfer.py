@@ -0,0 +1,154 @@
+import io
+import json
+import threading
+import time
+import pytest
+from werkzeug.serving import make_server
+from faws import cli
+from faws.sqs import server
+from faws.sqs.message_storage import MessageStorageType
+from faws.sqs.queue import Queue
+from faws.sqs.transfer import (
+    BINARY,
+    NDJSON,
+    decode_messages,
+    encode_messages,
+    export_messages,
+    format_from_path,
+    import_messages,
+)
+
+QUEUE_URL = "https://localhost:5000/queues/test_queue"
+ATTRIBUTES = {
+    "MessageAttribute.1.Name": "City",
+    "MessageAttribute.1.Value.DataType": "String",
+    "MessageAttribute.1.Value.StringValue": "Tokyo",
+}
+
+
+def build_queue(message_storage_type=MessageStorageType.IN_MEMORY) -> Queue:
+    queue = Queue("test_queue", message_storage_type=message_storage_type)
+    queue.add_message("hello", message_attributes=ATTRIBUTES)
+    queue.add_message(b"\x00\xff binary")
+    queue.add_message("later", delay_seconds=60)
+    queue.get_message(visibility_timeout=0)
+    return queue
+
+
+def exported(queue):
+    return [
+        (m.message_id, m.body, m.attributes, m.receive_count)
+        for m in export_messages(queue)
+    ]
+
+
+@pytest.mark.parametrize("message_storage_type", list(MessageStorageType))
+@pytest.mark.parametrize("format_", [NDJSON, BINARY])
+def test_export_and_import(message_storage_type, format_):
+    queue = build_queue(message_storage_type)
+    data = b"".join(encode_messages(export_messages(queue), format_, chunk_size=2))
+
+    copied = Queue("copy", message_storage_type=message_storage_type)
+    stats = import_messages(copied, decode_messages(io.BytesIO(data), format_), 2)
+    assert stats == {"Imported": 3, "Skipped": 0}
+    if format_ == BINARY:
+        assert exported(copied) == exported(queue)
+    assert [m[3] for m in exported(copied)] == [1, 0, 0]
+    assert exported(copied)[0][2] == {
+        "City": {"DataType": "String", "StringValue": "Tokyo"}
+    }
+    assert copied.count_messages() == queue.count_messages()
+    # 同じmessageは2回入れない
+    stats = import_messages(copied, decode_messages(io.BytesIO(data), format_))
+    assert stats == {"Imported": 0, "Skipped": 3}
+
+
+def test_export_is_consistent_while_writing():
+    queue = build_queue()
+    messages = export_messages(queue)
+    first = next(messages)
+    queue.add_message("new")
+    queue.purge_message()
+    assert first.body == b"hello"
+    assert len(list(messages)) == 2
+
+
+def test_decode_invalid_binary():
+    with pytest.raises(ValueError):
+        list(decode_messages(io.BytesIO(b"not an export"), BINARY))
+
+
+@pytest.mark.parametrize(
+    "path,format_",
+    [
+        ("a.ndjson", NDJSON),
+        ("a.jsonl.gz", NDJSON),
+        ("a.bin", BINARY),
+        ("a.gz", BINARY),
+    ],
+)
+def test_format_from_path(path, format_):
+    assert format_from_path(path) == format_
+
+
+@pytest.fixture
+def endpoint():
+    app = server.create_app()
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield app, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_admin_export_and_import(endpoint):
+    app, _ = endpoint
+    with app.test_client() as client:
+        client.post("/", data="Action=CreateQueue&QueueName=test_queue")
+        client.post(
+            "/", data=f"Action=SendMessage&QueueUrl={QUEUE_URL}&MessageBody=hello"
+        )
+        response = client.get(f"/admin/queues/export?QueueUrl={QUEUE_URL}")
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.data.splitlines()
+        assert json.loads(lines[0])["Body"] == "hello"
+
+        other = "https://localhost:5000/queues/other"
+        response = client.post(
+            f"/admin/queues/import?QueueUrl={other}", data=response.data
+        )
+        assert response.get_json() == {"Imported": 1, "Skipped": 0}
+        response = client.post("/", data=f"Action=ReceiveMessage&QueueUrl={other}")
+        assert b"<Body>hello</Body>" in response.data
+
+        queue_url = "https://localhost:5000/queues/none"
+        assert (
+            client.get(f"/admin/queues/export?QueueUrl={queue_url}").status_code == 404
+        )
+        assert (
+            client.get(
+                f"/admin/queues/export?QueueUrl={QUEUE_URL}&Format=csv"
+            ).status_code
+            == 400
+        )
+        response = client.post(
+            f"/admin/queues/import?QueueUrl={other}&Format=binary", data=b"broken"
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize("name", ["backup.bin", "backup.ndjson.gz"])
+def test_cli_export_and_import(tmp_path, endpoint, capsys, name):
+    app, url = endpoint
+    queue = app.extensions["queues"].create_queue("test_queue")
+    for i in range(5):
+        queue.add_message(f"message {i}")
+    path = str(tmp_path / name)
+    cli.main(["export", QUEUE_URL, path, "--endpoint", url])
+    other = "https://localhost:5000/queues/other"
+    cli.main(["import", path, other, "--endpoint", url])
+    assert json.loads(capsys.readouterr().out) == {"Imported": 5, "Skipped": 0}
+    copied = app.extensions["queues"].get_queue("other")
+    assert [m.body for m in export_messages(copied)] == [
+        f"message {i}".encode() for i in range(5)
+    ]
@@ -0,0 +1,120 @@
+import json
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from faws.serve import ServeConfig, build_server, load_app, shutdown_app
+from faws.sqs.query_client import QueryClient
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(endpoint: str, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{endpoint}/admin/ready") as response:
+                return json.loads(response.read())
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError()
+
+
+def test_load_app_with_storage_type_name():
+    app = load_app("sqs", {"QueuesStorageType": "IN_MEMORY"})
+
+    assert app.extensions["queues"].create_queue("test_queue")
+
+
+def test_ready_and_shutdown():
+    app = load_app("sqs")
+    client = app.test_client()
+
+    response = client.get("/admin/ready")
+    assert response.status_code == 200
+    assert response.get_json() == {"Ready": True}
+
+    shutdown_app(app)
+    response = client.get("/admin/ready")
+    assert response.status_code == 503
+    assert response.get_json() == {"Ready": False}
+
+
+def test_s3_ready_and_shutdown(tmp_path):
+    app = load_app("s3", {"BlobStoreConfig": {"directory": str(tmp_path)}})
+    client = app.test_client()
+
+    assert client.get("/admin/ready").get_json() == {"Ready": True}
+    shutdown_app(app)
+    assert client.get("/admin/ready").status_code == 503
+
+
+def test_build_server():
+    app = load_app("sqs")
+    server = build_server(
+        app,
+        ServeConfig(
+            port=0, threads=2, backlog=64, connection_limit=10, keep_alive_timeout=5
+        ),
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    client = QueryClient(f"http://127.0.0.1:{server.effective_port}")
+    try:
+        assert server.adj.threads == 2
+        assert server.adj.backlog == 64
+        assert server.adj.channel_timeout == 5
+        assert client.call("CreateQueue", QueueName="test_queue").ok
+        assert client.call("ListQueues").ok
+    finally:
+        client.close()
+        server.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses SIGTERM")
+def test_cli_serve_graceful_shutdown():
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "faws",
+            "serve",
+            "sqs",
+            "--port",
+            str(port),
+            "--drain-seconds",
+            "2",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    endpoint = f"http://127.0.0.1:{port}"
+    client = QueryClient(endpoint)
+    try:
+        assert wait_ready(endpoint) == {"Ready": True}
+        assert client.call("CreateQueue", QueueName="test_queue").ok
+        process.send_signal(signal.SIGTERM)
+        # drainの間はreadinessだけが503になり、requestは処理される
+        with pytest.raises(urllib.error.HTTPError) as e:
+            for _ in range(20):
+                urllib.request.urlopen(f"{endpoint}/admin/ready").close()
+                time.sleep(0.05)
+        assert e.value.code == 503
+        assert client.call("ListQueues").ok
+        assert process.wait(timeout=10) == 0
+    finally:
+        client.close()
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=10)
+        process.stdout.close()